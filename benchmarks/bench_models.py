@@ -0,0 +1,110 @@
+"""Сравнение модели доступов: старый класс на __dict__ против слотов с компактными строками.
+
+Сохранение и загрузка меряются вместе с шифрованием чанка, как в Vault.
+Запуск: python benchmarks/bench_models.py [--count 100000] [--json]
+"""
+import argparse
+import gc
+import json
+import os
+import sys
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src"))
+
+from dpo.core.encryption import PasswordEncryption  # noqa: E402
+from dpo.core.models import DatabaseCredential, credential_from_row  # noqa: E402
+
+
+class LegacyDatabaseCredential:
+    """Модель до перехода на слоты: обычный класс, to_dict на каждое сохранение"""
+
+    def __init__(self, name, host, user, password, port=3306):
+        self.name = name
+        self.host = host
+        self.user = user
+        self.password = password
+        self.port = port
+
+    def to_dict(self):
+        return {"type": "database", "name": self.name, "host": self.host,
+                "user": self.user, "password": self.password, "port": self.port}
+
+
+def _make(cls, count):
+    return [cls(f"cred-{i}", f"db{i}.internal", "app", f"secret-{i:08d}", 5432) for i in range(count)]
+
+
+def _memory(cls, count):
+    gc.collect()
+    tracemalloc.start()
+    objects = _make(cls, count)
+    current, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del objects
+    return current / count
+
+
+def _timed(fn):
+    start = time.perf_counter()
+    result = fn()
+    return time.perf_counter() - start, result
+
+
+def run(count: int) -> dict:
+    results = {"count": count}
+
+    encryption = PasswordEncryption.from_key(os.urandom(32), os.urandom(16))
+    legacy = _make(LegacyDatabaseCredential, count)
+    slotted = _make(DatabaseCredential, count)
+
+    def load_legacy(token):
+        data = json.loads(encryption.decrypt(token))
+        return [LegacyDatabaseCredential(d["name"], d["host"], d["user"], d["password"], d["port"])
+                for d in data.values()]
+
+    def load_slotted(token):
+        return [credential_from_row(row) for row in json.loads(encryption.decrypt(token))]
+
+    save_legacy, legacy_token = _timed(
+        lambda: encryption.encrypt(json.dumps({c.name: c.to_dict() for c in legacy}, ensure_ascii=False)))
+    save_slotted, slotted_token = _timed(
+        lambda: encryption.encrypt(json.dumps([c.to_row() for c in slotted], ensure_ascii=False)))
+    load_legacy_time, _ = _timed(lambda: load_legacy(legacy_token))
+    load_slotted_time, _ = _timed(lambda: load_slotted(slotted_token))
+
+    for label, cls, save, load, size in (
+        ("legacy", LegacyDatabaseCredential, save_legacy, load_legacy_time, len(legacy_token)),
+        ("slotted", DatabaseCredential, save_slotted, load_slotted_time, len(slotted_token)),
+    ):
+        results[label] = {
+            "bytes_per_object": round(_memory(cls, count), 1),
+            "save_per_sec": round(count / save),
+            "load_per_sec": round(count / load),
+            "encrypted_bytes": size,
+        }
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Бенчмарк модели доступов")
+    parser.add_argument("--count", type=int, default=100000)
+    parser.add_argument("--json", action="store_true", help="Вывести результат в JSON")
+    args = parser.parse_args()
+
+    results = run(args.count)
+    if args.json:
+        print(json.dumps(results, indent=2))
+        return
+
+    print(f"Доступов: {args.count}")
+    print(f"{'':10}{'байт/объект':>14}{'сохранение/с':>14}{'загрузка/с':>14}{'размер чанка':>14}")
+    for label in ("legacy", "slotted"):
+        r = results[label]
+        print(f"{label:10}{r['bytes_per_object']:>14}{r['save_per_sec']:>14}"
+              f"{r['load_per_sec']:>14}{r['encrypted_bytes']:>14}")
+
+
+if __name__ == "__main__":
+    main()
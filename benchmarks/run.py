@@ -0,0 +1,454 @@
+"""Бенчмарки горячих путей: запуск CLI, хранилище, поиск, аудит, каталог проектов, шифрование, TUI, генератор паролей.
+
+Генерирует синтетические хранилища (по умолчанию 10, 1k и 100k доступов в множестве
+проектов), пишет результаты в JSON и сравнивает их с сохранённым baseline.
+Если какая-то метрика хуже baseline больше чем на --threshold, код возврата 1.
+
+Запуск:
+    python benchmarks/run.py                     # все размеры, сравнение с baseline.json
+    python benchmarks/run.py --sizes 10,1000 --output /tmp/bench.json
+    python benchmarks/run.py --save-baseline     # обновить baseline после осознанного изменения
+    DPO_BENCH_SRC=/path/to/other/src python benchmarks/run.py   # замерить другую ревизию кода (с пакетом dpo)
+"""
+import argparse
+import gc
+import itertools
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+from types import SimpleNamespace
+from typing import Callable, Dict, List
+
+SRC_DIR = os.environ.get("DPO_BENCH_SRC") or os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src")
+sys.path.insert(0, SRC_DIR)
+
+from dpo.core.encryption import PasswordEncryption  # noqa: E402
+from dpo.core.generator import PassphrasePolicy, PasswordPolicy  # noqa: E402
+from dpo.core.kdf import default_kdf  # noqa: E402
+from dpo.core.models import (APITokenCredential, DatabaseCredential, GenericSecret, Project,  # noqa: E402
+                         SSHKeyCredential, Vault)
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+DEFAULT_BASELINE = os.path.join(BENCH_DIR, "baseline.json")
+DEFAULT_SIZES = [10, 1000, 100000]
+PASSWORD = "benchmark-master-password"
+CREDENTIALS_PER_PROJECT = 100
+# Минимальная длительность одного замера для быстрых операций
+MIN_SAMPLE_S = 0.05
+SEARCH_QUERIES = ["db42", "prod", "app", "internal", "cred-7 prod", "ssh deploy", "dbx"]
+
+
+class Results:
+    """Плоский словарь метрик: имя -> значение, единица и направление «лучше»"""
+
+    def __init__(self):
+        self.metrics: Dict[str, dict] = {}
+
+    def add(self, name: str, value: float, unit: str, better: str = "lower"):
+        self.metrics[name] = {"value": round(value, 6), "unit": unit, "better": better}
+
+    def to_dict(self) -> dict:
+        return {
+            "meta": {
+                "python": platform.python_version(),
+                "platform": platform.platform(),
+                "machine": platform.machine(),
+                "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            },
+            "metrics": self.metrics,
+        }
+
+
+def best_of(fn: Callable, repeat: int) -> float:
+    """Лучшее время одного вызова из repeat замеров — меньше всего зависит от шума.
+
+    Быстрые функции в каждом замере вызываются в цикле, пока он не займёт MIN_SAMPLE_S.
+    """
+    start = time.perf_counter()
+    fn()
+    first = time.perf_counter() - start
+    number = max(1, int(MIN_SAMPLE_S / first)) if first > 0 else 1000
+    best = first
+    for _ in range(repeat):
+        gc.collect()
+        start = time.perf_counter()
+        for _ in range(number):
+            fn()
+        best = min(best, (time.perf_counter() - start) / number)
+    return best
+
+
+def peak_memory(fn: Callable) -> int:
+    gc.collect()
+    tracemalloc.start()
+    try:
+        fn()
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return peak
+
+
+def make_vault(count: int) -> Vault:
+    """Синтетическое хранилище: count доступов разных типов по CREDENTIALS_PER_PROJECT на проект"""
+    vault = Vault(PASSWORD)
+    projects = max(1, (count + CREDENTIALS_PER_PROJECT - 1) // CREDENTIALS_PER_PROJECT)
+    for p in range(projects):
+        vault.add_project(Project(f"project-{p}", f"Синтетический проект {p}"))
+    names = list(vault.projects)
+    for i in range(count):
+        proj = vault.projects[names[i % projects]]
+        kind = i % 10
+        if kind < 7:
+            cred = DatabaseCredential(f"cred-{i}", f"db{i}.prod.internal", f"app{i % 50}", f"secret-{i:08d}", 5432)
+        elif kind < 8:
+            cred = SSHKeyCredential(f"ssh-{i}", f"host{i}.prod.internal", "deploy", private_key="K" * 400)
+        elif kind < 9:
+            cred = APITokenCredential(f"api-{i}", "https://api.example.com", f"client{i}", f"tok-{i:012d}")
+        else:
+            cred = GenericSecret(f"secret-{i}", password=f"s-{i:010d}", notes="заметка")
+        proj.add_credential(cred)
+    return vault
+
+
+def _load_all(path: str) -> Vault:
+    vault = Vault.load_from_file(path, PASSWORD)
+    for proj in vault.list_projects():
+        proj.credentials
+    return vault
+
+
+def bench_rekey(vault: Vault, path: str, repeat: int) -> float:
+    """Смена ключа загруженного хранилища; ключи выведены заранее, KDF в замер не входит"""
+    keys = itertools.cycle([PasswordEncryption.from_key(os.urandom(32), os.urandom(16), vault.encryption.kdf)
+                            for _ in range(2)])
+    return best_of(lambda: vault.rekey(path, next(keys)), repeat)
+
+
+def bench_vault(results: Results, count: int, workdir: str, repeat: int):
+    prefix = f"vault.{count}"
+    path = os.path.join(workdir, f"vault-{count}.encrypted")
+    vault = make_vault(count)
+
+    def save_full():
+        if os.path.exists(path):
+            os.remove(path)
+        vault.save_to_file(path)
+
+    results.add(f"{prefix}.save.wall_s", best_of(save_full, repeat), "s")
+    results.add(f"{prefix}.save.peak_bytes", peak_memory(save_full), "B")
+    results.add(f"{prefix}.file_bytes", os.path.getsize(path), "B")
+
+    # Разблокировка: вывод ключа и чтение индекса, проекты не расшифровываются
+    results.add(f"{prefix}.unlock.wall_s", best_of(lambda: Vault.load_from_file(path, PASSWORD), repeat), "s")
+    results.add(f"{prefix}.load.wall_s", best_of(lambda: _load_all(path), repeat), "s")
+    results.add(f"{prefix}.load.peak_bytes", peak_memory(lambda: _load_all(path)), "B")
+
+    # Инкрементальное сохранение: изменён один доступ в одном проекте
+    loaded = _load_all(path)
+    first = loaded.list_projects()[0]
+    cred = next(iter(first.credentials.values()))
+
+    def save_one():
+        cred.password += "x"
+        loaded.save_to_file(path)
+
+    results.add(f"{prefix}.save_incremental.wall_s", best_of(save_one, repeat), "s")
+    loaded.wait_for_fold()
+    results.add(f"{prefix}.rekey.wall_s", bench_rekey(loaded, path, repeat), "s")
+
+    def build_index():
+        loaded._search_index = None
+        return loaded.search_index
+
+    results.add(f"{prefix}.search.build_s", best_of(build_index, repeat), "s")
+    index = loaded.search_index
+    results.add(f"{prefix}.search.query_ms", best_of(
+        lambda: [index.search(q) for q in SEARCH_QUERIES], repeat) * 1000 / len(SEARCH_QUERIES), "ms")
+
+    def build_audit():
+        loaded._audit_index = None
+        return loaded.audit()
+
+    results.add(f"{prefix}.audit.build_s", best_of(build_audit, repeat), "s")
+
+    # Правка пароля обновляет индекс аудита по событию; отчёт не перебирает весь vault
+    def audit_one():
+        cred.password += "x"
+        return loaded.audit()
+
+    results.add(f"{prefix}.audit.update_us", best_of(audit_one, repeat) * 1e6, "us")
+
+
+def _first_reveal(path: str) -> float:
+    vault = Vault.load_from_file(path, PASSWORD)
+    cred = next(iter(vault.list_projects()[0].credentials.values()))
+    start = time.perf_counter()
+    cred.reveal()
+    return time.perf_counter() - start
+
+
+def bench_sealed(results: Results, count: int, workdir: str, repeat: int):
+    """Режим запечатанных секретов: загрузка без расшифровки секретов, первый показ пароля
+    в проекте (дочитывает секреты проекта) и повторный показ"""
+    prefix = f"sealed.{count}"
+    path = os.path.join(workdir, f"sealed-{count}.encrypted")
+    vault = make_vault(count)
+    vault.seal_secrets = True
+    vault.save_to_file(path)
+    results.add(f"{prefix}.file_bytes", os.path.getsize(path), "B")
+    results.add(f"{prefix}.load.wall_s", best_of(lambda: _load_all(path), repeat), "s")
+    results.add(f"{prefix}.load.peak_bytes", peak_memory(lambda: _load_all(path)), "B")
+
+    results.add(f"{prefix}.first_reveal_us", min(_first_reveal(path) for _ in range(repeat)) * 1e6, "us")
+
+    loaded = _load_all(path)
+    cred = next(iter(loaded.list_projects()[0].credentials.values()))
+    loaded.encryption.sealer.cache_size = 0
+    cred.reveal()  # секреты проекта уже прочитаны: дальше замеряется только расшифровка поля
+    results.add(f"{prefix}.reveal_us", best_of(cred.reveal, repeat) * 1e6, "us")
+    results.add(f"{prefix}.rekey.wall_s", bench_rekey(loaded, path, repeat), "s")
+
+
+def bench_single_project(results: Results, count: int, workdir: str, repeat: int):
+    """Все доступы в одном проекте: его чанк шифруется и читается целиком за раз"""
+    prefix = f"project.{count}"
+    path = os.path.join(workdir, f"project-{count}.encrypted")
+    vault = Vault(PASSWORD)
+    project = Project("single")
+    vault.add_project(project)
+    for i in range(count):
+        project.add_credential(DatabaseCredential(f"cred-{i}", f"db{i}.prod.internal", "app", f"secret-{i:08d}"))
+
+    def save_full():
+        if os.path.exists(path):
+            os.remove(path)
+        vault.save_to_file(path)
+
+    def load():
+        Vault.load_from_file(path, PASSWORD).projects["single"].credentials
+
+    results.add(f"{prefix}.save.wall_s", best_of(save_full, repeat), "s")
+    results.add(f"{prefix}.save.peak_bytes", peak_memory(save_full), "B")
+    results.add(f"{prefix}.load.wall_s", best_of(load, repeat), "s")
+    results.add(f"{prefix}.load.peak_bytes", peak_memory(load), "B")
+
+    # Сохранение правки одного доступа в большом проекте: одна запись журнала, проект не переписывается
+    loaded = Vault.load_from_file(path, PASSWORD)
+    cred = loaded.projects["single"].credentials["cred-0"]
+
+    def commit():
+        cred.password += "x"
+        loaded.save_to_file(path)
+
+    results.add(f"{prefix}.commit.wall_s", best_of(commit, repeat), "s")
+    loaded.wait_for_fold()
+
+
+def bench_tui(results: Results, count: int, repeat: int):
+    """ProjectManagementForm.beforeEditing для проекта из count доступов.
+
+    Терминал не нужен: форма подменяется заглушкой с теми же атрибутами.
+    before_editing — открытие после изменения проекта, reopen — повторное без изменений.
+    """
+    try:
+        from dpo.tui import ProjectManagementForm
+    except ImportError:  # нет npyscreen / curses
+        return
+
+    project = Project("tui")
+    for i in range(count):
+        project.add_credential(DatabaseCredential(f"cred-{i}", f"db{i}.prod.internal", "app", f"secret-{i}"))
+
+    # Видимое окно списка — 10 строк, как в форме
+    form = SimpleNamespace(
+        parentApp=SimpleNamespace(current_project=project),
+        project_label=SimpleNamespace(value=""),
+        access_list=SimpleNamespace(set_rows=lambda rows: rows.window(0, 10)),
+        display=lambda: None,
+    )
+
+    def open_changed():
+        project.mark_dirty()
+        ProjectManagementForm.beforeEditing(form)
+
+    results.add(f"tui.{count}.before_editing_ms", best_of(open_changed, repeat) * 1000, "ms")
+    results.add(f"tui.{count}.reopen_ms",
+                best_of(lambda: ProjectManagementForm.beforeEditing(form), repeat) * 1000, "ms")
+
+
+def bench_catalog(results: Results, count: int, repeat: int):
+    """Каталог из count проектов org/team/app с тегами окружений: построение, отбор, смена тегов.
+
+    Доступов в проектах нет: каталог строится из метаданных, как после разблокировки.
+    """
+    prefix = f"catalog.{count}"
+    vault = Vault(encryption=PasswordEncryption.from_key(os.urandom(32), os.urandom(16), default_kdf()))
+    for i in range(count):
+        tags = (("prod", "staging", "dev")[i % 3],) + (("eu",) if i % 2 else ())
+        vault.add_project(Project(f"org{i % 10}/team{i % 100}/app-{i}", "", tags))
+
+    def build():
+        vault._project_index = None
+        return vault.project_index
+
+    results.add(f"{prefix}.build_ms", best_of(build, repeat) * 1000, "ms")
+    results.add(f"{prefix}.filter_us", best_of(
+        lambda: vault.find_projects("org3/team13", ["prod", "eu"], credential_tags=False), repeat) * 1e6, "us")
+    project = next(iter(vault.projects.values()))
+    retags = itertools.cycle([("prod",), ("prod", "legacy")])
+    results.add(f"{prefix}.retag_us", best_of(lambda: project.set_tags(next(retags)), repeat) * 1e6, "us")
+
+    try:
+        from dpo.tui import MainAppForm
+    except ImportError:  # нет npyscreen / curses
+        return
+    # Главное меню TUI: список проектов под фильтр, введённый в поле
+    form = SimpleNamespace(
+        parentApp=SimpleNamespace(vault=vault),
+        filter_w=SimpleNamespace(value="org3 #prod"),
+        project_list=SimpleNamespace(values=[], value=[], display=lambda: None),
+        projects=[],
+    )
+    results.add(f"tui.{count}.project_filter_ms", best_of(lambda: MainAppForm.update_list(form), repeat) * 1000, "ms")
+
+
+def _import_time_ms(module: str) -> float:
+    """Накопленное время импорта модуля по python -X importtime (без старта интерпретатора)"""
+    proc = subprocess.run([sys.executable, "-X", "importtime", "-c", f"import {module}"],
+                          env=_subprocess_env(), capture_output=True, text=True, check=True)
+    for line in proc.stderr.splitlines():
+        parts = [part.strip() for part in line.split("|")]
+        if len(parts) == 3 and parts[2] == module:
+            return int(parts[1]) / 1000
+    raise RuntimeError(f"Нет {module} в выводе -X importtime")
+
+
+def _subprocess_env() -> dict:
+    env = dict(os.environ)
+    # Как у установленного пакета: байткод кэшируется, иначе каждый запуск мерил бы компиляцию
+    env.pop("PYTHONDONTWRITEBYTECODE", None)
+    env["PYTHONPATH"] = os.pathsep.join(filter(None, [os.path.abspath(SRC_DIR), env.get("PYTHONPATH")]))
+    return env
+
+
+def bench_startup(results: Results, repeat: int):
+    """Запуск CLI в отдельном процессе: скрипты зовут dpo в цикле и платят за это каждый раз.
+
+    cli_import — то, что нужно для разбора аргументов; models_import — что добавляют
+    команды, работающие с хранилищем (криптография).
+    """
+    runs = max(repeat, 5)
+    command = [sys.executable, "-m", "dpo", "--help"]
+    env = _subprocess_env()
+    subprocess.run(command, env=env, stdout=subprocess.DEVNULL, check=True)  # прогрев: запись .pyc
+    best = float("inf")
+    for _ in range(runs):
+        start = time.perf_counter()
+        subprocess.run(command, env=env, stdout=subprocess.DEVNULL, check=True)
+        best = min(best, time.perf_counter() - start)
+    results.add("startup.help_ms", best * 1000, "ms")
+    for module, name in (("dpo.cli", "cli_import_ms"), ("dpo.core.models", "models_import_ms")):
+        results.add(f"startup.{name}", min(_import_time_ms(module) for _ in range(runs)), "ms")
+
+
+def bench_encryption(results: Results, repeat: int):
+    salt = os.urandom(16)
+    kdf = default_kdf()
+    results.add("kdf.default.derive_ms", best_of(lambda: PasswordEncryption.derive_key(PASSWORD, salt, kdf), repeat)
+                * 1000, "ms")
+
+    encryption = PasswordEncryption.from_key(os.urandom(32), salt)
+    # encrypt принимает текст (JSON чанка), поэтому нагрузка — строка
+    payload = os.urandom(3 * 1024 * 1024).hex()[:4 * 1024 * 1024]
+    mib = len(payload) / (1024 * 1024)
+    token = encryption.encrypt(payload)
+    results.add("fernet.encrypt_mib_s", mib / best_of(lambda: encryption.encrypt(payload), repeat), "MiB/s", "higher")
+    results.add("fernet.decrypt_mib_s", mib / best_of(lambda: encryption.decrypt(token), repeat), "MiB/s", "higher")
+
+
+def bench_generator(results: Results, repeat: int):
+    """Пакетная генерация (generate --count): паролей и фраз в секунду"""
+    batch = 10000
+    policies = {
+        "password": PasswordPolicy(),
+        # Строгие минимумы: пароли собираются по классам, без отбрасывания целиком
+        "password_strict": PasswordPolicy(12, ("lower", "digits"), {"digits": 8}),
+        "passphrase": PassphrasePolicy(),
+    }
+    for name, policy in policies.items():
+        results.add(f"generator.{name}_per_s", batch / best_of(lambda: policy.generate(batch), repeat),
+                    "1/s", "higher")
+
+
+def compare(current: Dict[str, dict], baseline: Dict[str, dict], threshold: float) -> List[str]:
+    """Строки отчёта; метрики хуже baseline больше чем на threshold помечаются REGRESSION"""
+    lines = []
+    for name, metric in current.items():
+        base = baseline.get(name)
+        if base is None or not base["value"]:
+            lines.append(f"  {name:45} {metric['value']:>14.4f} {metric['unit']:6} (нет в baseline)")
+            continue
+        ratio = metric["value"] / base["value"]
+        worse = ratio > 1 + threshold if metric["better"] == "lower" else ratio < 1 / (1 + threshold)
+        mark = "REGRESSION" if worse else ""
+        lines.append(f"  {name:45} {metric['value']:>14.4f} {metric['unit']:6} x{ratio:5.2f} {mark}")
+    return lines
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Бенчмарки Dev Password Organizer")
+    parser.add_argument("--sizes", type=str, default=",".join(map(str, DEFAULT_SIZES)),
+                        help="Размеры хранилищ (число доступов) через запятую")
+    parser.add_argument("--repeat", type=int, default=3, help="Прогонов на замер (берётся лучший)")
+    parser.add_argument("--output", type=str, default=None, help="JSON с результатами")
+    parser.add_argument("--baseline", type=str, default=DEFAULT_BASELINE, help="Файл baseline")
+    parser.add_argument("--save-baseline", action="store_true", help="Записать результаты как новый baseline")
+    parser.add_argument("--threshold", type=float, default=0.25, help="Допустимое ухудшение (0.25 = 25%%)")
+    args = parser.parse_args()
+
+    sizes = [int(s) for s in args.sizes.split(",") if s]
+    results = Results()
+    bench_startup(results, args.repeat)
+    bench_encryption(results, args.repeat)
+    bench_generator(results, args.repeat)
+    with tempfile.TemporaryDirectory() as workdir:
+        for count in sizes:
+            print(f"⏱️  Хранилище на {count} доступов...", file=sys.stderr)
+            bench_vault(results, count, workdir, args.repeat)
+            bench_sealed(results, count, workdir, args.repeat)
+            bench_single_project(results, count, workdir, args.repeat)
+            bench_tui(results, count, args.repeat)
+            bench_catalog(results, count, args.repeat)
+
+    report = results.to_dict()
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2, ensure_ascii=False)
+    if args.save_baseline:
+        with open(args.baseline, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2, ensure_ascii=False)
+        print(f"💾 Baseline сохранён: {args.baseline}")
+        return 0
+
+    baseline = {}
+    if os.path.exists(args.baseline):
+        with open(args.baseline, encoding="utf-8") as f:
+            baseline = json.load(f)["metrics"]
+    lines = compare(results.metrics, baseline, args.threshold)
+    print("\n".join(lines))
+    regressions = sum(line.endswith("REGRESSION") for line in lines)
+    if regressions:
+        print(f"❌ Регрессий: {regressions}")
+        return 1
+    print("✅ Регрессий нет")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,3 @@
+"""Dev Password Organizer — менеджер доступов разработчика (CLI, TUI, агент и демон секретов)."""
+
+__version__ = "0.1.0"
@@ -0,0 +1,629 @@
+"""Командная строка Dev Password Organizer (консольная команда `dpo`).
+
+Модули с криптографией, TUI (npyscreen/curses), агентом и демоном импортируются
+внутри команд: `--help`, работа с токенами демона и другие команды, которым они
+не нужны, не платят за их загрузку. Это заметно, когда CLI вызывают в цикле.
+"""
+import argparse
+import getpass
+import os
+import sys
+
+VAULT_FILE = "vault.encrypted"
+GLOBAL_MASTER_PASSWORD = None
+
+
+def load_from_agent(file_path: str):
+    """Пробует открыть Vault ключом из агента разблокировки (без PBKDF2)."""
+    from .core.agent import AgentClient
+    from .core.encryption import PasswordEncryption
+    from .core.models import Vault
+
+    salt, kdf = Vault.read_key_params(file_path)
+    key = AgentClient().get_key(salt, kdf.to_dict())
+    if key is None:
+        return None
+    try:
+        return Vault.load_from_file(file_path, encryption=PasswordEncryption.from_key(key, salt, kdf))
+    except ValueError:
+        return None
+
+
+def remember_key(vault):
+    """Отдаёт выведенный ключ агенту, если он запущен."""
+    from .core.agent import AgentClient
+
+    encryption = vault.encryption
+    AgentClient().put_key(encryption.get_salt(), encryption.key, encryption.kdf.to_dict())
+
+
+def get_vault(file_path: str):
+    """Управляет загрузкой и созданием Vault, запрашивая пароль один раз."""
+    global GLOBAL_MASTER_PASSWORD
+    from .core.models import Vault
+
+    if GLOBAL_MASTER_PASSWORD is None and os.path.exists(file_path):
+        vault = load_from_agent(file_path)
+        if vault is not None:
+            return vault
+
+    # 1. Запрос пароля (если еще не введен)
+    if GLOBAL_MASTER_PASSWORD is None:
+        if os.path.exists(file_path):
+            prompt = "🔒 Введите мастер-пароль: "
+        else:
+            prompt = "🔒 Введите НОВЫЙ мастер-пароль (создаем базу): "
+
+        # Ввод "вслепую" (символы не отображаются)
+        master_password = getpass.getpass(prompt)
+        GLOBAL_MASTER_PASSWORD = master_password
+    else:
+        master_password = GLOBAL_MASTER_PASSWORD
+
+    # 2. Логика загрузки/создания
+    if not os.path.exists(file_path):
+        print(f"⭐ Файл {file_path} не найден. Создается новый Vault.")
+        vault = Vault(master_password)
+        remember_key(vault)
+        return vault
+
+    try:
+        vault = Vault.load_from_file(file_path, master_password)
+        remember_key(vault)
+        return vault
+    except ValueError as e:
+        print(f"\n{str(e)}")
+        GLOBAL_MASTER_PASSWORD = None
+        sys.exit(1)
+
+
+def save_changes(vault, args):
+    try:
+        vault.save_to_file(args.file)
+        print(f"💾 Изменения автоматически сохранены в {args.file}")
+        for project_name, cred_name in vault.conflicts:
+            print(f"⚠️ Конфликт с другим процессом: их версия сохранена как '{cred_name}' в проекте '{project_name}'")
+    except Exception as e:
+        print(f"❌ Ошибка сохранения: {e}")
+
+
+def check_choice(value, choices, option: str) -> bool:
+    """Проверка выбора, список которого известен только после импорта модуля"""
+    if value is None or value in choices:
+        return True
+    print(f"❌ Ошибка: {option} — одно из: {', '.join(choices)}")
+    return False
+
+
+def positive_int(value: str) -> int:
+    """Тип аргумента argparse: целое не меньше 1"""
+    try:
+        number = int(value)
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"ожидается целое число, получено '{value}'") from None
+    if number < 1:
+        raise argparse.ArgumentTypeError(f"ожидается число от 1, получено {number}")
+    return number
+
+
+def parse_tag_args(args):
+    """Теги из всех --tag (каждый может перечислять несколько через запятую)"""
+    from .core.catalog import parse_tags
+
+    return parse_tags(",".join(args.tag))
+
+
+def tag_suffix(tags) -> str:
+    return "".join(f" #{tag}" for tag in tags)
+
+
+# --- Команды ---
+
+
+def cmd_tui(args):
+    from .tui import TUIApp
+
+    TUIApp().run()
+
+
+def cmd_agent(args):
+    from .core.agent import AgentClient, DEFAULT_TTL, start_agent, is_supported
+
+    if not is_supported():
+        print("❌ Агент разблокировки требует поддержки Unix-сокетов.")
+        return
+
+    client = AgentClient()
+    ttl = args.ttl or DEFAULT_TTL
+    if args.action == "agent-start":
+        if start_agent(ttl):
+            print(f"🔑 Агент запущен (ключи живут {ttl} сек).")
+            # Сразу разблокируем хранилище, чтобы следующие команды не спрашивали пароль
+            if os.path.exists(args.file):
+                get_vault(args.file)
+        else:
+            print("❌ Не удалось запустить агента.")
+    elif args.action == "agent-lock":
+        print("🔒 Ключи удалены из агента." if client.lock() else "ℹ️ Агент не запущен.")
+    elif args.action == "agent-stop":
+        print("🛑 Агент остановлен." if client.stop() else "ℹ️ Агент не запущен.")
+
+
+def cmd_daemon_token(args):
+    # Только JSON-файл клиентов: криптография не нужна
+    from .core.daemon_tokens import issue_token
+
+    if not args.name or not args.scope:
+        print("❌ Ошибка: укажите --name клиента и хотя бы один --scope ПРОЕКТ")
+        return
+    token = issue_token(args.file, args.name, args.scope)
+    print(f"🎫 Токен клиента '{args.name}' (проекты: {', '.join(args.scope)}). Он показывается один раз:")
+    print(token)
+
+
+def cmd_daemon_revoke(args):
+    from .core.daemon_tokens import revoke_token
+
+    if not args.name:
+        print("❌ Ошибка: укажите --name клиента")
+        return
+    print(f"🗑️ Токен '{args.name}' отозван." if revoke_token(args.file, args.name)
+          else f"ℹ️ Клиент '{args.name}' не найден.")
+
+
+def cmd_daemon(args):
+    from .core import daemon
+    from .core.agent import is_supported
+
+    if not is_supported():
+        print("❌ Демон секретов требует поддержки Unix-сокетов.")
+        return
+    if not os.path.exists(args.file):
+        print(f"❌ Файл {args.file} не найден.")
+        return
+    vault = get_vault(args.file)
+    daemon.serve(args.file, vault.encryption)
+
+
+def cmd_calibrate(args):
+    """Подбирает параметры KDF под целевое время разблокировки и (с --apply) перешифровывает vault."""
+    from .core.encryption import PasswordEncryption
+    from .core.kdf import available_kdfs, calibrate
+
+    kdfs = available_kdfs()
+    if not check_choice(args.kdf, kdfs, "--kdf"):
+        return
+    kdf_name = args.kdf or kdfs[-1]
+    print(f"⏱️ Калибровка {kdf_name} под {args.target_ms} мс...")
+    kdf = calibrate(kdf_name, args.target_ms)
+    print(f"✅ {kdf}: {kdf.measure_ms():.0f} мс на этой машине")
+
+    if not args.apply:
+        print("ℹ️ Добавьте --apply, чтобы перешифровать хранилище с этими параметрами.")
+        return
+    if not os.path.exists(args.file):
+        print(f"❌ Файл {args.file} не найден.")
+        return
+
+    vault = get_vault(args.file)
+    master_password = GLOBAL_MASTER_PASSWORD or getpass.getpass("🔒 Подтвердите мастер-пароль: ")
+    if not vault.encryption.check_password(master_password):
+        print("❌ Неверный мастер-пароль.")
+        return
+
+    vault.rekey(args.file, PasswordEncryption(master_password, kdf=kdf))
+    remember_key(vault)
+    print("🔁 Хранилище перешифровано с новыми параметрами KDF.")
+
+
+def cmd_rekey(args):
+    """Меняет мастер-пароль: новая соль, все чанки и журнал перешифровываются новым ключом."""
+    global GLOBAL_MASTER_PASSWORD
+    from .core.encryption import PasswordEncryption
+
+    if not os.path.exists(args.file):
+        print(f"❌ Файл {args.file} не найден.")
+        return
+    if args.workers is not None and args.workers < 1:
+        print("❌ --workers должно быть не меньше 1.")
+        return
+
+    vault = get_vault(args.file)
+    master_password = GLOBAL_MASTER_PASSWORD or getpass.getpass("🔒 Подтвердите мастер-пароль: ")
+    if not vault.encryption.check_password(master_password):
+        print("❌ Неверный мастер-пароль.")
+        return
+    new_password = getpass.getpass("🔑 Новый мастер-пароль: ")
+    if not new_password:
+        print("❌ Мастер-пароль не может быть пустым.")
+        return
+    if getpass.getpass("🔑 Повторите новый мастер-пароль: ") != new_password:
+        print("❌ Пароли не совпадают.")
+        return
+
+    vault.rekey(args.file, PasswordEncryption(new_password, kdf=vault.encryption.kdf), workers=args.workers)
+    GLOBAL_MASTER_PASSWORD = new_password
+    remember_key(vault)
+    print("🔁 Мастер-пароль изменён, хранилище перешифровано.")
+
+
+def cmd_load(args):
+    get_vault(args.file)
+    print("✅ Данные успешно загружены и расшифрованы!")
+
+
+def cmd_save(args):
+    vault = get_vault(args.file)
+    vault.save_to_file(args.file)
+    print(f"💾 Принудительно сохранено в {args.file}")
+
+
+def cmd_add_project(args):
+    from .core.catalog import normalize_path
+    from .core.models import Project
+
+    name = normalize_path(args.name or "")
+    if not name:
+        print("❌ Ошибка: укажите --name (путь проекта, например acme/billing/prod)")
+        return
+    vault = get_vault(args.file)
+    vault.add_project(Project(name, args.description, parse_tag_args(args)))
+    print(f"✅ Проект '{name}' создан.")
+    save_changes(vault, args)
+
+
+def cmd_list_projects(args):
+    vault = get_vault(args.file)
+    tags = parse_tag_args(args)
+    if args.under or tags:
+        projects = vault.find_projects(args.under or "", tags)
+    else:
+        projects = vault.list_projects()
+    if not projects:
+        print("📂 Список пуст.")
+    else:
+        print("📋 Проекты:")
+        for p in projects:
+            line = f" - {p.name}: {p.description}" if p.description else f" - {p.name}"
+            print(line + tag_suffix(p.tags))
+            for cred in p.credentials.values():
+                # С --tag показываются только доступы, на которые теги приходятся (свои или проекта)
+                if all(tag in p.tags or tag in cred.tags for tag in tags):
+                    print(f"   └── {cred}{tag_suffix(cred.tags)}")
+
+
+def cmd_tag(args):
+    """Заменяет теги проекта или, с --name, доступа в нём; без --tag — снимает все"""
+    if not args.project:
+        print("❌ Ошибка: укажите --project")
+        return
+    vault = get_vault(args.file)
+    proj = vault.projects.get(args.project)
+    if proj is None:
+        print(f"❌ Проект '{args.project}' не найден.")
+        return
+    tags = parse_tag_args(args)
+    if args.name:
+        cred = proj.credentials.get(args.name)
+        if cred is None:
+            print(f"❌ Доступ '{args.name}' не найден в проекте '{proj.name}'.")
+            return
+        cred.tags = tags
+        target = f"доступа '{args.name}'"
+    else:
+        proj.set_tags(tags)
+        target = f"проекта '{proj.name}'"
+    print(f"🏷️ Теги {target}: {tag_suffix(tags).strip() or 'нет'}")
+    save_changes(vault, args)
+
+
+def cmd_import(args):
+    from .core.transfer import CONFLICT_RULES, FORMATS, import_file
+
+    if not (check_choice(args.format, FORMATS, "--format")
+            and check_choice(args.on_conflict, CONFLICT_RULES, "--on-conflict")):
+        return
+    if not args.input:
+        print("❌ Ошибка: укажите --input")
+        return
+    vault = get_vault(args.file)
+    stats = import_file(vault, args.input, args.format, args.project, args.on_conflict)
+    print(f"📥 Импорт завершён — {stats}")
+    if stats.added + stats.updated + stats.renamed > 0:
+        save_changes(vault, args)
+
+
+def cmd_export(args):
+    from .core.transfer import export_file, iter_rows, write_rows
+
+    if not args.output:
+        print("❌ Ошибка: укажите --output")
+        return
+    fmt = args.format or ("jsonl" if args.output.endswith(".jsonl") else "csv")
+    if fmt not in ("csv", "jsonl"):
+        print("❌ Экспорт поддерживает форматы csv и jsonl.")
+        return
+    vault = get_vault(args.file)
+    if args.project and args.project not in vault.projects:
+        print(f"❌ Проект '{args.project}' не найден.")
+        return
+    if args.output == "-":
+        write_rows(sys.stdout, iter_rows(vault, args.project), fmt)
+    else:
+        count = export_file(vault, args.output, fmt, args.project)
+        print(f"📤 Экспортировано доступов: {count} → {args.output} (пароли в открытом виде!)")
+
+
+def cmd_search(args):
+    if not args.query:
+        print("❌ Ошибка: укажите --query")
+        return
+    vault = get_vault(args.file)
+    results = vault.search(args.query, args.limit)
+    if not results:
+        print("🔎 Ничего не найдено.")
+    for proj, cred in results:
+        print(f" - {proj.name}: {cred} [{cred.user}]")
+
+
+def cmd_audit(args):
+    """Повторные пароли, дубли учёток и слабые пароли по всему хранилищу"""
+    vault = get_vault(args.file)
+    report = vault.audit()
+    print(f"🧮 Проверено доступов: {len(vault.audit_index)}")
+    if report.reused:
+        print("♻️ Один пароль у нескольких доступов:")
+        for group in report.reused:
+            print(" - " + ", ".join(f"{project}/{name}" for project, name in group))
+    if report.duplicates:
+        print("👥 Одна учётка заведена несколько раз:")
+        for (host, port, user), group in report.duplicates:
+            print(f" - {user}@{host}:{port} — " + ", ".join(f"{project}/{name}" for project, name in group))
+    if report.weak:
+        print("⚠️ Слабые пароли:")
+        for weak in report.weak:
+            print(f" - {weak.project}/{weak.name}: {weak.reason}")
+    if report.clean:
+        print("✅ Проблем не найдено.")
+
+
+def cmd_get(args):
+    """Печатает одно поле доступа (по умолчанию пароль) — удобно для скриптов"""
+    if not args.project or not args.name:
+        print("❌ Ошибка: укажите --project и --name", file=sys.stderr)
+        sys.exit(1)
+    vault = get_vault(args.file)
+    proj = vault.projects.get(args.project)
+    cred = proj.credentials.get(args.name) if proj is not None else None
+    if cred is None:
+        print(f"❌ Доступ '{args.name}' в проекте '{args.project}' не найден.", file=sys.stderr)
+        sys.exit(1)
+    if args.field not in cred.FIELDS:
+        print(f"❌ Ошибка: --field — одно из: {', '.join(cred.FIELDS)}", file=sys.stderr)
+        sys.exit(1)
+    print(cred.reveal(args.field))
+
+
+def cmd_seal(args):
+    vault = get_vault(args.file)
+    enabled = args.action == "seal"
+    if vault.seal_secrets == enabled:
+        print("ℹ️ Режим уже " + ("включён." if enabled else "выключен."))
+        return
+    vault.set_seal_secrets(enabled)
+    print("🔐 Секреты будут храниться запечатанными по отдельности." if enabled
+          else "🔓 Секреты снова хранятся вместе с остальными полями.")
+    save_changes(vault, args)
+
+
+def cmd_generate(args):
+    """Печатает --count паролей (или парольных фраз с --words) по строке; энтропия — в stderr"""
+    from .core.generator import CHARACTER_CLASSES, PassphrasePolicy, PasswordPolicy
+
+    try:
+        if args.words:
+            policy = PassphrasePolicy(args.words, args.separator)
+        else:
+            min_counts = {}
+            for item in args.min:
+                name, _, count = item.partition("=")
+                if not count.isdigit():
+                    raise ValueError(f"--min ожидает класс=число, например digits=3 (получено '{item}')")
+                min_counts[name] = int(count)
+            classes = [name.strip() for name in args.classes.split(",")] if args.classes else CHARACTER_CLASSES
+            policy = PasswordPolicy(args.length, classes, min_counts, exclude_lookalikes=args.no_lookalikes)
+        passwords = policy.generate(args.count)
+    except ValueError as e:
+        print(f"❌ Ошибка: {e}", file=sys.stderr)
+        sys.exit(1)
+    sys.stdout.write("\n".join(passwords) + "\n")
+    print(f"🎲 Энтропия: {policy.entropy_bits:.1f} бит", file=sys.stderr)
+
+
+HISTORY_ICONS = {"project": "📁", "add": "➕", "update": "✏️", "delete": "🗑️"}
+
+
+def cmd_history(args):
+    import itertools
+    import time
+
+    vault = get_vault(args.file)
+    entries = list(itertools.islice(vault.history(args.project, args.name), args.limit))
+    if not entries:
+        print("🕰️ История пуста.")
+    for entry in entries:
+        when = time.strftime("%Y-%m-%d %H:%M:%S", time.localtime(entry.time))
+        target = entry.project if entry.name is None else f"{entry.project} / {entry.name}"
+        print(f"#{entry.seq} {when} {HISTORY_ICONS.get(entry.action, '•')} {target}")
+
+
+def parse_moment(value: str):
+    """--at: '#N' — номер записи журнала, иначе время ISO 8601 (локальное) -> (until, seq)"""
+    from datetime import datetime
+
+    if value.startswith("#"):
+        return None, int(value[1:])
+    moment = datetime.fromisoformat(value)
+    until = moment.timestamp()
+    if moment.microsecond == 0:
+        until += 0.999  # без долей секунды — включая всю эту секунду, как её показывает history
+    return until, None
+
+
+def cmd_restore(args):
+    if not args.at:
+        print("❌ Ошибка: укажите --at (время ISO, например 2024-05-01T12:30, или номер записи #N из history)")
+        return
+    try:
+        until, seq = parse_moment(args.at)
+    except ValueError:
+        print(f"❌ Не удалось разобрать --at: {args.at}")
+        return
+    vault = get_vault(args.file)
+    try:
+        state = vault.state_at(until, seq, args.project)
+    except ValueError as e:
+        print(str(e))
+        return
+    stats = vault.restore(state, args.project, args.name)
+    if not stats:
+        print("ℹ️ Доступы уже в этом состоянии.")
+        return
+    print(f"♻️ Восстановлено на {args.at} — {stats}")
+    save_changes(vault, args)
+
+
+def cmd_add_credential(args):
+    from .core.models import CREDENTIAL_TYPES, DatabaseCredential
+
+    if not check_choice(args.type, list(CREDENTIAL_TYPES), "--type"):
+        return
+    cred_cls = CREDENTIAL_TYPES[args.type or DatabaseCredential.type_name]
+    data = {"name": args.name, "host": args.host, "user": args.user, "password": args.password,
+            "notes": args.notes, "private_key": ""}
+    if args.key_file:
+        with open(args.key_file, encoding="utf-8") as f:
+            data["private_key"] = f.read()
+    if args.port is not None:
+        data["port"] = args.port
+
+    missing = [field for field in cred_cls.REQUIRED if not data.get(field)]
+    if missing:
+        print("❌ Ошибка: укажите " + ", ".join(f"--{field}" for field in missing))
+        return
+
+    vault = get_vault(args.file)
+    if not vault.projects:
+        print("❌ Сначала создайте проект (add-project).")
+        return
+
+    if args.project:
+        target_project = vault.projects.get(args.project)
+        if target_project is None:
+            print(f"❌ Проект '{args.project}' не найден.")
+            return
+    else:
+        target_project = next(iter(vault.projects.values()))
+
+    cred = cred_cls.from_dict(data)
+    cred.tags = parse_tag_args(args)
+    target_project.add_credential(cred)
+    print(f"✅ Доступ '{args.name}' добавлен в проект '{target_project.name}'.")
+    save_changes(vault, args)
+
+
+COMMANDS = {
+    "add-project": cmd_add_project,
+    "list-projects": cmd_list_projects,
+    "add-credential": cmd_add_credential,
+    "tag": cmd_tag,
+    "save": cmd_save,
+    "load": cmd_load,
+    "tui": cmd_tui,
+    "agent-start": cmd_agent,
+    "agent-lock": cmd_agent,
+    "agent-stop": cmd_agent,
+    "calibrate": cmd_calibrate,
+    "rekey": cmd_rekey,
+    "search": cmd_search,
+    "audit": cmd_audit,
+    "get": cmd_get,
+    "seal": cmd_seal,
+    "unseal": cmd_seal,
+    "import": cmd_import,
+    "export": cmd_export,
+    "generate": cmd_generate,
+    "history": cmd_history,
+    "restore": cmd_restore,
+    "daemon": cmd_daemon,
+    "daemon-token": cmd_daemon_token,
+    "daemon-revoke": cmd_daemon_revoke,
+}
+
+
+def build_parser() -> argparse.ArgumentParser:
+    # Списки типов, форматов и KDF живут в модулях с криптографией — они проверяются в командах
+    parser = argparse.ArgumentParser(prog="dpo", description="Dev Password Organizer CLI")
+    parser.add_argument("action", choices=list(COMMANDS), help="Действие")
+    parser.add_argument("--name", type=str, help="Название")
+    parser.add_argument("--description", type=str, default="", help="Описание")
+    parser.add_argument("--host", type=str, default="", help="Хост")
+    parser.add_argument("--user", type=str, default="", help="Юзер")
+    parser.add_argument("--password", type=str, default="", help="Пароль БД")
+    parser.add_argument("--port", type=int, default=None, help="Порт (по умолчанию — стандартный для типа)")
+    parser.add_argument("--type", type=str, default=None,
+                        help="Тип доступа: database (по умолчанию), ssh, api, secret")
+    parser.add_argument("--key-file", type=str, help="Файл приватного ключа (для --type ssh)")
+    parser.add_argument("--notes", type=str, default="", help="Заметки (для --type secret)")
+    parser.add_argument("--field", type=str, default="password", help="Поле для get (по умолчанию password)")
+    parser.add_argument("--file", type=str, default=VAULT_FILE, help="Файл хранилища")
+    parser.add_argument("--project", type=str, default=None, help="Целевой проект")
+    parser.add_argument("--under", type=str, default=None,
+                        help="Для list-projects: только проекты под этим путём (например acme/billing)")
+    parser.add_argument("--tag", action="append", default=[],
+                        help="Теги через запятую (можно несколько раз): для add-project, add-credential и tag — "
+                             "задать, для list-projects — отобрать проекты со всеми этими тегами")
+    parser.add_argument("--input", type=str, help="Файл для импорта")
+    parser.add_argument("--output", type=str, help="Файл для экспорта ('-' — stdout)")
+    parser.add_argument("--format", type=str, default=None,
+                        help="Формат импорта/экспорта: csv, jsonl, bitwarden, lastpass, keepass, 1password")
+    parser.add_argument("--on-conflict", type=str, default="skip",
+                        help="Что делать с доступом, название которого уже есть в проекте: skip, overwrite, rename")
+    parser.add_argument("--query", "-q", type=str, default="", help="Поисковый запрос")
+    parser.add_argument("--limit", type=int, default=20, help="Максимум результатов поиска и строк истории")
+    parser.add_argument("--count", type=positive_int, default=1, help="Сколько паролей сгенерировать")
+    parser.add_argument("--length", type=int, default=20, help="Длина пароля для generate")
+    parser.add_argument("--classes", type=str, default=None,
+                        help="Классы символов для generate через запятую: lower, upper, digits, symbols (по умолчанию все)")
+    parser.add_argument("--min", action="append", default=[],
+                        help="Минимум символов класса для generate, например digits=3 (по умолчанию 1 каждого класса)")
+    parser.add_argument("--no-lookalikes", action="store_true", help="Без похожих символов (I, l, 1, |, O, 0, o)")
+    parser.add_argument("--words", type=int, default=0, help="Парольная фраза из N слов вместо пароля")
+    parser.add_argument("--separator", type=str, default="-", help="Разделитель слов парольной фразы")
+    parser.add_argument("--at", type=str, default=None,
+                        help="Момент для restore: время ISO 8601 (локальное) или номер записи журнала #N")
+    parser.add_argument("--ttl", type=int, default=None,
+                        help="Время жизни ключа в агенте, сек (по умолчанию 15 минут)")
+    parser.add_argument("--scope", action="append", default=[], help="Проект, доступный клиенту демона (можно несколько)")
+    parser.add_argument("--kdf", type=str, default=None,
+                        help="KDF для calibrate: pbkdf2, scrypt, argon2id (по умолчанию — самый стойкий доступный)")
+    parser.add_argument("--target-ms", type=float, default=250, help="Целевое время разблокировки, мс")
+    parser.add_argument("--apply", action="store_true", help="Перешифровать vault подобранными параметрами")
+    parser.add_argument("--profile", type=str, default=None,
+                        help="Записать замеры этапов (KDF, чтение, расшифровка...) в JSON Trace Event ('-' — stderr)")
+    parser.add_argument("--workers", type=int, default=None,
+                        help="Процессов для перешифровки в rekey (по умолчанию по числу ядер)")
+    return parser
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    if args.profile:
+        from .core import profiling
+
+        profiling.enable(args.profile)
+    COMMANDS[args.action](args)
+
+
+if __name__ == "__main__":
+    main()
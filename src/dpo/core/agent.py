@@ -0,0 +1,223 @@
+"""Агент разблокировки: фоновый процесс, держащий выведенные ключи в памяти.
+
+CLI спрашивает у агента ключ по соли файла и, если он есть, пропускает PBKDF2.
+Общение — JSON-строки через Unix-сокет, доступный только владельцу.
+"""
+import argparse
+import base64
+import hashlib
+import json
+import os
+import socket
+import socketserver
+import struct
+import subprocess
+import sys
+import threading
+import time
+from typing import Dict, Optional, Tuple
+
+DEFAULT_TTL = 15 * 60
+CHECK_INTERVAL = 1.0
+
+
+def is_supported() -> bool:
+    return hasattr(socket, "AF_UNIX")
+
+
+def socket_path() -> str:
+    """Путь к сокету: DPO_AGENT_SOCK, затем XDG_RUNTIME_DIR, затем ~/.dev-password-organizer"""
+    if os.environ.get("DPO_AGENT_SOCK"):
+        return os.environ["DPO_AGENT_SOCK"]
+    base = os.environ.get("XDG_RUNTIME_DIR") or os.path.join(os.path.expanduser("~"), ".dev-password-organizer")
+    return os.path.join(base, "dpo-agent.sock")
+
+
+class KeyStore:
+    """Ключи по соли с ограниченным временем жизни"""
+
+    def __init__(self, ttl: int):
+        self.ttl = ttl
+        self._keys: Dict[str, Tuple[bytes, float]] = {}
+        self._lock = threading.Lock()
+
+    def put(self, key_id: str, key: bytes):
+        with self._lock:
+            self._keys[key_id] = (key, time.monotonic() + self.ttl)
+
+    def get(self, key_id: str) -> Optional[bytes]:
+        with self._lock:
+            item = self._keys.get(key_id)
+            if item is None:
+                return None
+            key, expires = item
+            if expires <= time.monotonic():
+                del self._keys[key_id]
+                return None
+            return key
+
+    def expire(self):
+        now = time.monotonic()
+        with self._lock:
+            for key_id in [k for k, (_, expires) in self._keys.items() if expires <= now]:
+                del self._keys[key_id]
+
+    def clear(self):
+        with self._lock:
+            self._keys.clear()
+
+    def __len__(self):
+        return len(self._keys)
+
+
+class _AgentHandler(socketserver.StreamRequestHandler):
+    def handle(self):
+        if not self.server.is_peer_allowed(self.request):
+            return
+        for line in self.rfile:
+            try:
+                reply = self.server.dispatch(json.loads(line))
+            except Exception as e:
+                reply = {"ok": False, "error": str(e)}
+            self.wfile.write(json.dumps(reply).encode("utf-8") + b"\n")
+
+
+class AgentServer(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    daemon_threads = True
+
+    def __init__(self, path: str, ttl: int):
+        self.store = KeyStore(ttl)
+        os.makedirs(os.path.dirname(path), mode=0o700, exist_ok=True)
+        if os.path.exists(path):
+            os.remove(path)
+        old_umask = os.umask(0o177)
+        try:
+            super().__init__(path, _AgentHandler)
+        finally:
+            os.umask(old_umask)
+
+    def is_peer_allowed(self, conn) -> bool:
+        # На Linux дополнительно сверяем uid процесса на другом конце сокета
+        if not hasattr(socket, "SO_PEERCRED"):
+            return True
+        creds = conn.getsockopt(socket.SOL_SOCKET, socket.SO_PEERCRED, struct.calcsize("3i"))
+        _, uid, _ = struct.unpack("3i", creds)
+        return uid == os.getuid()
+
+    def dispatch(self, request: dict) -> dict:
+        op = request.get("op")
+        if op == "get":
+            key = self.store.get(request["id"])
+            return {"ok": True, "key": base64.b64encode(key).decode("ascii") if key else None}
+        if op == "put":
+            self.store.put(request["id"], base64.b64decode(request["key"]))
+            return {"ok": True}
+        if op == "lock":
+            self.store.clear()
+            return {"ok": True}
+        if op == "status":
+            return {"ok": True, "keys": len(self.store), "ttl": self.store.ttl}
+        if op == "stop":
+            self.store.clear()
+            threading.Thread(target=self.shutdown).start()
+            return {"ok": True}
+        return {"ok": False, "error": f"Неизвестная операция: {op}"}
+
+    def service_actions(self):
+        self.store.expire()
+
+
+def serve(ttl: int = DEFAULT_TTL, path: str = None):
+    path = path or socket_path()
+    server = AgentServer(path, ttl)
+    try:
+        server.serve_forever(poll_interval=CHECK_INTERVAL)
+    finally:
+        server.server_close()
+        if os.path.exists(path):
+            os.remove(path)
+
+
+class AgentClient:
+    """Клиент агента. Если агент не запущен, все запросы молча возвращают None"""
+
+    def __init__(self, path: str = None, timeout: float = 2.0):
+        self.path = path or socket_path()
+        self.timeout = timeout
+
+    @staticmethod
+    def key_id(salt: bytes, kdf_params: dict = None) -> str:
+        # Ключ зависит и от соли, и от параметров KDF
+        material = salt + json.dumps(kdf_params or {}, sort_keys=True).encode("utf-8")
+        return hashlib.sha256(material).hexdigest()
+
+    def _request(self, request: dict) -> Optional[dict]:
+        if not is_supported() or not os.path.exists(self.path):
+            return None
+        try:
+            with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as sock:
+                sock.settimeout(self.timeout)
+                sock.connect(self.path)
+                sock.sendall(json.dumps(request).encode("utf-8") + b"\n")
+                with sock.makefile("rb") as f:
+                    reply = json.loads(f.readline())
+        except (OSError, ValueError):
+            return None
+        return reply if reply.get("ok") else None
+
+    def is_running(self) -> bool:
+        return self._request({"op": "status"}) is not None
+
+    def get_key(self, salt: bytes, kdf_params: dict = None) -> Optional[bytes]:
+        reply = self._request({"op": "get", "id": self.key_id(salt, kdf_params)})
+        if reply is None or reply.get("key") is None:
+            return None
+        return base64.b64decode(reply["key"])
+
+    def put_key(self, salt: bytes, key: bytes, kdf_params: dict = None) -> bool:
+        request = {"op": "put", "id": self.key_id(salt, kdf_params), "key": base64.b64encode(key).decode("ascii")}
+        return self._request(request) is not None
+
+    def lock(self) -> bool:
+        return self._request({"op": "lock"}) is not None
+
+    def stop(self) -> bool:
+        return self._request({"op": "stop"}) is not None
+
+    def status(self) -> Optional[dict]:
+        return self._request({"op": "status"})
+
+
+def start_agent(ttl: int = DEFAULT_TTL, wait: float = 3.0) -> bool:
+    """Запускает агента отдельным процессом и ждёт, пока он начнёт слушать сокет"""
+    client = AgentClient()
+    if client.is_running():
+        return True
+
+    env = dict(os.environ)
+    # Каталог, из которого импортируется пакет dpo (работает и без установки)
+    src_dir = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+    env["PYTHONPATH"] = os.pathsep.join(filter(None, [src_dir, env.get("PYTHONPATH")]))
+    subprocess.Popen(
+        [sys.executable, "-m", "dpo.core.agent", "--ttl", str(ttl)],
+        env=env,
+        stdin=subprocess.DEVNULL,
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.DEVNULL,
+        start_new_session=True,
+    )
+
+    deadline = time.monotonic() + wait
+    while time.monotonic() < deadline:
+        if client.is_running():
+            return True
+        time.sleep(0.05)
+    return False
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Dev Password Organizer unlock agent")
+    parser.add_argument("--ttl", type=int, default=DEFAULT_TTL, help="Время жизни ключа, сек")
+    parser.add_argument("--socket", type=str, default=None, help="Путь к сокету")
+    args = parser.parse_args()
+    serve(args.ttl, args.socket)
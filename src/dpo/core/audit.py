@@ -0,0 +1,159 @@
+"""Аудит доступов по всему vault: повторные пароли, дубли учёток и слабые пароли.
+
+Пароли сравниваются по ключевым отпечаткам (PasswordEncryption.fingerprint), а не
+попарно: отпечаток — ключ словаря, доступы с одним паролем попадают в одну группу.
+Так же группируются учётки (хост, порт, пользователь). Индекс обновляется при каждом
+добавлении, изменении и удалении доступа, а группы, где больше одного доступа,
+хранятся отдельно — отчёт не перебирает весь vault.
+
+Сила пароля оценивается грубо: длина и log2 числа комбинаций из алфавитов классов,
+которые в нём встречаются. Словарные слова и шаблоны не распознаются, поэтому
+оценка — верхняя граница.
+"""
+import math
+import string
+from typing import Callable, Dict, List, NamedTuple, Optional, Set, Tuple
+
+MIN_LENGTH = 12
+MIN_ENTROPY_BITS = 60.0
+
+# Алфавиты для оценки: символ вне их (кириллица и т.п.) считается из алфавита размера OTHER_ALPHABET
+_ALPHABETS = tuple(frozenset(alphabet) for alphabet in (
+    string.ascii_lowercase, string.ascii_uppercase, string.digits, string.punctuation + " "))
+_KNOWN = frozenset().union(*_ALPHABETS)
+OTHER_ALPHABET = 64
+
+Key = Tuple[str, str]
+Account = Tuple[str, int, str]
+
+
+def entropy_bits(password: str) -> float:
+    """Верхняя оценка энтропии: длина × log2 суммы алфавитов встреченных классов"""
+    chars = set(password)
+    size = 0
+    for alphabet in _ALPHABETS:
+        if not alphabet.isdisjoint(chars):
+            size += len(alphabet)
+    if not chars <= _KNOWN:
+        size += OTHER_ALPHABET
+    return len(password) * math.log2(size) if size > 1 else 0.0
+
+
+def weakness(password: str, min_length: int = MIN_LENGTH, min_entropy: float = MIN_ENTROPY_BITS) -> Optional[str]:
+    """Почему пароль слабый, или None"""
+    if len(password) < min_length:
+        return f"короче {min_length} символов"
+    bits = entropy_bits(password)
+    if bits < min_entropy:
+        return f"~{bits:.0f} бит энтропии (нужно {min_entropy:.0f})"
+    return None
+
+
+class WeakPassword(NamedTuple):
+    project: str
+    name: str
+    reason: str
+
+
+class AuditReport(NamedTuple):
+    # Группы доступов с одним и тем же паролем
+    reused: List[List[Key]]
+    # Учётки (хост, порт, пользователь), заведённые больше одного раза
+    duplicates: List[Tuple[Account, List[Key]]]
+    weak: List[WeakPassword]
+
+    @property
+    def clean(self) -> bool:
+        return not (self.reused or self.duplicates or self.weak)
+
+
+class _Entry(NamedTuple):
+    secret: Optional[bytes]
+    account: Optional[Account]
+
+
+class AuditIndex:
+    """fingerprint — ключевой хэш пароля; пароли в открытом виде индекс не хранит"""
+
+    def __init__(self, fingerprint: Callable[[str], bytes], min_length: int = MIN_LENGTH,
+                 min_entropy: float = MIN_ENTROPY_BITS):
+        self._fingerprint = fingerprint
+        self.min_length = min_length
+        self.min_entropy = min_entropy
+        self._entries: Dict[Key, _Entry] = {}
+        self._by_secret: Dict[bytes, Set[Key]] = {}
+        self._by_account: Dict[Account, Set[Key]] = {}
+        # Отпечатки и учётки, у которых больше одного доступа — из них и состоит отчёт
+        self._shared_secrets: Set[bytes] = set()
+        self._shared_accounts: Set[Account] = set()
+        self._weak: Dict[Key, str] = {}
+
+    def __len__(self):
+        return len(self._entries)
+
+    # --- Обновление ---
+
+    def add(self, project_name: str, credential):
+        key = (project_name, credential.name)
+        if key in self._entries:
+            self.remove(*key)
+        # Пустой пароль — обычное дело (SSH-ключ без парольной фразы): не повтор и не слабый
+        password = credential.reveal("password")
+        secret = self._fingerprint(password) if password else None
+        account = None
+        if credential.host and credential.user:
+            account = (str(credential.host).lower(), credential.port, credential.user)
+        weak = weakness(password, self.min_length, self.min_entropy) if password else None
+
+        self._entries[key] = _Entry(secret, account)
+        if weak is not None:
+            self._weak[key] = weak
+        if secret is not None:
+            _link(self._by_secret, self._shared_secrets, secret, key)
+        if account is not None:
+            _link(self._by_account, self._shared_accounts, account, key)
+
+    def remove(self, project_name: str, credential_name: str):
+        key = (project_name, credential_name)
+        entry = self._entries.pop(key, None)
+        if entry is None:
+            return
+        self._weak.pop(key, None)
+        if entry.secret is not None:
+            _unlink(self._by_secret, self._shared_secrets, entry.secret, key)
+        if entry.account is not None:
+            _unlink(self._by_account, self._shared_accounts, entry.account, key)
+
+    def add_project(self, project):
+        for credential in project.credentials.values():
+            self.add(project.name, credential)
+
+    def remove_project(self, project_name: str):
+        for key in [k for k in self._entries if k[0] == project_name]:
+            self.remove(*key)
+
+    # --- Отчёт ---
+
+    def report(self) -> AuditReport:
+        reused = sorted(sorted(self._by_secret[secret]) for secret in self._shared_secrets)
+        # Порядок — по доступам: порты из импорта бывают и строками, кортежи учёток не сравнить
+        duplicates = sorted(((account, sorted(self._by_account[account])) for account in self._shared_accounts),
+                            key=lambda item: item[1])
+        weak = sorted(WeakPassword(*key, reason) for key, reason in self._weak.items())
+        return AuditReport(reused, duplicates, weak)
+
+
+def _link(groups: Dict, shared: Set, group, key: Key):
+    members = groups.setdefault(group, set())
+    members.add(key)
+    if len(members) > 1:
+        shared.add(group)
+
+
+def _unlink(groups: Dict, shared: Set, group, key: Key):
+    members = groups[group]
+    members.discard(key)
+    if len(members) < 2:
+        shared.discard(group)
+    if not members:
+        del groups[group]
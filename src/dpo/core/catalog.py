@@ -0,0 +1,248 @@
+"""Каталог проектов: вложенные пути и теги с быстрым отбором.
+
+Имя проекта — его путь: сегменты через "/" (acme/billing/prod). Теги — свободные
+метки проектов и доступов (prod, staging, team-a), без учёта регистра.
+
+Каждому проекту выдаётся номер, а множества проектов хранятся битовыми масками
+(int): у тега — маска проектов с этим тегом, у узла дерева путей — маска всего
+поддерева. Отбор «под путём и с тегами» — спуск по дереву на глубину пути и
+пересечение масок, без перебора всех проектов. Номера удалённых проектов
+переиспользуются, так что маски не растут от добавлений и удалений.
+
+Маска занимает бит на каждый номер, а int неизменяем: изменение маски копирует её
+целиком. Поэтому маски узлов не хранятся у каждого узла, а считаются при первом
+отборе под ним и кэшируются до изменения поддерева; маски тегов доступов, которые
+меняются с каждым доступом, так же пересчитываются из счётчиков только при запросе.
+Каталог строится пачкой: маска каждого тега собирается один раз.
+
+Пути и теги проектов — метаданные из индекса файла: каталог строится без
+расшифровки чанков. Теги доступов лежат внутри чанков, поэтому они попадают в
+каталог, только когда он строится с with_credentials (как поисковый индекс).
+"""
+from typing import Dict, Iterable, Iterator, List, Optional, Set, Tuple
+
+SEPARATOR = "/"
+
+
+def normalize_path(path: str) -> str:
+    """Путь без пустых сегментов и пробелов по краям: " acme//billing/ " -> "acme/billing" """
+    return SEPARATOR.join(segment.strip() for segment in path.split(SEPARATOR) if segment.strip())
+
+
+def path_segments(path: str) -> List[str]:
+    return [segment for segment in path.split(SEPARATOR) if segment]
+
+
+def normalize_tags(tags: Iterable[str]) -> Tuple[str, ...]:
+    """Теги в нижнем регистре, без пустых и повторов, в исходном порядке"""
+    result = []
+    for tag in tags:
+        tag = tag.strip().lower()
+        if tag and tag not in result:
+            result.append(tag)
+    return tuple(result)
+
+
+def parse_tags(text: str) -> Tuple[str, ...]:
+    """Теги из строки через запятую (ввод в CLI и TUI)"""
+    return normalize_tags(text.split(","))
+
+
+class _Node:
+    __slots__ = ("children", "pid", "mask")
+
+    def __init__(self):
+        self.children: Dict[str, "_Node"] = {}
+        # Номер проекта с путём самого узла; None — узел только промежуточный
+        self.pid: Optional[int] = None
+        # Кэш маски всего поддерева; None — не считалась или поддерево изменилось
+        self.mask: Optional[int] = None
+
+
+def _mask(ids: List[int]) -> int:
+    if len(ids) == 1:
+        return 1 << ids[0]
+    bits = bytearray(max(ids) // 8 + 1)
+    for pid in ids:
+        bits[pid >> 3] |= 1 << (pid & 7)
+    return int.from_bytes(bits, "little")
+
+
+def _bits(mask: int) -> Iterator[int]:
+    # Поиск по строке из bin() — в C; сдвиги длинного int на каждый бит копировали бы его
+    text = bin(mask)[:1:-1]
+    pid = text.find("1")
+    while pid >= 0:
+        yield pid
+        pid = text.find("1", pid + 1)
+
+
+class ProjectIndex:
+    """Дерево путей и маски тегов; обновляется теми же событиями, что и поисковый индекс"""
+
+    def __init__(self, with_credentials: bool = False):
+        self.with_credentials = with_credentials
+        self._ids: Dict[str, int] = {}
+        self._names: List[Optional[str]] = []
+        self._free: List[int] = []
+        self._root = _Node()
+        self._project_tags: Dict[str, Tuple[str, ...]] = {}
+        self._tag_masks: Dict[str, int] = {}
+        # Теги доступов: число доступов с тегом по проектам; маска проектов — кэш по этим счётчикам
+        self._credential_tags: Dict[Tuple[str, str], Tuple[str, ...]] = {}
+        self._credential_counts: Dict[str, Dict[int, int]] = {}
+        self._credential_masks: Dict[str, int] = {}
+        self._stale_masks: Set[str] = set()
+
+    def __len__(self):
+        return len(self._ids)
+
+    # --- Проекты ---
+
+    def add_project(self, project):
+        self.add_projects([project])
+
+    def add_projects(self, projects: Iterable):
+        """Добавляет проекты пачкой: маска каждого тега меняется один раз"""
+        tagged: Dict[str, List[int]] = {}
+        for project in projects:
+            if project.name in self._ids:
+                self.remove_project(project.name)
+            pid = self._free.pop() if self._free else len(self._names)
+            if pid == len(self._names):
+                self._names.append(None)
+            self._names[pid] = project.name
+            self._ids[project.name] = pid
+            node = self._root
+            node.mask = None
+            for segment in path_segments(project.name):
+                child = node.children.get(segment)
+                if child is None:
+                    child = node.children[segment] = _Node()
+                node = child
+                node.mask = None
+            node.pid = pid
+            if project.tags:
+                self._project_tags[project.name] = tuple(project.tags)
+                for tag in project.tags:
+                    tagged.setdefault(tag, []).append(pid)
+            if self.with_credentials:
+                for credential in project.credentials.values():
+                    self.add(project.name, credential)
+        for tag, ids in tagged.items():
+            self._tag_masks[tag] = self._tag_masks.get(tag, 0) | _mask(ids)
+
+    def remove_project(self, project_name: str):
+        pid = self._ids.pop(project_name, None)
+        if pid is None:
+            return
+        for key in [key for key in self._credential_tags if key[0] == project_name]:
+            self.remove(*key)
+        self._set_project_tags(project_name, pid, ())
+        self._unlink_path(self._root, path_segments(project_name))
+        self._names[pid] = None
+        self._free.append(pid)
+
+    def _unlink_path(self, node: _Node, segments: List[str]):
+        node.mask = None
+        if not segments:
+            node.pid = None
+            return
+        child = node.children.get(segments[0])
+        if child is None:
+            return
+        self._unlink_path(child, segments[1:])
+        if child.pid is None and not child.children:
+            del node.children[segments[0]]
+
+    def update_project(self, project):
+        """Теги проекта изменились (доступы не трогаются)"""
+        pid = self._ids.get(project.name)
+        if pid is not None:
+            self._set_project_tags(project.name, pid, project.tags)
+
+    def _set_project_tags(self, project_name: str, pid: int, tags: Iterable[str]):
+        bit = 1 << pid
+        for tag in self._project_tags.pop(project_name, ()):
+            mask = self._tag_masks[tag] & ~bit
+            if mask:
+                self._tag_masks[tag] = mask
+            else:
+                del self._tag_masks[tag]
+        tags = tuple(tags)
+        if tags:
+            self._project_tags[project_name] = tags
+            for tag in tags:
+                self._tag_masks[tag] = self._tag_masks.get(tag, 0) | bit
+
+    # --- Доступы ---
+
+    def add(self, project_name: str, credential):
+        key = (project_name, credential.name)
+        if key in self._credential_tags:
+            self.remove(*key)
+        pid = self._ids.get(project_name)
+        if pid is None or not credential.tags:
+            return
+        self._credential_tags[key] = credential.tags
+        for tag in credential.tags:
+            counts = self._credential_counts.setdefault(tag, {})
+            counts[pid] = counts.get(pid, 0) + 1
+            self._stale_masks.add(tag)
+
+    def remove(self, project_name: str, credential_name: str):
+        tags = self._credential_tags.pop((project_name, credential_name), None)
+        if tags is None:
+            return
+        pid = self._ids[project_name]
+        for tag in tags:
+            counts = self._credential_counts[tag]
+            counts[pid] -= 1
+            if counts[pid]:
+                continue
+            del counts[pid]
+            self._stale_masks.add(tag)
+            if not counts:
+                del self._credential_counts[tag]
+
+    # --- Запросы ---
+
+    def under(self, prefix: str = "") -> int:
+        """Маска проектов с путём prefix и всех вложенных в него (по целым сегментам)"""
+        node = self._root
+        for segment in path_segments(prefix):
+            node = node.children.get(segment)
+            if node is None:
+                return 0
+        if node.mask is None:
+            ids = []
+            stack = [node]
+            while stack:
+                current = stack.pop()
+                if current.pid is not None:
+                    ids.append(current.pid)
+                stack.extend(current.children.values())
+            node.mask = _mask(ids) if ids else 0
+        return node.mask
+
+    def tagged(self, tag: str) -> int:
+        """Маска проектов, у которых тег tag есть у самого проекта или (with_credentials) у его доступа"""
+        if tag in self._stale_masks:
+            self._stale_masks.discard(tag)
+            counts = self._credential_counts.get(tag)
+            if counts:
+                self._credential_masks[tag] = _mask(list(counts))
+            else:
+                self._credential_masks.pop(tag, None)
+        return self._tag_masks.get(tag, 0) | self._credential_masks.get(tag, 0)
+
+    def find(self, under: str = "", tags: Iterable[str] = ()) -> List[str]:
+        """Пути проектов под under, у которых есть все теги tags, по алфавиту"""
+        mask = self.under(under) if path_segments(under) else None  # None — все проекты
+        for tag in normalize_tags(tags):
+            if mask == 0:
+                break
+            mask = self.tagged(tag) if mask is None else mask & self.tagged(tag)
+        if mask is None:
+            return sorted(self._ids)
+        return sorted(self._names[pid] for pid in _bits(mask))
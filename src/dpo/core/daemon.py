@@ -0,0 +1,152 @@
+"""Демон секретов: только чтение, asyncio, Unix-сокет.
+
+Vault расшифровывается один раз при старте (и при каждом перечитывании) в
+отдельном потоке, дальше `get(project, credential)` отвечает из памяти. Протокол — JSON-строки: первым сообщением клиент
+представляется токеном ({"op": "hello", "token": ...}), затем шлёт запросы
+get/list; поле id (если есть) возвращается в ответе, так что запросы можно
+конвейеризовать по одному соединению.
+
+Клиенты и их проекты описаны в `<vault>.clients.json` (см. daemon_tokens).
+Изменения vault и списка клиентов подхватываются на лету.
+"""
+import asyncio
+import json
+import os
+from typing import Dict, List, Optional
+
+from .daemon_client import socket_path
+from .daemon_tokens import clients_path, file_stamp, read_clients, token_hash
+from .encryption import PasswordEncryption
+from .journal import journal_path
+from .models import Vault
+
+RELOAD_INTERVAL = 1.0
+
+# Доступы по проектам: название -> словарь доступа с открытыми секретами (Credential.to_dict)
+Projects = Dict[str, Dict[str, dict]]
+
+
+class SecretDaemon:
+    NOT_FOUND = "Доступ не найден"
+
+    def __init__(self, vault_path: str, encryption: PasswordEncryption, path: str = None):
+        self.vault_path = os.path.abspath(vault_path)
+        self.clients_path = clients_path(self.vault_path)
+        self.encryption = encryption
+        self.path = path or socket_path()
+        self.projects: Projects = {}
+        self.clients: Dict[str, dict] = {}
+        self._stamps = (None, None, None)
+
+    def _file_stamps(self) -> tuple:
+        # Обычное сохранение меняет только журнал изменений, снимок — при свёртке
+        return file_stamp(self.vault_path), file_stamp(journal_path(self.vault_path)), file_stamp(self.clients_path)
+
+    def _load(self):
+        """Читает vault и клиентов целиком (в потоке, чтобы не блокировать обработку запросов)"""
+        stamps = self._file_stamps()
+        vault = Vault.load_from_file(self.vault_path, encryption=self.encryption)
+        # Ответы собираются здесь же: запечатанные секреты дочитываются из файла при показе,
+        # а в обработчиках запросов не должно быть работы с диском
+        projects = {name: {cred.name: cred.to_dict() for cred in proj.credentials.values()}
+                    for name, proj in vault.projects.items()}
+        return projects, read_clients(self.clients_path), stamps
+
+    def load(self):
+        self.projects, self.clients, self._stamps = self._load()
+
+    async def _watch(self):
+        while True:
+            await asyncio.sleep(RELOAD_INTERVAL)
+            if self._file_stamps() == self._stamps:
+                continue
+            try:
+                # Старый vault обслуживает запросы, пока новый не загружен полностью
+                self.projects, self.clients, self._stamps = await asyncio.to_thread(self._load)
+                print("🔄 Хранилище перечитано")
+            except Exception as e:
+                # Повреждённая/недописанная версия или смена мастер-пароля: продолжаем со старой
+                print(f"⚠️ Не удалось перечитать хранилище: {e}")
+                self._stamps = self._file_stamps()
+
+    def _projects(self, digest: str) -> Optional[List[str]]:
+        # Права берутся заново на каждый запрос: отзыв токена действует сразу после перечитывания
+        client = self.clients.get(digest)
+        return client["projects"] if client else None
+
+    def dispatch(self, request: dict, session: dict) -> dict:
+        op = request.get("op")
+        if op == "hello":
+            digest = token_hash(str(request.get("token", "")))
+            if digest not in self.clients:
+                return {"ok": False, "error": "Неизвестный токен"}
+            session["token"] = digest
+            return {"ok": True, "client": self.clients[digest]["name"]}
+
+        if "token" not in session:
+            return {"ok": False, "error": "Сначала представьтесь токеном (hello)"}
+        allowed = self._projects(session["token"])
+        if allowed is None:
+            return {"ok": False, "error": "Токен отозван"}
+        if op == "get":
+            project = request.get("project")
+            # Чужой проект и отсутствующий доступ неразличимы для клиента
+            credentials = self.projects.get(project) if project in allowed else None
+            cred = credentials.get(request.get("credential")) if credentials is not None else None
+            if cred is None:
+                return {"ok": False, "error": self.NOT_FOUND}
+            return {"ok": True, "credential": cred}
+        if op == "list":
+            projects = {name: sorted(self.projects[name]) for name in allowed if name in self.projects}
+            return {"ok": True, "projects": projects}
+        return {"ok": False, "error": f"Неизвестная операция: {op}"}
+
+    async def _handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        session = {}
+        try:
+            while True:
+                line = await reader.readline()
+                if not line:
+                    break
+                try:
+                    request = json.loads(line)
+                    reply = self.dispatch(request, session)
+                    if "id" in request:
+                        reply["id"] = request["id"]
+                except Exception as e:
+                    reply = {"ok": False, "error": str(e)}
+                writer.write(json.dumps(reply, ensure_ascii=False).encode("utf-8") + b"\n")
+                await writer.drain()
+        except (ConnectionError, ValueError):
+            pass
+        finally:
+            writer.close()
+
+    async def serve_forever(self):
+        os.makedirs(os.path.dirname(self.path), mode=0o700, exist_ok=True)
+        if os.path.exists(self.path):
+            os.remove(self.path)
+        # Доступ к сокету — владельцу и группе; права на проекты проверяются по токену
+        old_umask = os.umask(0o117)
+        try:
+            server = await asyncio.start_unix_server(self._handle, self.path)
+        finally:
+            os.umask(old_umask)
+        watcher = asyncio.ensure_future(self._watch())
+        try:
+            async with server:
+                await server.serve_forever()
+        finally:
+            watcher.cancel()
+            if os.path.exists(self.path):
+                os.remove(self.path)
+
+
+def serve(vault_path: str, encryption: PasswordEncryption, path: str = None):
+    daemon = SecretDaemon(vault_path, encryption, path)
+    daemon.load()
+    print(f"🛰️ Демон секретов слушает {daemon.path} (Ctrl+C — остановить)")
+    try:
+        asyncio.run(daemon.serve_forever())
+    except KeyboardInterrupt:
+        pass
@@ -0,0 +1,198 @@
+"""Клиент демона секретов для приложений.
+
+Зависит только от стандартной библиотеки: сервису не нужны ни cryptography,
+ни мастер-пароль — только путь к сокету и токен, выданный `daemon-token`.
+
+    from dpo.core.daemon_client import SecretClient, AsyncSecretClient
+
+    with SecretClient() as secrets:            # токен из DPO_TOKEN
+        password = secrets.password("Backend", "Prod DB")
+
+    async with AsyncSecretClient() as secrets:
+        cred = await secrets.get("Backend", "Prod DB")
+"""
+import asyncio
+import itertools
+import json
+import os
+import socket
+from typing import Dict, List, Optional
+
+
+def socket_path() -> str:
+    """Путь к сокету: DPO_DAEMON_SOCK, затем XDG_RUNTIME_DIR, затем ~/.dev-password-organizer"""
+    if os.environ.get("DPO_DAEMON_SOCK"):
+        return os.environ["DPO_DAEMON_SOCK"]
+    base = os.environ.get("XDG_RUNTIME_DIR") or os.path.join(os.path.expanduser("~"), ".dev-password-organizer")
+    return os.path.join(base, "dpo-daemon.sock")
+
+
+def _token(token: Optional[str]) -> str:
+    token = token or os.environ.get("DPO_TOKEN")
+    if not token:
+        raise ValueError("❌ Не задан токен клиента (DPO_TOKEN)")
+    return token
+
+
+def _result(reply: dict) -> dict:
+    if not reply.get("ok"):
+        raise ValueError(f"❌ {reply.get('error', 'Ошибка демона')}")
+    return reply
+
+
+class SecretClient:
+    """Синхронный клиент: одно соединение на все запросы"""
+
+    def __init__(self, token: str = None, path: str = None, timeout: float = 2.0):
+        self.token = _token(token)
+        self.path = path or socket_path()
+        self.timeout = timeout
+        self._sock = None
+        self._file = None
+
+    def _request(self, request: dict) -> dict:
+        if self._sock is None:
+            self._connect()
+        self._sock.sendall(json.dumps(request, ensure_ascii=False).encode("utf-8") + b"\n")
+        line = self._file.readline()
+        if not line:
+            self.close()
+            raise OSError("Демон закрыл соединение")
+        return _result(json.loads(line))
+
+    def _connect(self):
+        sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        sock.settimeout(self.timeout)
+        try:
+            sock.connect(self.path)
+        except OSError:
+            sock.close()
+            raise
+        self._sock, self._file = sock, sock.makefile("rb")
+        try:
+            self._request({"op": "hello", "token": self.token})
+        except Exception:
+            self.close()
+            raise
+
+    def get(self, project: str, credential: str) -> dict:
+        """Доступ целиком: type, name, host, user, password, port и поля типа"""
+        return self._request({"op": "get", "project": project, "credential": credential})["credential"]
+
+    def password(self, project: str, credential: str) -> str:
+        return self.get(project, credential)["password"]
+
+    def list(self) -> Dict[str, List[str]]:
+        """Доступные клиенту проекты и названия доступов в них"""
+        return self._request({"op": "list"})["projects"]
+
+    def close(self):
+        if self._sock is not None:
+            self._file.close()
+            self._sock.close()
+            self._sock = self._file = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+class AsyncSecretClient:
+    """Асинхронный клиент: запросы конвейеризуются по одному соединению, ответы сопоставляются по id"""
+
+    def __init__(self, token: str = None, path: str = None, timeout: float = 2.0):
+        self.token = _token(token)
+        self.path = path or socket_path()
+        self.timeout = timeout
+        self._reader = None
+        self._writer = None
+        self._pending: Dict[int, asyncio.Future] = {}
+        self._ids = itertools.count(1)
+        self._read_task = None
+        self._connecting = None
+
+    async def _ensure_connected(self):
+        if self._writer is not None:
+            return
+        # Параллельные первые запросы ждут одного подключения
+        if self._connecting is None:
+            self._connecting = asyncio.ensure_future(self._connect())
+        try:
+            await asyncio.shield(self._connecting)
+        finally:
+            if self._connecting is not None and self._connecting.done():
+                self._connecting = None
+
+    async def _connect(self):
+        reader, writer = await asyncio.wait_for(asyncio.open_unix_connection(self.path), self.timeout)
+        self._reader, self._writer = reader, writer
+        self._read_task = asyncio.ensure_future(self._read_replies())
+        try:
+            await self._send({"op": "hello", "token": self.token})
+        except Exception:
+            await self.close()
+            raise
+
+    async def _read_replies(self):
+        error = OSError("Демон закрыл соединение")
+        try:
+            while True:
+                line = await self._reader.readline()
+                if not line:
+                    break
+                reply = json.loads(line)
+                future = self._pending.pop(reply.get("id"), None)
+                if future is not None and not future.done():
+                    future.set_result(reply)
+        except Exception as e:
+            error = e
+        for future in self._pending.values():
+            if not future.done():
+                future.set_exception(error)
+        self._pending.clear()
+        self._writer = None
+
+    async def _send(self, request: dict) -> dict:
+        request["id"] = request_id = next(self._ids)
+        future = asyncio.get_running_loop().create_future()
+        self._pending[request_id] = future
+        self._writer.write(json.dumps(request, ensure_ascii=False).encode("utf-8") + b"\n")
+        try:
+            reply = await asyncio.wait_for(future, self.timeout)
+        finally:
+            self._pending.pop(request_id, None)
+        return _result(reply)
+
+    async def _request(self, request: dict) -> dict:
+        await self._ensure_connected()
+        return await self._send(request)
+
+    async def get(self, project: str, credential: str) -> dict:
+        reply = await self._request({"op": "get", "project": project, "credential": credential})
+        return reply["credential"]
+
+    async def password(self, project: str, credential: str) -> str:
+        return (await self.get(project, credential))["password"]
+
+    async def list(self) -> Dict[str, List[str]]:
+        return (await self._request({"op": "list"}))["projects"]
+
+    async def close(self):
+        writer, self._writer = self._writer, None
+        if writer is not None:
+            writer.close()
+            try:
+                await writer.wait_closed()
+            except OSError:
+                pass
+        if self._read_task is not None:
+            await self._read_task
+            self._read_task = None
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        await self.close()
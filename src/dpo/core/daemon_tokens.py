@@ -0,0 +1,65 @@
+"""Токены клиентов демона секретов.
+
+Файл `<vault>.clients.json` хранит для каждого клиента имя, SHA-256 токена и
+список доступных проектов. Модуль не зависит от криптографии, поэтому выдача и
+отзыв токенов в CLI не загружают её.
+"""
+import hashlib
+import json
+import os
+import secrets
+from typing import Dict, List
+
+
+def clients_path(vault_path: str) -> str:
+    return f"{vault_path}.clients.json"
+
+
+def token_hash(token: str) -> str:
+    return hashlib.sha256(token.encode("utf-8")).hexdigest()
+
+
+def file_stamp(path: str):
+    try:
+        st = os.stat(path)
+    except FileNotFoundError:
+        return None
+    return st.st_ino, st.st_size, st.st_mtime_ns
+
+
+def read_clients(path: str) -> Dict[str, dict]:
+    """{sha256 токена: {"name", "projects"}}; нет файла — нет клиентов"""
+    try:
+        with open(path, encoding="utf-8") as f:
+            data = json.load(f)
+    except FileNotFoundError:
+        return {}
+    return {client["token_sha256"]: client for client in data.get("clients", [])}
+
+
+def _write_clients(path: str, clients: List[dict]):
+    tmp_path = f"{path}.tmp"
+    fd = os.open(tmp_path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+    with open(fd, "w", encoding="utf-8") as f:
+        json.dump({"clients": clients}, f, ensure_ascii=False, indent=2)
+    os.replace(tmp_path, path)
+
+
+def issue_token(vault_path: str, name: str, projects: List[str]) -> str:
+    """Создаёт (или перевыпускает) токен клиента с доступом к проектам. Токен показывается один раз"""
+    path = clients_path(vault_path)
+    clients = [c for c in read_clients(path).values() if c["name"] != name]
+    token = secrets.token_urlsafe(32)
+    clients.append({"name": name, "token_sha256": token_hash(token), "projects": sorted(set(projects))})
+    _write_clients(path, clients)
+    return token
+
+
+def revoke_token(vault_path: str, name: str) -> bool:
+    path = clients_path(vault_path)
+    clients = read_clients(path)
+    kept = [c for c in clients.values() if c["name"] != name]
+    if len(kept) == len(clients):
+        return False
+    _write_clients(path, kept)
+    return True
@@ -0,0 +1,276 @@
+import base64
+import hmac
+import os
+import struct
+import time
+from collections import OrderedDict
+from typing import Iterable, Iterator, Optional
+from cryptography.exceptions import InvalidTag
+from cryptography.fernet import Fernet
+from cryptography.hazmat.primitives import hashes
+from cryptography.hazmat.primitives.ciphers.aead import AESGCM
+from cryptography.hazmat.primitives.kdf.hkdf import HKDF
+from . import profiling
+from .errors import CorruptedFileError
+from .kdf import KDF, default_kdf
+
+# Потоковое шифрование чанков: AES-256-GCM записями по RECORD_SIZE байт открытого текста.
+#   префикс nonce (7 байт) | [длина (4 байта) | шифртекст с тегом] ...
+# nonce записи = префикс | номер записи (4 байта) | флаг последней записи (1 байт),
+# поэтому перестановка, удаление и обрезка записей ломают проверку тега.
+RECORD_SIZE = 64 * 1024
+_NONCE_PREFIX_SIZE = 7
+_RECORD_LEN = struct.Struct(">I")
+_NONCE_SUFFIX = struct.Struct(">IB")
+_STREAM_INFO = b"dev-password-organizer/stream-aesgcm/v1"
+
+# Запечатанные поля: каждый секрет — отдельный AES-256-GCM, nonce (12 байт) | шифртекст, в base64
+_SEAL_INFO = b"dev-password-organizer/field-aesgcm/v1"
+_SEAL_NONCE_SIZE = 12
+REVEAL_CACHE_SIZE = 32
+REVEAL_TTL = 60.0
+
+# Отпечатки секретов для аудита: HMAC-SHA256 отдельным подключом — без ключа vault
+# по отпечатку не перебрать пароль, а одинаковые пароли дают одинаковые отпечатки
+_FINGERPRINT_INFO = b"dev-password-organizer/fingerprint-hmac/v1"
+# Проверочное значение ключа в открытом заголовке файла: неверный пароль отличается
+# от повреждённого файла. Подобрать по нему пароль не проще, чем по самому файлу — нужен KDF
+_CHECK_INFO = b"dev-password-organizer/key-check/v1"
+_CHECK_SIZE = 16
+
+
+class StreamCipher:
+    """Шифрует и расшифровывает поток байтов записями фиксированного размера.
+
+    Ни на шифровании, ни на расшифровке не держит в памяти больше одной записи.
+    """
+
+    def __init__(self, key: bytes):
+        # Отдельный подключ: тот же мастер-ключ не используется в двух разных схемах
+        subkey = HKDF(algorithm=hashes.SHA256(), length=32, salt=None, info=_STREAM_INFO).derive(key)
+        self._aead = AESGCM(subkey)
+
+    def _nonce(self, prefix: bytes, counter: int, last: bool) -> bytes:
+        return prefix + _NONCE_SUFFIX.pack(counter, last)
+
+    def encrypt(self, pieces: Iterable[bytes]) -> Iterator[bytes]:
+        """Генератор шифртекста; pieces — куски открытого текста любого размера"""
+        prefix = os.urandom(_NONCE_PREFIX_SIZE)
+        yield prefix
+        counter = 0
+        buffer = bytearray()
+        for piece in pieces:
+            buffer += piece
+            # Запись отдаётся, только когда за ней точно есть ещё данные: последнюю помечаем флагом
+            while len(buffer) > RECORD_SIZE:
+                yield self._seal(prefix, counter, bytes(buffer[:RECORD_SIZE]), False)
+                del buffer[:RECORD_SIZE]
+                counter += 1
+        yield self._seal(prefix, counter, bytes(buffer), True)
+
+    def _seal(self, prefix: bytes, counter: int, plaintext: bytes, last: bool) -> bytes:
+        if counter >= 2 ** 32:
+            raise ValueError("Слишком большой поток для одного чанка")
+        ciphertext = self._aead.encrypt(self._nonce(prefix, counter, last), plaintext, None)
+        return _RECORD_LEN.pack(len(ciphertext)) + ciphertext
+
+    def decrypt(self, data) -> Iterator[bytes]:
+        """Генератор открытого текста по записям; data — bytes, memoryview или mmap"""
+        view = memoryview(data)
+        try:
+            prefix = bytes(view[:_NONCE_PREFIX_SIZE])
+            pos = _NONCE_PREFIX_SIZE
+            counter = 0
+            while True:
+                if pos + _RECORD_LEN.size > len(view):
+                    raise CorruptedFileError("Поток обрезан")
+                (length,) = _RECORD_LEN.unpack(view[pos:pos + _RECORD_LEN.size])
+                pos += _RECORD_LEN.size
+                record = view[pos:pos + length]
+                pos += length
+                last = pos >= len(view)
+                try:
+                    yield self._aead.decrypt(self._nonce(prefix, counter, last), record, None)
+                except InvalidTag:
+                    raise CorruptedFileError("Поток повреждён или изменён") from None
+                finally:
+                    record.release()
+                if last:
+                    return
+                counter += 1
+        finally:
+            view.release()
+
+
+class Sealed:
+    """Запечатанное значение секретного поля: в памяти лежит только шифртекст.
+
+    Загруженное из файла значение может ещё не иметь и шифртекста: тогда это номер
+    index в хранилище секретов store, которое прочитает их при первом обращении.
+    """
+    __slots__ = ("_token", "sealer", "_store", "_index")
+
+    def __init__(self, token: Optional[str], sealer: "FieldSealer", store=None, index: int = 0):
+        self._token = token
+        self.sealer = sealer
+        self._store = store
+        self._index = index
+
+    @property
+    def token(self) -> str:
+        if self._token is None:
+            self._token = self._store.token(self._index)
+            self._store = None
+        return self._token
+
+    def reveal(self) -> str:
+        return self.sealer.open(self.token)
+
+    def __eq__(self, other):
+        return isinstance(other, Sealed) and other.token == self.token
+
+    def __hash__(self):
+        return hash(self.token)
+
+    def __repr__(self):
+        return "Sealed(***)"
+
+
+class FieldSealer:
+    """Шифрует секреты по одному и расшифровывает их по требованию.
+
+    Недавно показанные значения держатся в небольшом LRU-кэше не дольше ttl секунд
+    (cache_size=0 — без кэша); forget() сбрасывает кэш сразу.
+    """
+
+    def __init__(self, key: bytes, cache_size: int = REVEAL_CACHE_SIZE, ttl: float = REVEAL_TTL):
+        subkey = HKDF(algorithm=hashes.SHA256(), length=32, salt=None, info=_SEAL_INFO).derive(key)
+        self._aead = AESGCM(subkey)
+        self.cache_size = cache_size
+        self.ttl = ttl
+        self._cache: "OrderedDict[str, tuple]" = OrderedDict()
+
+    def seal(self, value: str) -> Sealed:
+        nonce = os.urandom(_SEAL_NONCE_SIZE)
+        data = nonce + self._aead.encrypt(nonce, value.encode("utf-8"), None)
+        return Sealed(base64.b64encode(data).decode("ascii"), self)
+
+    def open(self, token: str) -> str:
+        item = self._cache.get(token)
+        now = time.monotonic()
+        if item is not None:
+            if item[1] > now:
+                self._cache.move_to_end(token)
+                return item[0]
+            del self._cache[token]
+
+        data = base64.b64decode(token)
+        try:
+            value = self._aead.decrypt(data[:_SEAL_NONCE_SIZE], data[_SEAL_NONCE_SIZE:], None).decode("utf-8")
+        except InvalidTag:
+            raise CorruptedFileError("Запечатанное поле повреждено или изменено") from None
+        if self.cache_size > 0:
+            self._cache[token] = (value, now + self.ttl)
+            if len(self._cache) > self.cache_size:
+                self._cache.popitem(last=False)
+        return value
+
+    def forget(self):
+        self._cache.clear()
+
+    def json_hook(self, obj: dict):
+        """object_hook для json.loads: {"sealed": token} -> Sealed"""
+        token = obj.get("sealed")
+        return Sealed(token, self) if token is not None and len(obj) == 1 else obj
+
+
+def sealed_to_json(value):
+    """default для json.dumps: Sealed пишется как {"sealed": token}"""
+    if isinstance(value, Sealed):
+        return {"sealed": value.token}
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+
+class PasswordEncryption:
+    def __init__(self, master_password: str, salt: bytes = None, key: bytes = None, kdf: KDF = None):
+        # Если соль не передана, генерируем новую (для сохранения)
+        # Если передана — используем её (для загрузки)
+        self.salt = salt if salt else os.urandom(16)
+        # Параметры KDF записываются в заголовок файла вместе с солью
+        self.kdf = kdf if kdf is not None else default_kdf()
+
+        # Уже выведенный ключ (например, от агента разблокировки) позволяет пропустить KDF
+        if key is None:
+            key = self.derive_key(master_password, self.salt, self.kdf)
+        self.key = key
+        self.cipher = Fernet(base64.urlsafe_b64encode(key))
+        self._stream = None
+        self._sealer = None
+        self._fingerprint_key = None
+
+    @staticmethod
+    def derive_key(master_password: str, salt: bytes, kdf: KDF = None) -> bytes:
+        # Генерируем ключ из пароля и соли
+        kdf = kdf if kdf is not None else default_kdf()
+        with profiling.span("kdf", kdf=kdf.name):
+            return kdf.derive(master_password.encode('utf-8'), salt)
+
+    def encrypt(self, data: str) -> bytes:
+        with profiling.span("encrypt", bytes=len(data)):
+            return self.cipher.encrypt(data.encode('utf-8'))
+
+    def decrypt(self, token: bytes) -> str:
+        with profiling.span("decrypt", bytes=len(token)):
+            return self.cipher.decrypt(token).decode('utf-8')
+
+    @property
+    def stream(self) -> StreamCipher:
+        """Потоковый AEAD для больших чанков (Fernet требует держать весь токен в памяти)"""
+        if self._stream is None:
+            self._stream = StreamCipher(self.key)
+        return self._stream
+
+    @property
+    def sealer(self) -> FieldSealer:
+        """Шифрование отдельных секретных полей (режим запечатанных паролей)"""
+        if self._sealer is None:
+            self._sealer = FieldSealer(self.key)
+        return self._sealer
+
+    def fingerprint(self, value: str) -> bytes:
+        """Ключевой хэш секрета (аудит повторов): сравнивать пароли, не храня их в открытом виде"""
+        if self._fingerprint_key is None:
+            self._fingerprint_key = HKDF(algorithm=hashes.SHA256(), length=32, salt=None,
+                                         info=_FINGERPRINT_INFO).derive(self.key)
+        return hmac.digest(self._fingerprint_key, value.encode("utf-8"), "sha256")
+
+    def encrypt_stream(self, pieces: Iterable[bytes]) -> Iterator[bytes]:
+        return profiling.timed("encrypt", self.stream.encrypt(pieces))
+
+    def decrypt_stream(self, data) -> Iterator[bytes]:
+        return profiling.timed("decrypt", self.stream.decrypt(data))
+
+    def get_salt(self) -> bytes:
+        return self.salt
+
+    def key_check(self) -> str:
+        """Проверочное значение ключа для открытого заголовка файла"""
+        check = HKDF(algorithm=hashes.SHA256(), length=_CHECK_SIZE, salt=None, info=_CHECK_INFO).derive(self.key)
+        return base64.b64encode(check).decode("ascii")
+
+    def matches_check(self, check: str) -> bool:
+        return hmac.compare_digest(self.key_check(), check)
+
+    def check_password(self, master_password: str) -> bool:
+        """Проверяет, что пароль даёт тот же ключ (повторный вывод через KDF)"""
+        return hmac.compare_digest(self.derive_key(master_password, self.salt, self.kdf), self.key)
+
+    @classmethod
+    def from_salt_and_password(cls, master_password: str, salt: bytes, kdf: KDF = None):
+        """Создаёт экземпляр для расшифровки с известной солью"""
+        return cls(master_password, salt, kdf=kdf)
+
+    @classmethod
+    def from_key(cls, key: bytes, salt: bytes, kdf: KDF = None):
+        """Создаёт экземпляр из готового ключа без повторного вывода через KDF"""
+        return cls(None, salt, key=key, kdf=kdf)
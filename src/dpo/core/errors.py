@@ -0,0 +1,21 @@
+"""Ошибки открытия хранилища.
+
+Все — подклассы ValueError: код, который ловит ValueError, работает как раньше.
+Сообщения не содержат данных из файла — только причину.
+"""
+
+
+class VaultError(ValueError):
+    """Хранилище не открывается"""
+
+
+class WrongPasswordError(VaultError):
+    """Ключ не подходит: неверный мастер-пароль (или ключ от другого хранилища)"""
+
+
+class CorruptedFileError(VaultError):
+    """Файл обрезан или изменён: структура не сходится или не проходит проверка целостности"""
+
+
+class SchemaError(VaultError):
+    """Файл расшифрован, но его содержимое не в том формате (или версия новее поддерживаемой)"""
@@ -0,0 +1,246 @@
+"""Генератор паролей и парольных фраз.
+
+Случайность берётся только из `secrets` и пачками: на тысячи паролей уходит несколько
+системных вызовов, а не по одному на символ. Байт превращается в символ выборкой
+с отклонением: для алфавита из n символов годятся байты меньше 256 - 256 % n, поэтому
+ни один символ не выпадает чаще других. Отбрасывание и замена байтов делаются
+bytes.translate — на скорости C.
+
+Политика пароля: длина, классы символов, минимум символов каждого класса, исключение
+похожих символов (I/l/1, O/0). Пароль, который не прошёл минимумы, отбрасывается целиком,
+поэтому все подходящие пароли равновероятны, а энтропия — ровно log2 их числа. Если
+политика пропускает слишком малую долю случайных строк, число символов каждого класса
+выбирается сразу с нужными весами (см. PasswordPolicy._generate_exact).
+
+Парольная фраза — слова из встроенного словаря wordlist.txt (2048 слов — 11 бит на слово).
+"""
+import math
+import os
+import secrets
+import string
+from functools import lru_cache
+from typing import Dict, List, Optional, Sequence, Tuple
+
+CHARACTER_CLASSES: Dict[str, str] = {
+    "lower": string.ascii_lowercase,
+    "upper": string.ascii_uppercase,
+    "digits": string.digits,
+    "symbols": "!#$%&*+-=?@^_~()[]{}<>,.:;/",
+}
+# Символы, которые легко перепутать при чтении с экрана и наборе
+LOOKALIKES = "Il1|O0o"
+
+DEFAULT_LENGTH = 20
+MAX_LENGTH = 256
+# Сколько символов каждого выбранного класса должно быть в пароле, если не указано иное
+DEFAULT_MIN_COUNT = 1
+DEFAULT_WORDS = 6
+WORDLIST_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "wordlist.txt")
+
+# Если подходит меньше этой доли случайных строк, пароли не отбрасываются, а собираются по классам
+MIN_ACCEPTANCE = 0.05
+POOL_SIZE = 64 * 1024
+
+
+@lru_cache(maxsize=64)
+def _sampling_table(alphabet: bytes) -> Tuple[bytes, bytes, int]:
+    """Таблица translate «байт -> символ» и байты, которые отбрасываются, чтобы не было смещения"""
+    n = len(alphabet)
+    limit = 256 - 256 % n
+    return bytes(alphabet[b % n] for b in range(256)), bytes(range(limit, 256)), limit
+
+
+@lru_cache(maxsize=1)
+def load_wordlist(path: str = WORDLIST_PATH) -> Tuple[str, ...]:
+    with open(path, encoding="utf-8") as f:
+        return tuple(line.strip() for line in f if line.strip())
+
+
+class RandomPool:
+    """Случайные байты из secrets.token_bytes, запрашиваемые у ОС пачками по pool_size"""
+
+    def __init__(self, pool_size: int = POOL_SIZE):
+        self.pool_size = pool_size
+        self._buf = b""
+        self._pos = 0
+
+    def take(self, n: int) -> bytes:
+        if self._pos + n > len(self._buf):
+            self._buf = self._buf[self._pos:] + secrets.token_bytes(max(n, self.pool_size))
+            self._pos = 0
+        chunk = self._buf[self._pos:self._pos + n]
+        self._pos += n
+        return chunk
+
+    def below(self, n: int) -> int:
+        """Равновероятное целое из [0, n), в том числе для очень больших n"""
+        bits = (n - 1).bit_length()
+        size = (bits + 7) // 8
+        mask = (1 << bits) - 1
+        while True:
+            value = int.from_bytes(self.take(size), "big") & mask
+            if value < n:
+                return value
+
+    def choices(self, alphabet: bytes, k: int) -> bytes:
+        """k независимых равновероятных символов алфавита (не длиннее 256 символов)"""
+        table, rejected, limit = _sampling_table(alphabet)
+        out = b""
+        while len(out) < k:
+            # С запасом на отброшенные байты: обычно хватает одного прохода
+            raw = self.take((k - len(out)) * 256 // limit + 16)
+            out += raw.translate(table, rejected)
+        return out[:k]
+
+    def indices(self, n: int, k: int) -> List[int]:
+        """k независимых равновероятных чисел из [0, n) для n до 65536 (по два байта на число)"""
+        limit = 65536 - 65536 % n
+        out: List[int] = []
+        while len(out) < k:
+            raw = self.take(((k - len(out)) * 65536 // limit + 4) * 2)
+            out.extend(value % n for value in memoryview(raw).cast("H") if value < limit)
+        return out[:k]
+
+
+class PasswordPolicy:
+    """Политика пароля.
+
+    classes — классы символов из CHARACTER_CLASSES; min_counts — минимум символов класса
+    (по умолчанию DEFAULT_MIN_COUNT для каждого выбранного класса, 0 — класс не обязателен).
+    exclude_lookalikes убирает LOOKALIKES, exclude — любые другие символы.
+    """
+
+    def __init__(self, length: int = DEFAULT_LENGTH, classes: Sequence[str] = tuple(CHARACTER_CLASSES),
+                 min_counts: Optional[Dict[str, int]] = None, exclude_lookalikes: bool = False,
+                 exclude: str = ""):
+        min_counts = dict(min_counts or {})
+        names = list(dict.fromkeys([*classes, *(name for name, count in min_counts.items() if count > 0)]))
+        unknown = [name for name in [*names, *min_counts] if name not in CHARACTER_CLASSES]
+        if unknown:
+            raise ValueError(f"Неизвестный класс символов '{unknown[0]}' (есть: {', '.join(CHARACTER_CLASSES)})")
+        if not names:
+            raise ValueError("Нужен хотя бы один класс символов")
+        if not 1 <= length <= MAX_LENGTH:
+            raise ValueError(f"Длина пароля — от 1 до {MAX_LENGTH}")
+
+        removed = set(exclude) | (set(LOOKALIKES) if exclude_lookalikes else set())
+        self.alphabets: Dict[str, bytes] = {}
+        for name in names:
+            chars = "".join(c for c in CHARACTER_CLASSES[name] if c not in removed)
+            if not chars:
+                raise ValueError(f"В классе '{name}' не осталось символов")
+            self.alphabets[name] = chars.encode("ascii")
+        self.length = length
+        self.min_counts = {name: min_counts.get(name, DEFAULT_MIN_COUNT) for name in names}
+        if sum(self.min_counts.values()) > length:
+            raise ValueError("Сумма минимумов по классам больше длины пароля")
+        self.alphabet = b"".join(self.alphabets.values())
+        self._counts: Optional[List[List[int]]] = None
+
+    @property
+    def counts(self) -> List[List[int]]:
+        """counts[i][j] — число строк длины j из первых i классов, проходящих их минимумы"""
+        if self._counts is None:
+            table = [[1] + [0] * self.length]
+            for name, alphabet in self.alphabets.items():
+                size, minimum, previous = len(alphabet), self.min_counts[name], table[-1]
+                table.append([
+                    sum(math.comb(j, k) * size ** k * previous[j - k] for k in range(minimum, j + 1))
+                    for j in range(self.length + 1)
+                ])
+            self._counts = table
+        return self._counts
+
+    @property
+    def entropy_bits(self) -> float:
+        """log2 числа паролей, которые может выдать политика (все равновероятны)"""
+        if not any(self.min_counts.values()):
+            return self.length * math.log2(len(self.alphabet))
+        return math.log2(self.counts[-1][self.length])
+
+    @property
+    def acceptance(self) -> float:
+        """Доля случайных строк из общего алфавита, которые проходят минимумы"""
+        if not any(self.min_counts.values()):
+            return 1.0
+        return self.counts[-1][self.length] / len(self.alphabet) ** self.length
+
+    def generate(self, count: int = 1, pool: Optional[RandomPool] = None) -> List[str]:
+        if count < 1:
+            raise ValueError("Количество паролей — от 1")
+        pool = pool or RandomPool()
+        if self.acceptance >= MIN_ACCEPTANCE:
+            return self._generate_rejecting(count, pool)
+        return [self._generate_exact(pool) for _ in range(count)]
+
+    def _generate_rejecting(self, count: int, pool: RandomPool) -> List[str]:
+        length = self.length
+        checks = [(self.alphabets[name], minimum) for name, minimum in self.min_counts.items() if minimum > 0]
+        result: List[str] = []
+        while len(result) < count:
+            # С запасом на пароли, которые не пройдут минимумы
+            batch = int((count - len(result)) / self.acceptance) + 1
+            data = pool.choices(self.alphabet, batch * length)
+            for start in range(0, len(data), length):
+                candidate = data[start:start + length]
+                # Символов класса — сколько байт убирает translate с этим классом в delete
+                if all(length - len(candidate.translate(None, chars)) >= minimum for chars, minimum in checks):
+                    result.append(candidate.decode("ascii"))
+        return result[:count]
+
+    def _generate_exact(self, pool: RandomPool) -> str:
+        """Без отбрасывания: раскладка по классам выбирается с весом числа паролей с такой раскладкой"""
+        names = list(self.alphabets)
+        labels: List[int] = []
+        remaining = self.length
+        for i in range(len(names), 0, -1):
+            name = names[i - 1]
+            size, previous = len(self.alphabets[name]), self.counts[i - 1]
+            r = pool.below(self.counts[i][remaining])
+            for k in range(self.min_counts[name], remaining + 1):
+                weight = math.comb(remaining, k) * size ** k * previous[remaining - k]
+                if r < weight:
+                    break
+                r -= weight
+            labels.extend([i - 1] * k)
+            remaining -= k
+        # Равновероятная расстановка классов по позициям (Фишер — Йетс)
+        for i in range(len(labels) - 1, 0, -1):
+            j = pool.below(i + 1)
+            labels[i], labels[j] = labels[j], labels[i]
+        chars = [iter(pool.choices(self.alphabets[name], labels.count(i))) for i, name in enumerate(names)]
+        return bytes(next(chars[label]) for label in labels).decode("ascii")
+
+
+class PassphrasePolicy:
+    """Парольная фраза из words случайных слов словаря (по умолчанию встроенного)"""
+
+    def __init__(self, words: int = DEFAULT_WORDS, separator: str = "-", capitalize: bool = False,
+                 wordlist: Optional[Sequence[str]] = None):
+        if words < 1:
+            raise ValueError("Нужно хотя бы одно слово")
+        self.wordlist = tuple(wordlist) if wordlist is not None else load_wordlist()
+        if not 2 <= len(set(self.wordlist)) == len(self.wordlist) <= 65536:
+            raise ValueError("Словарь — от 2 до 65536 разных слов")
+        self.words = words
+        self.separator = separator
+        self.capitalize = capitalize
+
+    @property
+    def entropy_bits(self) -> float:
+        return self.words * math.log2(len(self.wordlist))
+
+    def generate(self, count: int = 1, pool: Optional[RandomPool] = None) -> List[str]:
+        if count < 1:
+            raise ValueError("Количество парольных фраз — от 1")
+        pool = pool or RandomPool()
+        words = [self.wordlist[i] for i in pool.indices(len(self.wordlist), count * self.words)]
+        if self.capitalize:
+            words = [word.capitalize() for word in words]
+        return [self.separator.join(words[start:start + self.words])
+                for start in range(0, len(words), self.words)]
+
+
+def generate_password(policy: Optional[PasswordPolicy] = None) -> str:
+    """Один пароль по политике (по умолчанию — 20 символов всех классов)"""
+    return (policy or PasswordPolicy()).generate(1)[0]
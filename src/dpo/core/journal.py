@@ -0,0 +1,304 @@
+"""Журнал изменений хранилища: зашифрованный, только дописывается.
+
+Файл `<vault>.journal` лежит рядом со снимком (самим файлом хранилища). Каждое
+сохранение дописывает в журнал одну запись с операциями над доступами, а снимок
+время от времени догоняет журнал (свёртка, см. Vault.fold). Сам журнал при свёртке
+не укорачивается: это история, по которой работают `history` и `restore`.
+
+Формат:
+  MAGIC | версия (1 байт) | длина заголовка (4 байта) | заголовок JSON (открытый: id журнала, соль)
+  запись 1 | запись 2 | ...
+Запись — данные, за ними трейлер:
+  RECORD_MAGIC | тип (1 байт) | номер (8 байт) | время, мс (8 байт) | смещение начала данных (8 байт)
+
+Данные записи операций (KIND_OPS) — потоковый AES-GCM поверх JSON Lines: первая строка
+повторяет номер и время из трейлера (так открытые поля проверяются при расшифровке),
+дальше по строке на операцию: [OP_PROJECT, проект, описание, сброс, теги],
+[OP_ADD | OP_UPDATE, проект, [строки доступов]], [OP_DELETE, проект, [названия]].
+Контрольная точка (KIND_CHECKPOINT) — копия чанков снимка, индекс и футер в формате
+файла хранилища (см. storage), её проекты читаются тем же кодом, что и снимок.
+
+Трейлер пишется после fsync данных: оборванная дозапись оставляет хвост без трейлера,
+его отрезает следующая запись. Дописывает журнал только владелец блокировки хранилища.
+"""
+import base64
+import itertools
+import json
+import mmap
+import os
+import struct
+import time
+from typing import Iterable, Iterator, List, NamedTuple, Optional, Tuple
+
+from . import profiling, storage
+from .encryption import sealed_to_json
+from .errors import CorruptedFileError, SchemaError
+
+MAGIC = b"DPOJ"
+FORMAT_VERSION = 1
+RECORD_MAGIC = b"DPOR"
+
+KIND_OPS = 1
+KIND_CHECKPOINT = 2
+
+OP_PROJECT = "project"
+OP_ADD = "add"
+OP_UPDATE = "update"
+OP_DELETE = "delete"
+
+_PREAMBLE = struct.Struct(">4sBI")
+_TRAILER = struct.Struct(">4sBQQQ")
+
+
+def journal_path(vault_path: str) -> str:
+    return f"{vault_path}.journal"
+
+
+class Record(NamedTuple):
+    """Запись журнала по трейлеру: данные лежат в [start, end), трейлер — сразу за ними"""
+    kind: int
+    seq: int
+    time_ms: int
+    start: int
+    end: int
+
+    @property
+    def time(self) -> float:
+        return self.time_ms / 1000
+
+    @property
+    def size(self) -> int:
+        return self.end - self.start
+
+
+def _stat_stamp(path: str):
+    try:
+        st = os.stat(path)
+    except FileNotFoundError:
+        return None
+    return st.st_ino, st.st_size, st.st_mtime_ns
+
+
+def _read_header(path: str) -> Tuple[dict, int]:
+    with open(path, "rb") as f:
+        preamble = f.read(_PREAMBLE.size)
+        if len(preamble) < _PREAMBLE.size:
+            raise CorruptedFileError("Журнал повреждён")
+        magic, version, header_len = _PREAMBLE.unpack(preamble)
+        if magic != MAGIC:
+            raise CorruptedFileError("Неизвестный формат журнала")
+        if version > FORMAT_VERSION:
+            raise SchemaError(f"Версия журнала {version} не поддерживается")
+        header = json.loads(f.read(header_len).decode("utf-8"))
+    header["salt"] = base64.b64decode(header["salt"])
+    return header, _PREAMBLE.size + header_len
+
+
+class Journal:
+    def __init__(self, path: str, header: dict, data_start: int):
+        self.path = path
+        self.id: str = header["id"]
+        self.salt: bytes = header["salt"]
+        self._data_start = data_start
+        # Конец последней целой записи и её номер; _stamp — чтобы замечать чужие дозаписи
+        self.end = data_start
+        self.last_seq = 0
+        self._stamp = None
+        # Временный журнал никто не читает до install(): он сбрасывается на диск один раз там
+        self.temporary = False
+
+    @classmethod
+    def create(cls, vault_path: str, salt: bytes, journal_id: Optional[str] = None,
+               temporary: bool = False) -> "Journal":
+        """Новый пустой журнал. temporary — во временном файле, который подменит журнал через install()"""
+        path = journal_path(vault_path)
+        header = {"id": journal_id or os.urandom(16).hex(), "salt": base64.b64encode(salt).decode("ascii")}
+        header_bytes = json.dumps(header).encode("utf-8")
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, "wb") as f:
+            f.write(_PREAMBLE.pack(MAGIC, FORMAT_VERSION, len(header_bytes)))
+            f.write(header_bytes)
+            storage.sync_file(f)
+        journal = cls(tmp_path, {"id": header["id"], "salt": salt}, _PREAMBLE.size + len(header_bytes))
+        if temporary:
+            journal.temporary = True
+            journal.refresh()
+        else:
+            journal.install()
+        return journal
+
+    def install(self):
+        """Атомарно ставит временный журнал на место основного"""
+        path = self.path[:-len(".tmp")]
+        try:
+            if self.temporary:
+                with open(self.path, "r+b") as f:
+                    storage.sync_file(f)
+            os.replace(self.path, path)
+        except FileNotFoundError:
+            pass  # его уже поставил процесс, открывший хранилище сразу после замены снимка (см. open)
+        self.path = path
+        self.temporary = False
+        self._stamp = None
+        self.refresh()
+
+    @classmethod
+    def open(cls, vault_path: str, journal_id: str, salt: bytes) -> Optional["Journal"]:
+        """Открывает журнал снимка; None — журнала нет или он от другого хранилища"""
+        path = journal_path(vault_path)
+        tmp_path = f"{path}.tmp"
+        try:
+            header, data_start = _read_header(path)
+        except FileNotFoundError:
+            header, data_start = None, 0
+        if (header is None or (header["id"], header["salt"]) != (journal_id, salt)) and os.path.exists(tmp_path):
+            # Смену ключа прервали после замены снимка: журнал под новым ключом уже готов
+            tmp_header, _ = _read_header(tmp_path)
+            if (tmp_header["id"], tmp_header["salt"]) == (journal_id, salt):
+                os.replace(tmp_path, path)
+                header, data_start = _read_header(path)
+        if header is None or (header["id"], header["salt"]) != (journal_id, salt):
+            return None
+        journal = cls(path, header, data_start)
+        journal.refresh()
+        return journal
+
+    # --- Чтение ---
+
+    def changed(self) -> bool:
+        return _stat_stamp(self.path) != self._stamp
+
+    def refresh(self):
+        """Находит конец журнала заново, если его дописал другой процесс"""
+        stamp = _stat_stamp(self.path)
+        if stamp == self._stamp:
+            return
+        if stamp is None or (self._stamp is not None and stamp[0] != self._stamp[0]):
+            raise ValueError("❌ Журнал изменений заменён другим процессом — откройте хранилище заново")
+        with open(self.path, "rb") as f:
+            last = self._last_record(f, stamp[1])
+        self.end = last.end + _TRAILER.size if last is not None else self._data_start
+        self.last_seq = last.seq if last is not None else 0
+        self._stamp = stamp
+
+    def _read_trailer(self, f, pos: int) -> Optional[Record]:
+        if pos < self._data_start:
+            return None
+        f.seek(pos)
+        raw = f.read(_TRAILER.size)
+        if len(raw) < _TRAILER.size:
+            return None
+        magic, kind, seq, time_ms, start = _TRAILER.unpack(raw)
+        if magic != RECORD_MAGIC or not self._data_start <= start <= pos:
+            return None
+        return Record(kind, seq, time_ms, start, pos)
+
+    def _trailer_at(self, f, pos: int) -> Optional[Record]:
+        """Трейлер в позиции pos, если он согласован с предыдущей записью (а не байты посреди данных)"""
+        record = self._read_trailer(f, pos)
+        if record is None:
+            return None
+        if record.start == self._data_start:
+            return record if record.seq == 1 else None
+        previous = self._read_trailer(f, record.start - _TRAILER.size)
+        return record if previous is not None and previous.seq == record.seq - 1 else None
+
+    def _last_record(self, f, size: int) -> Optional[Record]:
+        record = self._trailer_at(f, size - _TRAILER.size)
+        if record is not None:
+            return record
+        if size <= self._data_start:
+            return None
+        # Хвост — оборванная дозапись: ищем последний целый трейлер
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            pos = mm.rfind(RECORD_MAGIC, self._data_start, size - _TRAILER.size + len(RECORD_MAGIC))
+            while pos >= 0:
+                record = self._trailer_at(f, pos)
+                if record is not None:
+                    return record
+                pos = mm.rfind(RECORD_MAGIC, self._data_start, pos)
+        return None
+
+    def iter_back(self) -> Iterator[Record]:
+        """Записи от последней к первой (читаются только трейлеры)"""
+        with open(self.path, "rb") as f:
+            pos = self.end
+            while pos > self._data_start:
+                record = self._read_trailer(f, pos - _TRAILER.size)
+                if record is None:
+                    raise CorruptedFileError("Журнал повреждён")
+                yield record
+                pos = record.start
+
+    def records_after(self, seq: int) -> List[Record]:
+        """Записи с номером больше seq, по порядку"""
+        return list(itertools.takewhile(lambda record: record.seq > seq, self.iter_back()))[::-1]
+
+    def read_ops(self, record: Record, encryption, object_hook=None) -> List[list]:
+        """Операции записи; object_hook превращает запечатанные поля в Sealed"""
+        with storage.map_segment(self.path, record.start, record.size) as view:
+            pieces = encryption.decrypt_stream(view)
+            try:
+                lines = storage.iter_lines(pieces)
+                if json.loads(next(lines, b"null")) != {"seq": record.seq, "t": record.time_ms}:
+                    raise CorruptedFileError("Запись журнала не совпадает со своим трейлером")
+                with profiling.span("parse"):
+                    return [json.loads(line, object_hook=object_hook) for line in lines]
+            finally:
+                pieces.close()
+
+    def read_checkpoint(self, record: Record, encryption) -> dict:
+        """Индекс контрольной точки: проекты со смещениями чанков внутри файла журнала"""
+        with open(self.path, "rb") as f:
+            index = storage.read_index_before(f, record.end, encryption)
+        if index.get("seq") != record.seq or index.get("t") != record.time_ms:
+            raise CorruptedFileError("Контрольная точка не совпадает со своим трейлером")
+        return index
+
+    # --- Запись (под блокировкой хранилища) ---
+
+    def _begin(self, f, like: Optional[Record]) -> Tuple[int, int]:
+        # Отрезаем хвост оборванной прошлой записи, если он был
+        f.seek(self.end)
+        f.truncate()
+        if like is not None:
+            return like.seq, like.time_ms  # перенос записи при смене ключа
+        return self.last_seq + 1, int(time.time() * 1000)
+
+    def _sync(self, f):
+        if self.temporary:
+            f.flush()
+        else:
+            storage.sync_file(f)
+
+    def _finish(self, f, kind: int, seq: int, time_ms: int, start: int) -> Record:
+        self._sync(f)
+        # Трейлер — последним: до него запись не видна читателям
+        end = f.tell()
+        f.write(_TRAILER.pack(RECORD_MAGIC, kind, seq, time_ms, start))
+        self._sync(f)
+        self.end = f.tell()
+        self.last_seq = seq
+        self._stamp = _stat_stamp(self.path)
+        return Record(kind, seq, time_ms, start, end)
+
+    def append_ops(self, encryption, ops: Iterable[list], like: Optional[Record] = None) -> Record:
+        with open(self.path, "r+b") as f:
+            seq, time_ms = self._begin(f, like)
+            head = json.dumps({"seq": seq, "t": time_ms}).encode("utf-8") + b"\n"
+            lines = profiling.timed("serialize", (
+                json.dumps(op, ensure_ascii=False, default=sealed_to_json).encode("utf-8") + b"\n" for op in ops))
+            for block in encryption.encrypt_stream(itertools.chain([head], lines)):
+                f.write(block)
+            return self._finish(f, KIND_OPS, seq, time_ms, self.end)
+
+    def append_checkpoint(self, encryption, chunks: Iterable[Tuple[dict, Iterable[bytes]]],
+                          extra: Optional[dict] = None, like: Optional[Record] = None) -> Record:
+        """Пишет контрольную точку: chunks — (запись индекса, блоки зашифрованного чанка)"""
+        with open(self.path, "r+b") as f:
+            seq, time_ms = self._begin(f, like)
+            writer = storage.ChunkWriter(f)
+            for entry, blocks in chunks:
+                writer.write_stream(entry, blocks)
+            writer.finish(encryption, {**(extra or {}), "seq": seq, "t": time_ms})
+            return self._finish(f, KIND_CHECKPOINT, seq, time_ms, self.end)
@@ -0,0 +1,168 @@
+"""Функции вывода ключа из мастер-пароля.
+
+Параметры KDF хранятся в открытом заголовке файла, поэтому каждый vault
+может использовать свою стоимость, подобранную под конкретную машину.
+"""
+import time
+from abc import ABC, abstractmethod
+from typing import Dict, List, Optional, Type
+
+from cryptography.hazmat.primitives import hashes
+from cryptography.hazmat.primitives.kdf.pbkdf2 import PBKDF2HMAC
+from cryptography.hazmat.primitives.kdf.scrypt import Scrypt
+
+try:
+    from cryptography.hazmat.primitives.kdf.argon2 import Argon2id
+except ImportError:  # cryptography < 44
+    Argon2id = None
+
+KEY_LENGTH = 32
+
+
+class KDF(ABC):
+    """Базовый класс: name — идентификатор в заголовке, params — параметры стоимости"""
+    name = ""
+
+    @abstractmethod
+    def derive(self, password: bytes, salt: bytes) -> bytes:
+        ...
+
+    @property
+    @abstractmethod
+    def params(self) -> dict:
+        ...
+
+    def to_dict(self) -> dict:
+        return {"name": self.name, **self.params}
+
+    def __eq__(self, other):
+        return isinstance(other, KDF) and self.to_dict() == other.to_dict()
+
+    def __str__(self):
+        params = ", ".join(f"{k}={v}" for k, v in self.params.items())
+        return f"{self.name} ({params})"
+
+    @classmethod
+    @abstractmethod
+    def calibrate(cls, target_ms: float) -> "KDF":
+        """Подбирает параметры так, чтобы вывод ключа занимал около target_ms на этой машине"""
+
+    def measure_ms(self, rounds: int = 1) -> float:
+        salt = b"\x00" * 16
+        start = time.perf_counter()
+        for _ in range(rounds):
+            self.derive(b"calibration", salt)
+        return (time.perf_counter() - start) * 1000 / rounds
+
+
+class Pbkdf2KDF(KDF):
+    name = "pbkdf2-sha256"
+
+    def __init__(self, iterations: int = 100000):
+        self.iterations = iterations
+
+    @property
+    def params(self) -> dict:
+        return {"iterations": self.iterations}
+
+    def derive(self, password: bytes, salt: bytes) -> bytes:
+        kdf = PBKDF2HMAC(algorithm=hashes.SHA256(), length=KEY_LENGTH, salt=salt, iterations=self.iterations)
+        return kdf.derive(password)
+
+    @classmethod
+    def calibrate(cls, target_ms: float) -> "KDF":
+        # Время PBKDF2 линейно по числу итераций: меряем пробный прогон и масштабируем
+        probe = cls(50000)
+        elapsed = probe.measure_ms()
+        return cls(max(100000, int(probe.iterations * target_ms / elapsed)))
+
+
+class ScryptKDF(KDF):
+    name = "scrypt"
+
+    def __init__(self, n: int = 2 ** 15, r: int = 8, p: int = 1):
+        self.n = n
+        self.r = r
+        self.p = p
+
+    @property
+    def params(self) -> dict:
+        return {"n": self.n, "r": self.r, "p": self.p}
+
+    def derive(self, password: bytes, salt: bytes) -> bytes:
+        return Scrypt(salt=salt, length=KEY_LENGTH, n=self.n, r=self.r, p=self.p).derive(password)
+
+    @classmethod
+    def calibrate(cls, target_ms: float) -> "KDF":
+        # n — степень двойки; удваиваем, пока не достигнем целевого времени (память ~128 * n * r)
+        kdf = cls(2 ** 14)
+        while kdf.n < 2 ** 22:
+            if kdf.measure_ms() * 2 > target_ms:
+                break
+            kdf = cls(kdf.n * 2, kdf.r, kdf.p)
+        return kdf
+
+
+class Argon2idKDF(KDF):
+    name = "argon2id"
+
+    def __init__(self, iterations: int = 3, memory_cost: int = 64 * 1024, lanes: int = 4):
+        self.iterations = iterations
+        self.memory_cost = memory_cost  # КиБ
+        self.lanes = lanes
+
+    @property
+    def params(self) -> dict:
+        return {"iterations": self.iterations, "memory_cost": self.memory_cost, "lanes": self.lanes}
+
+    def derive(self, password: bytes, salt: bytes) -> bytes:
+        if Argon2id is None:
+            raise ValueError("Argon2id недоступен: обновите библиотеку cryptography")
+        kdf = Argon2id(salt=salt, length=KEY_LENGTH, iterations=self.iterations,
+                       lanes=self.lanes, memory_cost=self.memory_cost)
+        return kdf.derive(password)
+
+    @classmethod
+    def calibrate(cls, target_ms: float) -> "KDF":
+        # Память фиксируем (64 МиБ), если даже один проход дольше цели — уменьшаем её
+        kdf = cls(1)
+        while kdf.memory_cost > 8 * 1024 and kdf.measure_ms() > target_ms:
+            kdf = cls(1, kdf.memory_cost // 2, kdf.lanes)
+        per_pass = kdf.measure_ms()
+        return cls(max(1, int(target_ms / per_pass)), kdf.memory_cost, kdf.lanes)
+
+
+KDF_TYPES: Dict[str, Type[KDF]] = {
+    Pbkdf2KDF.name: Pbkdf2KDF,
+    ScryptKDF.name: ScryptKDF,
+    Argon2idKDF.name: Argon2idKDF,
+}
+
+# Короткие имена для CLI
+KDF_ALIASES = {"pbkdf2": Pbkdf2KDF.name, "scrypt": ScryptKDF.name, "argon2id": Argon2idKDF.name}
+
+
+def available_kdfs() -> List[str]:
+    return [alias for alias, name in KDF_ALIASES.items() if name != Argon2idKDF.name or Argon2id is not None]
+
+
+def default_kdf() -> KDF:
+    """Параметры, с которыми создавались файлы до появления настраиваемого KDF"""
+    return Pbkdf2KDF(100000)
+
+
+def kdf_from_dict(data: Optional[dict]) -> KDF:
+    if not data:
+        return default_kdf()
+    params = dict(data)
+    name = params.pop("name")
+    if name not in KDF_TYPES:
+        raise ValueError(f"Неизвестный KDF: {name}")
+    return KDF_TYPES[name](**params)
+
+
+def calibrate(name: str, target_ms: float) -> KDF:
+    kdf_name = KDF_ALIASES.get(name, name)
+    if kdf_name not in {KDF_ALIASES[alias] for alias in available_kdfs()}:
+        raise ValueError(f"KDF '{name}' недоступен")
+    return KDF_TYPES[kdf_name].calibrate(target_ms)
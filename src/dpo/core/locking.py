@@ -0,0 +1,66 @@
+"""Межпроцессная блокировка файла хранилища.
+
+Блокировка рекомендательная (advisory) и берётся на соседний файл `<vault>.lock`,
+а не на сам vault: при компактизации файл заменяется через os.replace, и блокировка
+на старом inode перестала бы что-либо защищать.
+"""
+import os
+import time
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+    import msvcrt
+
+DEFAULT_TIMEOUT = 10.0
+POLL_INTERVAL = 0.02
+
+
+class FileLock:
+    """Эксклюзивная блокировка на время записи: with FileLock(path): ..."""
+
+    def __init__(self, path: str, timeout: float = DEFAULT_TIMEOUT):
+        self.lock_path = f"{path}.lock"
+        self.timeout = timeout
+        self._fd = None
+
+    def _try_lock(self) -> bool:
+        try:
+            if fcntl is not None:
+                fcntl.flock(self._fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            else:
+                msvcrt.locking(self._fd, msvcrt.LK_NBLCK, 1)
+        except OSError:
+            return False
+        return True
+
+    def acquire(self):
+        self._fd = os.open(self.lock_path, os.O_RDWR | os.O_CREAT, 0o600)
+        deadline = time.monotonic() + self.timeout
+        while not self._try_lock():
+            if time.monotonic() >= deadline:
+                os.close(self._fd)
+                self._fd = None
+                raise ValueError("❌ Хранилище занято другим процессом, попробуйте позже")
+            time.sleep(POLL_INTERVAL)
+
+    def release(self):
+        if self._fd is None:
+            return
+        try:
+            if fcntl is not None:
+                fcntl.flock(self._fd, fcntl.LOCK_UN)
+            else:
+                os.lseek(self._fd, 0, os.SEEK_SET)
+                msvcrt.locking(self._fd, msvcrt.LK_UNLCK, 1)
+        finally:
+            os.close(self._fd)
+            self._fd = None
+
+    def __enter__(self):
+        self.acquire()
+        return self
+
+    def __exit__(self, *exc):
+        self.release()
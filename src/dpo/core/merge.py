@@ -0,0 +1,60 @@
+"""Трёхстороннее слияние доступов проекта.
+
+Сливаются компактные строки доступов ([тип, название, ...]) по названию:
+base — версия, которую процесс загрузил, ours — его текущие изменения,
+theirs — то, что за это время записал на диск другой процесс.
+"""
+from typing import Container, Dict, List, Optional, Tuple
+
+Rows = Dict[str, list]
+
+CONFLICT_SUFFIX = "конфликт"
+
+
+def _pick(base: Optional[list], ours: Optional[list], theirs: Optional[list]) -> Tuple[Optional[list], bool]:
+    """Результат для одного доступа и признак конфликта (обе стороны изменили по-разному)"""
+    if ours == theirs or theirs == base:
+        return ours, False
+    if ours == base:
+        return theirs, False
+    # Изменение важнее удаления: так ничего не теряется
+    if ours is None:
+        return theirs, False
+    if theirs is None:
+        return ours, False
+    return ours, True
+
+
+def _conflict_name(name: str, merged: Rows, taken: Container[str]) -> str:
+    candidate = f"{name} ({CONFLICT_SUFFIX})"
+    n = 2
+    while candidate in merged or candidate in taken:
+        candidate = f"{name} ({CONFLICT_SUFFIX} {n})"
+        n += 1
+    return candidate
+
+
+def merge_rows(base: Rows, ours: Rows, theirs: Rows, taken: Container[str] = ()) -> Tuple[Rows, List[str]]:
+    """Возвращает (слитые строки, названия копий конфликтующих доступов).
+
+    При конфликте остаётся наша версия, а версия другого процесса сохраняется
+    рядом под названием «<название> (конфликт)». taken — занятые названия вне
+    сливаемых строк (когда сливается только часть проекта).
+    """
+    merged: Rows = {}
+    conflicts = []
+    for name in dict.fromkeys([*ours, *theirs, *base]):
+        row, conflict = _pick(base.get(name), ours.get(name), theirs.get(name))
+        if row is not None:
+            merged[name] = row
+        if conflict:
+            conflicts.append(name)
+
+    copies = []
+    for name in conflicts:
+        copy_name = _conflict_name(name, merged, taken)
+        row = theirs[name]
+        # Строка: [тип, название, остальные поля]
+        merged[copy_name] = [row[0], copy_name, *row[2:]]
+        copies.append(copy_name)
+    return merged, copies
@@ -0,0 +1,1676 @@
+from abc import ABC, abstractmethod
+from contextlib import contextmanager
+from operator import attrgetter
+from typing import Dict, Iterable, Iterator, List, NamedTuple, Optional, Set, Tuple, Type
+import base64
+import gc
+import json
+import os
+import threading
+from .encryption import FieldSealer, PasswordEncryption, Sealed, sealed_to_json
+from .errors import CorruptedFileError, SchemaError, VaultError, WrongPasswordError
+from .journal import KIND_CHECKPOINT, KIND_OPS, OP_ADD, OP_DELETE, OP_PROJECT, OP_UPDATE, Journal
+from .kdf import KDF, default_kdf, kdf_from_dict
+from . import profiling, storage
+from .locking import FileLock
+from .merge import merge_rows
+from .search import SearchIndex
+from .audit import AuditIndex, AuditReport
+from .catalog import ProjectIndex, normalize_tags
+
+
+# Реестр типов доступов: имя типа в файле -> класс
+CREDENTIAL_TYPES: Dict[str, Type["Credential"]] = {}
+
+
+def _tracked_setattr(self, key, value):
+    object.__setattr__(self, key, value)
+    if key != "_project" and self._project is not None:
+        self._project.credential_changed(self)
+
+
+def register_credential(cls):
+    """Регистрирует тип доступа для (де)сериализации.
+
+    Для типа создаётся подкласс с отслеживанием изменений: его получают только доступы,
+    прикреплённые к проекту. Поэтому загрузка тысяч доступов не платит за перехват
+    каждого присваивания, а изменения прикреплённых доступов помечают проект.
+    """
+    cls._values = attrgetter(*cls.FIELDS)
+    cls._tracked = type(cls.__name__, (cls,), {
+        "__slots__": (),
+        "__setattr__": _tracked_setattr,
+        "__module__": cls.__module__,
+        "__qualname__": cls.__qualname__,
+    })
+    CREDENTIAL_TYPES[cls.type_name] = cls
+    return cls
+
+
+class Credential:
+    """Базовый доступ: хост, пользователь, секрет и порт есть у всех типов.
+
+    Поля хранятся в __slots__ (без __dict__ на каждый объект), а в файл пишутся
+    компактной строкой [тип, значения полей в порядке FIELDS]. Позиционные
+    аргументы конструктора идут в том же порядке, что и FIELDS. Теги — необязательный
+    последний элемент строки (списком), только если они есть.
+
+    Поля из SECRETS в режиме запечатанных секретов хранят Sealed вместо строки;
+    открытое значение даёт reveal().
+    """
+    __slots__ = ("_project", "name", "host", "user", "password", "port", "tags")
+    type_name = ""
+    label = ""
+    FIELDS: Tuple[str, ...] = ("name", "host", "user", "password", "port")
+    REQUIRED: Tuple[str, ...] = ("name", "password")
+    SECRETS: Tuple[str, ...] = ("password",)
+    DEFAULT_PORT = 0
+
+    def __init__(self, name: str, host: str = "", user: str = "", password: str = "", port: int = None):
+        # Проект-владелец: изменения полей помечают его чанк как изменённый
+        self._project = None
+        self.name = name
+        self.host = host
+        self.user = user
+        self.password = password
+        self.port = self.DEFAULT_PORT if port is None else port
+        self.tags: Tuple[str, ...] = ()
+
+    def attach(self, project: "Project"):
+        self._project = project
+        self.__class__ = type(self)._tracked
+
+    def detach(self):
+        # Сначала отвязываем проект: смена класса у отслеживаемого доступа иначе выглядит как изменение
+        self._project = None
+        self.__class__ = CREDENTIAL_TYPES[self.type_name]
+
+    def reveal(self, field: str = "password") -> str:
+        """Значение поля в открытом виде: запечатанный секрет расшифровывается по требованию"""
+        value = getattr(self, field)
+        return value.reveal() if type(value) is Sealed else value
+
+    def seal(self, sealer: FieldSealer):
+        for field in self.SECRETS:
+            value = getattr(self, field)
+            if type(value) is Sealed:
+                if value.sealer is sealer:
+                    continue
+                value = value.reveal()  # запечатано другим ключом (смена мастер-пароля)
+            if value:
+                # В обход отслеживания: значение то же, проект не становится изменённым
+                object.__setattr__(self, field, sealer.seal(value))
+
+    def unseal(self):
+        for field in self.SECRETS:
+            value = getattr(self, field)
+            if type(value) is Sealed:
+                object.__setattr__(self, field, value.reveal())
+
+    def to_row(self) -> list:
+        row = [self.type_name, *self._values(self)]
+        if self.tags:
+            row.append(list(self.tags))
+        return row
+
+    @classmethod
+    def from_row(cls, values) -> "Credential":
+        if len(values) > len(cls.FIELDS):
+            cred = cls(*values[:-1])
+            cred.tags = tuple(values[-1])
+            return cred
+        return cls(*values)
+
+    def to_dict(self) -> dict:
+        """Все поля в открытом виде (экспорт, демон секретов)"""
+        data = {"type": self.type_name, **dict(zip(self.FIELDS, self._values(self)))}
+        for field in self.SECRETS:
+            if type(data[field]) is Sealed:
+                data[field] = data[field].reveal()
+        if self.tags:
+            data["tags"] = list(self.tags)
+        return data
+
+    @classmethod
+    def from_dict(cls, data: dict) -> "Credential":
+        cred = cls(**{field: data[field] for field in cls.FIELDS if field in data})
+        if data.get("tags"):
+            cred.tags = normalize_tags(data["tags"])
+        return cred
+
+    def __str__(self):
+        return f"[{self.label}] {self.name} ({self.host}:{self.port})"
+
+
+@register_credential
+class DatabaseCredential(Credential):
+    __slots__ = ()
+    type_name = "database"
+    label = "DB"
+    REQUIRED = ("name", "host", "user", "password")
+    DEFAULT_PORT = 3306
+
+
+@register_credential
+class SSHKeyCredential(Credential):
+    """SSH-доступ: password — парольная фраза ключа, private_key — сам ключ"""
+    __slots__ = ("private_key",)
+    type_name = "ssh"
+    label = "SSH"
+    FIELDS = Credential.FIELDS + ("private_key",)
+    REQUIRED = ("name", "host", "user")
+    SECRETS = ("password", "private_key")
+    DEFAULT_PORT = 22
+
+    def __init__(self, name: str, host: str = "", user: str = "", password: str = "", port: int = None,
+                 private_key: str = ""):
+        super().__init__(name, host, user, password, port)
+        self.private_key = private_key
+
+    def __str__(self):
+        return f"[{self.label}] {self.name} ({self.user}@{self.host}:{self.port})"
+
+
+@register_credential
+class APITokenCredential(Credential):
+    """API-токен: host — базовый URL, user — аккаунт/client id, password — токен"""
+    __slots__ = ()
+    type_name = "api"
+    label = "API"
+    DEFAULT_PORT = 443
+
+    def __str__(self):
+        return f"[{self.label}] {self.name} ({self.host})"
+
+
+@register_credential
+class GenericSecret(Credential):
+    __slots__ = ("notes",)
+    type_name = "secret"
+    label = "SECRET"
+    FIELDS = Credential.FIELDS + ("notes",)
+    SECRETS = ("password", "notes")
+
+    def __init__(self, name: str, host: str = "", user: str = "", password: str = "", port: int = None,
+                 notes: str = ""):
+        super().__init__(name, host, user, password, port)
+        self.notes = notes
+
+    def __str__(self):
+        return f"[{self.label}] {self.name}"
+
+
+class Project:
+    """name — путь проекта (acme/billing/prod, см. catalog.py); tags — его теги"""
+
+    def __init__(self, name: str, description: str = "", tags: Iterable[str] = ()):
+        self.name = name
+        self.description = description
+        self.tags: Tuple[str, ...] = tuple(tags)
+        self._credentials: Dict[str, Credential] = {}
+        # Загрузчик чанка: проект расшифровывается при первом обращении к credentials
+        self._loader = None
+        # Новый проект ещё не записан на диск; счётчик версий растёт при каждом изменении
+        self._dirty = True
+        self._version = 0
+        # Подписчики на изменения доступов: callback(event, project, credential)
+        self._listeners = []
+        self._unknown_rows: list = []
+
+    @property
+    def credentials(self) -> Dict[str, Credential]:
+        if self._loader is not None:
+            loader, self._loader = self._loader, None
+            try:
+                loader(self)
+            except Exception:
+                # Не оставляем наполовину загруженный проект: иначе он сохранится пустым
+                self._credentials.clear()
+                self._loader = loader
+                raise
+        return self._credentials
+
+    @property
+    def is_loaded(self) -> bool:
+        return self._loader is None
+
+    @property
+    def is_dirty(self) -> bool:
+        return self._dirty
+
+    @property
+    def version(self) -> int:
+        """Растёт при каждом изменении проекта; по нему сбрасываются кэши представлений"""
+        return self._version
+
+    def mark_dirty(self):
+        self._dirty = True
+        self._version += 1
+
+    def subscribe(self, listener):
+        self._listeners.append(listener)
+
+    def _notify(self, event: str, credential: Optional[Credential]):
+        for listener in self._listeners:
+            listener(event, self, credential)
+
+    def set_tags(self, tags: Iterable[str]):
+        """Заменяет теги проекта; подписчики получают событие "tags" без доступа"""
+        tags = normalize_tags(tags)
+        if tags == self.tags:
+            return
+        self.tags = tags
+        self.mark_dirty()
+        self._notify("tags", None)
+
+    def credential_changed(self, credential: Credential):
+        self.mark_dirty()
+        self._notify("update", credential)
+
+    def add_credential(self, credential: Credential):
+        replaced = self.credentials.get(credential.name)
+        if replaced is not None and replaced is not credential:
+            replaced.detach()
+            self._notify("remove", replaced)
+        self.credentials[credential.name] = credential
+        credential.attach(self)
+        self.mark_dirty()
+        self._notify("add", credential)
+
+    def remove_credential(self, name: str) -> Optional[Credential]:
+        credential = self.credentials.pop(name, None)
+        if credential is not None:
+            credential.detach()
+            self.mark_dirty()
+            self._notify("remove", credential)
+        return credential
+
+    def to_dict(self) -> dict:
+        # Доступы неизвестных типов (записанные более новой версией) сохраняются как были
+        return {
+            "name": self.name,
+            "description": self.description,
+            "rows": [cred.to_row() for cred in self.credentials.values()] + self._unknown_rows,
+        }
+
+
+def project_from_entry(entry: dict) -> Project:
+    """Проект (ещё без доступов) по записи индекса файла или контрольной точки"""
+    return Project(entry["name"], entry.get("description", ""), entry.get("tags", ()))
+
+
+def credential_from_dict(cred_data: dict) -> Optional[Credential]:
+    cls = CREDENTIAL_TYPES.get(cred_data.get("type"))
+    return cls.from_dict(cred_data) if cls is not None else None
+
+
+def credential_from_row(row) -> Optional[Credential]:
+    if isinstance(row, dict):
+        return credential_from_dict(row)
+    cls = CREDENTIAL_TYPES.get(row[0])
+    return cls.from_row(row[1:]) if cls is not None else None
+
+
+# Строк доступов в одной строке JSON Lines: сериализация идёт пачками (быстро, как один dumps),
+# а в памяти одновременно держится только одна пачка
+ROWS_PER_LINE = 500
+
+
+def project_lines(proj: Project, sealer: Optional[FieldSealer] = None,
+                  tokens: Optional[List[str]] = None, **header) -> Iterator[bytes]:
+    """Потоковая сериализация проекта: заголовок, затем пачки строк доступов, по строке JSON на пачку.
+
+    С sealer секретные поля перед записью запечатываются (и остаются запечатанными в памяти).
+    С tokens запечатанные значения пишутся номерами, а их токены собираются в этот список
+    (чанк ENC_SPLIT); header — дополнительные поля заголовка.
+    """
+    header = {"name": proj.name, "description": proj.description, **header}
+    yield json.dumps(header, ensure_ascii=False).encode("utf-8") + b"\n"
+    default = sealed_to_json if tokens is None else _secret_refs(tokens)
+    batch = []
+    for cred in proj.credentials.values():
+        if sealer is not None:
+            cred.seal(sealer)
+        row = cred.to_row()
+        if tokens is not None:
+            _ref_secrets(row, tokens)
+        batch.append(row)
+        if len(batch) >= ROWS_PER_LINE:
+            yield json.dumps(batch, ensure_ascii=False, default=default).encode("utf-8") + b"\n"
+            batch = []
+    batch.extend(proj._unknown_rows)
+    if batch:
+        yield json.dumps(batch, ensure_ascii=False, default=default).encode("utf-8") + b"\n"
+
+
+# Номера столбцов секретных полей в строке доступа по типу: в чанке ENC_SPLIT там
+# вместо токена номер секрета (число; строкой секрет в этих столбцах не бывает)
+_SECRET_COLUMNS: Dict[str, Tuple[int, ...]] = {}
+
+
+def _secret_columns(type_name: str) -> Tuple[int, ...]:
+    columns = _SECRET_COLUMNS.get(type_name)
+    if columns is None:
+        cls = CREDENTIAL_TYPES.get(type_name)
+        if cls is None:
+            return ()
+        columns = _SECRET_COLUMNS[type_name] = tuple(1 + cls.FIELDS.index(field) for field in cls.SECRETS)
+    return columns
+
+
+def _ref_secrets(row: list, tokens: List[str]):
+    for column in _secret_columns(row[0]):
+        value = row[column]
+        if type(value) is Sealed:
+            tokens.append(value.token)
+            row[column] = len(tokens) - 1
+
+
+def _secret_refs(tokens: List[str]):
+    # Запечатанные значения вне известных столбцов (строки неизвестных типов) — {"secret": номер}
+    def default(value):
+        if isinstance(value, Sealed):
+            tokens.append(value.token)
+            return {"secret": len(tokens) - 1}
+        raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+    return default
+
+
+def _token_lines(tokens: List[str]) -> Iterator[bytes]:
+    # Генератор: список заполняется, пока пишутся метаданные, а читается после них
+    yield "\n".join(tokens).encode("ascii")
+
+
+def split_chunk(proj: Project, encryption: PasswordEncryption) -> Iterator[bytes]:
+    """Чанк ENC_SPLIT: метаданные проекта и отдельным потоком токены его запечатанных секретов"""
+    tokens: List[str] = []
+    secrets = encryption.encrypt_stream(_token_lines(tokens))
+    # Префикс nonce потока секретов записан в заголовке метаданных: половины чанков не подменить
+    prefix = next(secrets)
+    lines = project_lines(proj, encryption.sealer, tokens, secrets=base64.b64encode(prefix).decode("ascii"))
+    meta_size = 0
+    for block in encryption.encrypt_stream(profiling.timed("serialize", lines)):
+        meta_size += len(block)
+        yield block
+    yield prefix
+    yield from secrets
+    yield storage.SPLIT_TRAILER.pack(meta_size)
+
+
+class SecretStore:
+    """Токены запечатанных секретов проекта — второй поток его чанка ENC_SPLIT.
+
+    Отложенное хранилище (defer) читает и расшифровывает их только при первом показе
+    секрета: загрузка проекта, список и поиск обходятся без них. Оно держит открытым
+    файл снимка, поэтому токены читаются и после замены файла компактизацией.
+    """
+    __slots__ = ("prefix", "_encryption", "_source", "_offset", "_size", "_tokens")
+
+    def __init__(self, encryption: PasswordEncryption):
+        self.prefix = b""
+        self._encryption = encryption
+        self._source: Optional[storage.PinnedFile] = None
+        self._offset = self._size = 0
+        self._tokens: Optional[List[str]] = None
+
+    def resolve(self, rows: list):
+        """Номера в секретных столбцах строк доступов -> Sealed без шифртекста"""
+        sealer = self._encryption.sealer
+        for row in rows:
+            if type(row) is not list:
+                continue
+            for column in _SECRET_COLUMNS.get(row[0]) or _secret_columns(row[0]):
+                index = row[column]
+                if type(index) is int:
+                    row[column] = Sealed(None, sealer, self, index)
+
+    def json_hook(self, obj: dict):
+        """object_hook для json.loads: {"secret": номер} -> Sealed без шифртекста"""
+        index = obj.get("secret")
+        return Sealed(None, self._encryption.sealer, self, index) if index is not None and len(obj) == 1 else obj
+
+    def defer(self, source: storage.PinnedFile, offset: int, size: int):
+        self._source, self._offset, self._size = source, offset, size
+
+    def load(self, view):
+        if bytes(view[:len(self.prefix)]) != self.prefix:
+            raise CorruptedFileError("Секреты проекта не от его метаданных")
+        text = b"".join(self._encryption.decrypt_stream(view)).decode("ascii")
+        self._tokens = text.split("\n") if text else []
+
+    def token(self, index: int) -> str:
+        if self._tokens is None:
+            with profiling.span("load_secrets", bytes=self._size):
+                with storage.map_segment(self._source.fd, self._offset, self._size) as view:
+                    self.load(view)
+            self._source = None
+        try:
+            return self._tokens[index]
+        except (IndexError, TypeError):
+            raise CorruptedFileError("Ссылка на секрет вне чанка") from None
+
+
+def fill_project_lines(proj: Project, pieces: Iterable[bytes], sealer: Optional[FieldSealer] = None,
+                       store: Optional[SecretStore] = None) -> dict:
+    """Обратное к project_lines: разбирает поток по строкам, не собирая его целиком. Возвращает заголовок"""
+    if store is not None:
+        hook = store.json_hook
+    else:
+        hook = sealer.json_hook if sealer is not None else None
+    header = None
+    for raw in storage.iter_lines(pieces):
+        # {"sealed": ...} (и ссылки на секреты чанка ENC_SPLIT) превращаются в Sealed, не расшифровываясь
+        with profiling.span("parse", bytes=len(raw)):
+            line = json.loads(raw, object_hook=hook)
+        if header is None:
+            header = line
+        else:
+            with profiling.span("rebuild", rows=len(line)):
+                if store is not None:
+                    store.resolve(line)
+                _fill_rows(proj, line)
+    if header is None:
+        raise ValueError("Чанк проекта неполный")
+    return header
+
+
+def fill_project(proj: Project, proj_data: dict):
+    # Старые файлы: словарь credentials; затем компактные строки rows в одном JSON
+    rows = proj_data.get("rows")
+    if rows is None:
+        rows = proj_data.get("credentials", {}).values()
+    _fill_rows(proj, rows)
+
+
+def _fill_rows(proj: Project, rows: Iterable):
+    for row in rows:
+        cred = credential_from_row(row)
+        if cred is None:
+            proj._unknown_rows.append(row)
+            continue
+        cred.attach(proj)
+        proj._credentials[cred.name] = cred
+
+
+def _row_name(row) -> str:
+    return row.get("name") if isinstance(row, dict) else row[1]
+
+
+def replay_op(proj: Project, op: list):
+    """Накладывает операцию журнала на загружаемый проект (без уведомлений и пометки изменений)"""
+    kind = op[0]
+    if kind == OP_PROJECT:
+        proj.description = op[2]
+        if len(op) > 4:  # теги пишутся в операцию с версии с каталогом проектов
+            proj.tags = tuple(op[4])
+        if op[3]:
+            for cred in proj._credentials.values():
+                cred.detach()
+            proj._credentials = {}
+            proj._unknown_rows = []
+        return
+    names = op[2] if kind == OP_DELETE else [_row_name(row) for row in op[2]]
+    for name in names:
+        cred = proj._credentials.pop(name, None)
+        if cred is not None:
+            cred.detach()
+    if proj._unknown_rows:
+        dropped = set(names)
+        proj._unknown_rows = [row for row in proj._unknown_rows if _row_name(row) not in dropped]
+    if kind != OP_DELETE:
+        _fill_rows(proj, op[2])
+
+
+@contextmanager
+def _gc_paused():
+    # Разбор чанка создаёт сотни тысяч объектов подряд; сборщик мусора запускался бы по
+    # счётчику выделений и раз за разом обходил уже построенные доступы, ничего не находя
+    enabled = gc.isenabled()
+    gc.disable()
+    try:
+        yield
+    finally:
+        if enabled:
+            gc.enable()
+
+
+def read_chunk(proj: Project, source, segment: tuple, encryption: PasswordEncryption,
+               pinned: Optional[storage.PinnedFile] = None):
+    """Заполняет проект из его чанка в файле source (снимок или контрольная точка журнала).
+
+    Секреты чанка ENC_SPLIT с pinned (source — его дескриптор) читаются лениво, при
+    первом показе; без него — сразу, пока source ещё тот же файл.
+    """
+    with _gc_paused():
+        _read_chunk_data(proj, source, segment, encryption, pinned)
+
+
+def _read_chunk_data(proj: Project, source, segment: tuple, encryption: PasswordEncryption,
+                     pinned: Optional[storage.PinnedFile]):
+    offset, size, enc, _ = segment
+    if enc == storage.ENC_SPLIT:
+        with storage.map_segment(source, offset, size) as view:
+            _read_split(proj, view, encryption, pinned, offset)
+    elif enc == storage.ENC_STREAM:
+        # Чанк читается через mmap и расшифровывается записями — без копии всего файла
+        with storage.map_segment(source, offset, size) as view:
+            pieces = encryption.decrypt_stream(view)
+            try:
+                fill_project_lines(proj, pieces, encryption.sealer)
+            finally:
+                pieces.close()
+    else:
+        data = encryption.decrypt(storage.read_segment(source, offset, size))
+        with profiling.span("parse", bytes=len(data)):
+            proj_data = json.loads(data)
+        with profiling.span("rebuild"):
+            fill_project(proj, proj_data)
+
+
+def _read_split(proj: Project, view: memoryview, encryption: PasswordEncryption,
+                pinned: Optional[storage.PinnedFile], offset: int):
+    """Разбирает чанк ENC_SPLIT. Секреты с pinned (view — участок его файла) читаются лениво,
+    при первом показе; без него — сразу"""
+    trailer = storage.SPLIT_TRAILER.size
+    if len(view) < trailer:
+        raise CorruptedFileError("Чанк обрезан")
+    end = len(view) - trailer
+    (meta_size,) = storage.SPLIT_TRAILER.unpack(view[end:])
+    if meta_size > end:
+        raise CorruptedFileError("Чанк обрезан")
+    store = SecretStore(encryption)
+    meta = view[:meta_size]
+    pieces = encryption.decrypt_stream(meta)
+    try:
+        header = fill_project_lines(proj, pieces, store=store)
+    finally:
+        pieces.close()
+        meta.release()
+    store.prefix = base64.b64decode(header["secrets"])
+    if pinned is not None:
+        store.defer(pinned, offset + meta_size, end - meta_size)
+        return
+    secrets = view[meta_size:end]
+    try:
+        store.load(secrets)
+    finally:
+        secrets.release()
+
+
+def _resealed(value, sealer: FieldSealer):
+    """Копия операции журнала, где запечатанные поля запечатаны другим ключом"""
+    if isinstance(value, Sealed):
+        return sealer.seal(value.reveal())
+    if isinstance(value, list):
+        return [_resealed(item, sealer) for item in value]
+    return value
+
+
+def _row_ops(kind: str, project: str, rows: List) -> Iterator[list]:
+    for start in range(0, len(rows), ROWS_PER_LINE):
+        yield [kind, project, rows[start:start + ROWS_PER_LINE]]
+
+
+def _sealed_rows(creds: Iterable[Credential], sealer: Optional[FieldSealer]) -> List[list]:
+    rows = []
+    for cred in creds:
+        if sealer is not None:
+            cred.seal(sealer)
+        rows.append(cred.to_row())
+    return rows
+
+
+class HistoryEntry(NamedTuple):
+    """Событие журнала: action — OP_*, name — None для операции над самим проектом"""
+    seq: int
+    time: float
+    action: str
+    project: str
+    name: Optional[str]
+
+
+class RestoreStats:
+    def __init__(self):
+        self.added = 0
+        self.updated = 0
+        self.removed = 0
+
+    def __bool__(self):
+        return bool(self.added or self.updated or self.removed)
+
+    def __str__(self):
+        return f"добавлено: {self.added}, изменено: {self.updated}, удалено: {self.removed}"
+
+
+class Vault:
+    SALT_LENGTH = 16
+    # Компактизация: файл переписывается целиком, когда мусора больше, чем живых данных
+    COMPACT_RATIO = 1.0
+    COMPACT_MIN_BYTES = 64 * 1024
+    # Свёртка журнала в снимок: когда операций после снимка больше FOLD_RATIO от живых данных
+    FOLD_RATIO = 0.1
+    FOLD_MIN_BYTES = 64 * 1024
+    # Контрольная точка пишется, когда операций после прошлой набралось на её размер: копии
+    # снимка занимают не больше самих изменений, а restore проигрывает не больше этого объёма
+    CHECKPOINT_RATIO = 1.0
+
+    def __init__(self, master_password: str = None, encryption: PasswordEncryption = None):
+        self.projects: Dict[str, Project] = {}
+        # Ключ выводится только для нового vault; при загрузке передаётся готовый шифратор
+        self.encryption = encryption if encryption is not None else PasswordEncryption(master_password)
+        # Файл, из которого загружен vault, и расположение зашифрованных чанков в нём
+        self._source: Optional[str] = None
+        self._segments: Dict[str, tuple] = {}
+        self._end = 0
+        # Версия формата исходного файла: в файл старой версии не дописываем, а переписываем его
+        self._format_version = storage.FORMAT_VERSION
+        # Ревизия растёт с каждой записью; по (inode, размер, mtime) видно, что файл менял кто-то ещё
+        self._revision = 0
+        self._stamp = None
+        # Дескриптор файла, из которого загружены проекты (см. _pin)
+        self._pinned: Optional[storage.PinnedFile] = None
+        # Копии конфликтующих доступов, созданные при последнем слиянии: [(проект, название)]
+        self.conflicts: List[Tuple[str, str]] = []
+        # Режим запечатанных секретов: пароли (и другие SECRETS) шифруются каждый отдельно
+        # и расшифровываются только по требованию, метаданные — при загрузке проекта
+        self.seal_secrets = False
+        # Индексы по всем доступам строятся при первом обращении и дальше обновляются по событиям
+        self._search_index: Optional[SearchIndex] = None
+        self._audit_index: Optional[AuditIndex] = None
+        self._project_index: Optional[ProjectIndex] = None
+        # Журнал изменений рядом с файлом (см. journal.py). Снимок покрывает записи до
+        # _snapshot_seq, операции более поздних записей лежат в _pending по проектам
+        # и накладываются на чанк при загрузке проекта
+        self._journal: Optional[Journal] = None
+        self._journal_seq = 0
+        self._snapshot_seq = 0
+        self._snapshot_sealed = False
+        self._pending: Dict[str, List[Tuple[int, list]]] = {}
+        self._pending_records: List[Tuple[int, int]] = []
+        # Несохранённые изменения для журнала: проект -> {название доступа: первое событие},
+        # новые проекты -> заменили ли они проект с тем же именем
+        self._touched: Dict[str, Dict[str, str]] = {}
+        self._added: Dict[str, bool] = {}
+        # Проекты с несохранёнными тегами (в журнал — операцией OP_PROJECT без сброса)
+        self._retagged: Set[str] = set()
+        self._applying = False
+        self._fold_thread: Optional[threading.Thread] = None
+
+    def add_project(self, project: Project):
+        replaced = self.projects.get(project.name)
+        self._register(project)
+        # Новый проект (или замена целиком) попадает в журнал со всеми доступами
+        self._added[project.name] = self._added.get(project.name, False) or replaced is not None
+
+    def _register(self, project: Project):
+        replaced = self.projects.get(project.name)
+        self.projects[project.name] = project
+        project.subscribe(self._on_credential_event)
+        for index in self._indexes():
+            if replaced is not None:
+                index.remove_project(replaced.name)
+            index.add_project(project)
+
+    def list_projects(self) -> List[Project]:
+        return list(self.projects.values())
+
+    def _on_credential_event(self, event: str, project: Project, credential: Optional[Credential]):
+        if project is not self.projects.get(project.name):
+            return
+        if credential is None:  # изменились теги самого проекта
+            if not self._applying:
+                self._retagged.add(project.name)
+            if self._project_index is not None:
+                self._project_index.update_project(project)
+            return
+        if not self._applying:
+            self._touched.setdefault(project.name, {}).setdefault(credential.name, event)
+        for index in self._indexes():
+            if event == "remove":
+                index.remove(project.name, credential.name)
+            else:
+                index.add(project.name, credential)
+
+    def _indexes(self) -> List:
+        return [index for index in (self._search_index, self._audit_index, self._project_index) if index is not None]
+
+    @property
+    def search_index(self) -> SearchIndex:
+        """Строится при первом поиске (расшифровывает все проекты), дальше обновляется инкрементально"""
+        if self._search_index is None:
+            index = SearchIndex()
+            for proj in self.projects.values():
+                index.add_project(proj)
+            self._search_index = index
+        return self._search_index
+
+    def search(self, query: str, limit: int = 20) -> List[Tuple[Project, Credential]]:
+        results = []
+        for hit in self.search_index.search(query, limit):
+            # Запись индекса могла пережить проект или доступ — такие попадания пропускаются
+            proj = self.projects.get(hit.project)
+            cred = proj.credentials.get(hit.name) if proj is not None else None
+            if cred is not None:
+                results.append((proj, cred))
+        return results
+
+    @property
+    def audit_index(self) -> AuditIndex:
+        """Как search_index: строится при первом аудите, дальше обновляется при каждом изменении доступа"""
+        if self._audit_index is None:
+            index = AuditIndex(self.encryption.fingerprint)
+            for proj in self.projects.values():
+                index.add_project(proj)
+            self._audit_index = index
+        return self._audit_index
+
+    def audit(self) -> AuditReport:
+        """Повторные пароли, дубли учёток (хост, порт, пользователь) и слабые пароли по всему vault"""
+        return self.audit_index.report()
+
+    @property
+    def project_index(self) -> ProjectIndex:
+        """Каталог путей и тегов проектов: строится при первом отборе из метаданных, без расшифровки"""
+        if self._project_index is None:
+            index = ProjectIndex()
+            index.add_projects(self.projects.values())
+            self._project_index = index
+        return self._project_index
+
+    def find_projects(self, under: str = "", tags: Iterable[str] = (),
+                      credential_tags: bool = True) -> List[Project]:
+        """Проекты под путём under, у которых есть все теги tags, по алфавиту.
+
+        С credential_tags тег может стоять и на любом доступе проекта: для этого при
+        первом таком отборе каталог дополняется тегами доступов (расшифровываются
+        все проекты, как при первом поиске), дальше обновляется по событиям.
+        """
+        index = self.project_index
+        if tags and credential_tags and not index.with_credentials:
+            index.with_credentials = True
+            for proj in self.projects.values():
+                for cred in proj.credentials.values():
+                    index.add(proj.name, cred)
+        return [self.projects[name] for name in index.find(under, tags)]
+
+    @profiling.traced("load_project")
+    def _load_project(self, proj: Project):
+        """Расшифровывает чанк одного проекта и накладывает операции журнала после снимка (лениво)"""
+        # Если файл успел переписать другой процесс, смещения чанков устарели
+        if self._disk_changed():
+            self.sync_with_disk(loading=proj)
+        segment = self._segments.get(proj.name)
+        if segment is not None:  # проекта, созданного после снимка, есть только операции
+            # Чанк читается из закреплённого файла снимка: секреты из него дочитываются при показе
+            pinned = self._pinned
+            self._read_chunk(proj, segment, pinned.fd if pinned is not None else None, pinned=pinned)
+        # Теги уже актуальны (их обновляет чтение журнала), а могли и измениться до загрузки
+        tags = proj.tags
+        for _, op in self._pending.get(proj.name, ()):
+            replay_op(proj, op)
+        proj.tags = tags
+
+    @staticmethod
+    def _segment(entry: dict) -> tuple:
+        return entry["offset"], entry["size"], entry.get("enc", storage.ENC_FERNET), entry.get("rev", 0)
+
+    def _read_chunk(self, proj: Project, segment: tuple, source=None, encryption: PasswordEncryption = None,
+                    pinned: Optional[storage.PinnedFile] = None):
+        try:
+            read_chunk(proj, self._source if source is None else source, segment,
+                       self.encryption if encryption is None else encryption, pinned)
+        except (json.JSONDecodeError, KeyError, TypeError, IndexError) as e:
+            # Чанк расшифрован (целостность проверена), но внутри не то, что ожидалось
+            raise SchemaError(f"❌ Чанк проекта '{proj.name}' не в формате хранилища") from e
+        except Exception as e:
+            raise CorruptedFileError(f"❌ Повреждён чанк проекта '{proj.name}'") from e
+
+    # --- Параллельная работа нескольких процессов ---
+
+    @staticmethod
+    def _stat_stamp(path: str):
+        try:
+            st = os.stat(path)
+        except FileNotFoundError:
+            return None
+        return st.st_ino, st.st_size, st.st_mtime_ns
+
+    def _disk_changed(self) -> bool:
+        if self._source is None:
+            return False
+        return (self._stat_stamp(self._source) != self._stamp
+                or (self._journal is not None and self._journal.changed()))
+
+    def _pin(self):
+        """Держит открытым файл, которому соответствует _stamp.
+
+        Через этот дескриптор дочитываются секреты запечатанных проектов, а если другой
+        процесс перепишет хранилище целиком (компактизация), чанки, из которых загружены
+        наши проекты, останутся читаемыми и как база для слияния. Только POSIX: в Windows
+        открытый файл не дал бы заменить хранилище, там секреты читаются сразу.
+        """
+        self._unpin()
+        if os.name != "posix" or self._stamp is None:
+            return
+        fd = os.open(self._source, os.O_RDONLY)
+        if os.fstat(fd).st_ino != self._stamp[0]:
+            os.close(fd)  # файл успели заменить между stat и open
+            return
+        self._pinned = storage.PinnedFile(fd)
+
+    def _unpin(self):
+        # Дескриптор закроется, когда его отпустят и ещё не прочитанные секреты проектов
+        self._pinned = None
+
+    def __del__(self):
+        self._unpin()
+
+    def sync_with_disk(self, loading: Optional[Project] = None):
+        """Подтягивает то, что записали другие процессы, поверх несохранённых изменений.
+
+        Чужие записи журнала накладываются на загруженные проекты по доступам, а доступы,
+        изменённые и у нас, сливаются трёхсторонне (см. merge.py). База слияния — чанк,
+        из которого проект был загружен, с операциями журнала до этой записи: файл только
+        дописывается, так что старый чанк остаётся на месте, а после полной перезаписи
+        другим процессом он читается через удерживаемый дескриптор (_pin). Новый снимок
+        от свёртки состояния не меняет — обновляется только расположение чанков.
+        Файлы без журнала сливаются чанками: незагруженные и неизменённые проекты просто
+        берутся с диска, изменённые сливаются по доступам.
+        loading — проект, который сейчас загружается: для него обновляется только
+        расположение чанка, операции журнала наложатся при загрузке.
+        """
+        snapshot = None
+        stamp = self._stat_stamp(self._source)
+        if stamp != self._stamp:
+            with open(self._source, "rb") as f:
+                header, _ = storage.read_header(f)
+                if header["salt"] != self.encryption.get_salt() or kdf_from_dict(header.get("kdf")) != self.encryption.kdf:
+                    raise ValueError("❌ Хранилище перешифровано другим процессом — откройте его заново")
+                index, end = storage.read_index(f, self.encryption)
+                stamp = self._stat_stamp(self._source)
+            snapshot = header, index, end
+        # После полной перезаписи (другой inode) старые смещения указывают только в старый файл
+        pinned = self._pinned
+        if pinned is not None:
+            base_source = pinned.fd
+        elif self._stamp is not None and stamp[0] == self._stamp[0]:
+            base_source = self._source
+        else:
+            base_source = None
+
+        if self._journal is not None:
+            if snapshot is not None and (snapshot[1].get("journal") or {}).get("id") != self._journal.id:
+                raise ValueError("❌ Хранилище заменено другим процессом — откройте его заново")
+            self._sync_journal(base_source, loading)
+        if snapshot is None:
+            return
+
+        header, index, end = snapshot
+        if self._journal is not None:
+            self._adopt_snapshot(index)
+        else:
+            self._merge_snapshot(index, base_source, loading)
+        self._end = end
+        self._format_version = header["version"]
+        self._revision = max(self._revision, index.get("revision", 0))
+        self._stamp = stamp
+        self._pin()
+        if self._journal is None:
+            # Файл перевёл на журнал другой процесс: его дальнейшие изменения — уже там
+            self._attach_journal(index)
+
+    def _merge_snapshot(self, index: dict, base_source, loading: Optional[Project]):
+        for entry in index.get("projects", []):
+            name = entry["name"]
+            segment = self._segment(entry)
+            proj = self.projects.get(name)
+            if proj is None:
+                proj = project_from_entry(entry)
+                proj._loader = self._load_project
+                proj._dirty = False
+                self._segments[name] = segment
+                self._register(proj)
+                continue
+
+            previous = self._segments.get(name)
+            self._segments[name] = segment
+            if previous is not None and previous[3] == segment[3]:
+                continue  # чанк не менялся (мог только переехать при компактизации)
+            if proj is loading or not proj.is_loaded:
+                continue
+            if proj.is_dirty:
+                self._merge_project(proj, base_source, previous, segment)
+            else:
+                self._reload_project(proj)
+
+    def _adopt_snapshot(self, index: dict):
+        """Новый снимок от свёртки журнала: состояние то же, меняется только расположение чанков"""
+        seq = index["journal"]["seq"]
+        self._segments = {entry["name"]: self._segment(entry) for entry in index.get("projects", [])}
+        for name in list(self._pending):
+            ops = [item for item in self._pending[name] if item[0] > seq]
+            if ops:
+                self._pending[name] = ops
+            else:
+                del self._pending[name]
+        self._pending_records = [item for item in self._pending_records if item[0] > seq]
+        self._snapshot_seq = seq
+        self._snapshot_sealed = index.get("seal_secrets", False)
+
+    # --- Журнал изменений ---
+
+    def _attach_journal(self, index: dict):
+        """Открывает журнал снимка и читает операции, записанные после него"""
+        self._snapshot_sealed = index.get("seal_secrets", False)
+        info = index.get("journal")
+        if info is None:
+            return
+        journal = Journal.open(self._source, info["id"], self.encryption.get_salt())
+        if journal is None or journal.last_seq < info["seq"]:
+            # Журнала нет (скопировали один файл) или он старше снимка: открываем снимок,
+            # а при сохранении история начнётся заново
+            return
+        self._journal = journal
+        self._snapshot_seq = self._journal_seq = info["seq"]
+        self._pending = {}
+        self._pending_records = []
+        self._sync_journal(self._source, None)
+
+    def _sync_journal(self, base_source, loading: Optional[Project]):
+        """Накладывает записи журнала, которые дописали другие процессы"""
+        self._journal.refresh()
+        hook = self.encryption.sealer.json_hook
+        for record in self._journal.records_after(self._journal_seq):
+            if record.kind == KIND_OPS:
+                for op in self._journal.read_ops(record, self.encryption, hook):
+                    self._apply_remote(op, record.seq, base_source, loading)
+                self._pending_records.append((record.seq, record.size))
+            self._journal_seq = record.seq
+
+    def _apply_remote(self, op: list, seq: int, base_source, loading: Optional[Project]):
+        name = op[1]
+        proj = self.projects.get(name)
+        if proj is None:
+            proj = Project(name, op[2], op[4] if len(op) > 4 else ()) if op[0] == OP_PROJECT else Project(name)
+            proj._loader = self._load_project
+            proj._dirty = False
+            self._register(proj)
+        elif proj.is_loaded and proj is not loading:
+            self._merge_op(proj, op, base_source)
+        elif op[0] == OP_PROJECT:
+            self._apply_project_op(proj, op)
+        self._pending.setdefault(name, []).append((seq, op))
+
+    def _apply_project_op(self, proj: Project, op: list):
+        """Описание и теги проекта из чужой операции; несохранённые свои теги важнее"""
+        proj.description = op[2]
+        if len(op) > 4 and proj.name not in self._retagged:
+            proj.tags = tuple(op[4])
+            if self._project_index is not None:
+                self._project_index.update_project(proj)
+
+    def _merge_op(self, proj: Project, op: list, base_source):
+        """Накладывает чужую операцию на загруженный проект; доступы, изменённые и у нас, сливаются"""
+        kind = op[0]
+        touched = self._touched.get(proj.name, {})
+        if kind == OP_PROJECT:
+            self._apply_project_op(proj, op)
+            if not op[3]:
+                return
+            changes = {name: None for name in proj.credentials if name not in touched}
+            proj._unknown_rows = []
+        elif kind == OP_DELETE:
+            changes = dict.fromkeys(op[2])
+        else:
+            changes = {_row_name(row): row for row in op[2]}
+
+        overlap = [name for name in changes if name in touched]
+        copies = self._merge_overlap(proj, changes, overlap, base_source) if overlap else []
+        self._apply_changes(proj, changes)
+        if copies:
+            # Копии чужих версий — наши изменения: попадут в журнал при сохранении
+            for name in copies:
+                touched.setdefault(name, "add")
+            proj._dirty = True
+            self.conflicts.extend((proj.name, name) for name in copies)
+
+    def _merge_overlap(self, proj: Project, changes: Dict[str, Optional[list]], overlap: List[str],
+                       base_source) -> List[str]:
+        try:
+            base, _ = self._rows_at(proj.name, self._segments.get(proj.name), base_source,
+                                    self._pending.get(proj.name, ()))
+        except ValueError:
+            base = {}  # базы нет (файл переписан, старый не удержан): различия станут конфликтами
+        ours = {name: proj.credentials[name].to_row() for name in overlap if name in proj.credentials}
+        theirs = {name: changes[name] for name in overlap if changes[name] is not None}
+        merged, copies = merge_rows({name: base[name] for name in overlap if name in base},
+                                    ours, theirs, taken=proj.credentials)
+        for name in overlap:
+            if merged.get(name) == ours.get(name):
+                del changes[name]  # остаётся наша версия
+            else:
+                changes[name] = merged.get(name)
+        for name in copies:
+            changes[name] = merged[name]
+        return copies
+
+    def _apply_changes(self, proj: Project, changes: Dict[str, Optional[list]]):
+        """Применяет чужие строки к загруженному проекту: в журнал они повторно не попадают"""
+        dirty = proj.is_dirty
+        self._applying = True
+        try:
+            for name, row in changes.items():
+                cred = credential_from_row(row) if row is not None else None
+                if cred is not None:
+                    proj.add_credential(cred)
+                    continue
+                proj.remove_credential(name)
+                if row is not None:
+                    proj._unknown_rows.append(row)
+        finally:
+            self._applying = False
+        proj._dirty = dirty
+
+    def _rows_at(self, name: str, segment: Optional[tuple], source=None,
+                 ops: Iterable[Tuple[int, list]] = ()) -> Tuple[Dict[str, list], Project]:
+        snapshot = Project(name)
+        if segment is not None and source is not None:
+            self._read_chunk(snapshot, segment, source)
+        for _, op in ops:
+            replay_op(snapshot, op)
+        return {cname: cred.to_row() for cname, cred in snapshot.credentials.items()}, snapshot
+
+    def _merge_project(self, proj: Project, base_source, base_segment: Optional[tuple], segment: tuple):
+        theirs, theirs_proj = self._rows_at(proj.name, segment, self._source)
+        try:
+            base, _ = self._rows_at(proj.name, base_segment, base_source)
+        except ValueError:
+            # Базы нет (файл переписан, старый не удержан): различия станут конфликтами, но ничего не потеряется
+            base = {}
+        ours = {name: cred.to_row() for name, cred in proj.credentials.items()}
+        merged, copies = merge_rows(base, ours, theirs)
+
+        for name in [name for name in ours if name not in merged]:
+            proj.remove_credential(name)
+        for name, row in merged.items():
+            if ours.get(name) != row:
+                proj.add_credential(credential_from_row(row))
+        proj._unknown_rows = theirs_proj._unknown_rows
+        self.conflicts.extend((proj.name, name) for name in copies)
+
+    def _reload_project(self, proj: Project):
+        """Сбрасывает загруженный, но не изменённый проект: он перечитается с диска при обращении"""
+        for cred in proj._credentials.values():
+            cred.detach()
+        proj._credentials = {}
+        proj._unknown_rows = []
+        proj._loader = self._load_project
+        proj._version += 1
+        for index in self._indexes():
+            index.remove_project(proj.name)
+            index.add_project(proj)
+
+    def _needs_write(self, name: str, proj: Project) -> bool:
+        """Чанк проекта в снимке устарел: есть несохранённые изменения или операции журнала после снимка"""
+        return proj.is_dirty or name not in self._segments or name in self._pending
+
+    def _needs_compaction(self) -> bool:
+        """Мусор от перезаписанных чанков превысил объём живых данных"""
+        live = sum(
+            self._segments[name][1]
+            for name, proj in self.projects.items()
+            if name in self._segments and not self._needs_write(name, proj)
+        )
+        garbage = self._end - live
+        return garbage > self.COMPACT_MIN_BYTES and garbage > live * self.COMPACT_RATIO
+
+    def _needs_fold(self) -> bool:
+        """Операции журнала после снимка заметно обогнали его живые данные"""
+        pending = sum(size for _, size in self._pending_records)
+        live = sum(segment[1] for segment in self._segments.values())
+        return pending > max(self.FOLD_MIN_BYTES, live * self.FOLD_RATIO)
+
+    @profiling.traced("save")
+    def save_to_file(self, filepath: str):
+        """Записывает изменения под межпроцессной блокировкой.
+
+        Обычное сохранение — одна запись в журнале изменений: снимок не переписывается,
+        сколько бы доступов ни было в изменённом проекте. Когда журнал заметно обгоняет
+        снимок, он сворачивается в новый снимок в фоновом потоке (см. fold).
+        Если с момента загрузки файл менял другой процесс, его изменения сначала
+        сливаются с нашими (см. sync_with_disk) — последний писатель ничего не затирает.
+        """
+        path = os.path.abspath(filepath)
+        self.conflicts = []
+        fold = False
+        with FileLock(path):
+            same_file = path == self._source and os.path.exists(path)
+            if same_file and self._disk_changed():
+                self.sync_with_disk()
+            if same_file and self._journal is not None:
+                self._commit()
+                if self.seal_secrets != self._snapshot_sealed:
+                    # Смена режима секретов меняет представление всех чанков: снимок пишется сразу
+                    self._write_snapshot(path, same_file)
+                else:
+                    fold = self._needs_fold()
+            else:
+                # Новый файл или файл без журнала: история начинается с копии снимка
+                self._journal = Journal.create(path, self.encryption.get_salt())
+                self._journal_seq = 0
+                self._touched = {}
+                self._added = {}
+                self._retagged = set()
+                self._write_snapshot(path, same_file)
+            self._stamp = self._stat_stamp(path)
+            self._pin()
+
+        for proj in self.projects.values():
+            proj._dirty = False
+        if fold:
+            self._start_fold(path)
+
+    @profiling.traced("commit")
+    def _commit(self):
+        """Дописывает несохранённые изменения в журнал одной записью"""
+        ops = self._collect_ops()
+        if ops:
+            record = self._journal.append_ops(self.encryption, ops)
+            for op in ops:
+                self._pending.setdefault(op[1], []).append((record.seq, op))
+            self._pending_records.append((record.seq, record.size))
+            self._journal_seq = record.seq
+        self._touched = {}
+        self._added = {}
+        self._retagged = set()
+
+    def _collect_ops(self) -> List[list]:
+        """Операции журнала по несохранённым изменениям; строки берутся из текущих доступов"""
+        sealer = self.encryption.sealer if self.seal_secrets else None
+        ops = []
+        for name, reset in self._added.items():
+            proj = self.projects.get(name)
+            if proj is None:
+                continue
+            ops.append([OP_PROJECT, name, proj.description, reset, list(proj.tags)])
+            rows = _sealed_rows(proj.credentials.values(), sealer) + proj._unknown_rows
+            ops.extend(_row_ops(OP_ADD, name, rows))
+        for name in self._retagged:
+            proj = self.projects.get(name)
+            if proj is not None and name not in self._added:
+                ops.append([OP_PROJECT, name, proj.description, False, list(proj.tags)])
+        for name, events in self._touched.items():
+            proj = self.projects.get(name)
+            if proj is None or name in self._added:
+                continue
+            added, updated, deleted = [], [], []
+            for cred_name, first_event in events.items():
+                cred = proj.credentials.get(cred_name)
+                if cred is not None:
+                    (added if first_event == "add" else updated).append(cred)
+                elif first_event != "add":  # добавлен и удалён до сохранения — в журнале его не было
+                    deleted.append(cred_name)
+            ops.extend(_row_ops(OP_ADD, name, _sealed_rows(added, sealer)))
+            ops.extend(_row_ops(OP_UPDATE, name, _sealed_rows(updated, sealer)))
+            if deleted:
+                ops.append([OP_DELETE, name, deleted])
+        return ops
+
+    def _write_snapshot(self, path: str, same_file: bool):
+        """Записывает снимок, который догоняет журнал, и при необходимости контрольную точку"""
+        self._load_stale()
+        if same_file and self._format_version == storage.FORMAT_VERSION and not self._needs_compaction():
+            self._append_changes(path)
+        else:
+            self._rewrite(path)
+        self._snapshot_written()
+        if self._checkpoint_due():
+            self._checkpoint()
+
+    def _load_stale(self):
+        """Загружает проекты, чанки которых будут переписаны, пока файл и ключ ещё прежние"""
+        for name, proj in self.projects.items():
+            if self._needs_write(name, proj):
+                proj.credentials
+
+    def _snapshot_written(self):
+        self._snapshot_seq = self._journal_seq
+        self._snapshot_sealed = self.seal_secrets
+        self._pending = {}
+        self._pending_records = []
+
+    def _checkpoint_due(self) -> bool:
+        changes = 0
+        for record in self._journal.iter_back():
+            if record.kind == KIND_CHECKPOINT:
+                return changes >= record.size * self.CHECKPOINT_RATIO
+            changes += record.size
+        return True
+
+    def _checkpoint(self):
+        """Копирует только что записанный снимок в журнал (чанки не расшифровываются)"""
+        chunks = (
+            (self._entry(self.projects[name], enc, rev), storage.copy_segment(self._source, offset, size))
+            for name, (offset, size, enc, rev) in self._segments.items()
+        )
+        extra = {"seal_secrets": True} if self.seal_secrets else None
+        self._journal_seq = self._journal.append_checkpoint(self.encryption, chunks, extra).seq
+
+    def _start_fold(self, path: str):
+        if self._fold_thread is not None and self._fold_thread.is_alive():
+            return
+        self.encryption.sealer  # создаётся лениво — не одновременно в двух потоках
+        self._fold_thread = threading.Thread(target=self._fold_quietly, args=(path, self.encryption),
+                                             name="dpo-fold")
+        self._fold_thread.start()
+
+    def wait_for_fold(self):
+        """Дожидается фоновой свёртки журнала"""
+        if self._fold_thread is not None:
+            self._fold_thread.join()
+            self._fold_thread = None
+
+    @classmethod
+    def _fold_quietly(cls, filepath: str, encryption: PasswordEncryption):
+        try:
+            cls.fold(filepath, encryption)
+        except (OSError, ValueError):
+            pass  # журнал цел: свёртка повторится после следующего сохранения
+
+    @classmethod
+    @profiling.traced("fold")
+    def fold(cls, filepath: str, encryption: PasswordEncryption) -> bool:
+        """Сворачивает журнал в новый снимок: переписываются проекты с операциями после снимка.
+
+        Работает на отдельном экземпляре (с вызывающим у него общий только ключ), поэтому
+        годится для фонового потока. Возвращает False, если сворачивать нечего.
+        """
+        vault = cls.load_from_file(filepath, encryption=encryption)
+        with FileLock(vault._source):
+            if vault._disk_changed():
+                vault.sync_with_disk()
+            if vault._journal is None or not vault._pending_records:
+                return False
+            vault._write_snapshot(vault._source, same_file=True)
+        return True
+
+    def _index_extra(self, revision: int) -> dict:
+        extra = {"revision": revision}
+        if self.seal_secrets:
+            extra["seal_secrets"] = True
+        if self._journal is not None:
+            extra["journal"] = {"id": self._journal.id, "seq": self._journal_seq}
+        return extra
+
+    def set_seal_secrets(self, enabled: bool):
+        """Включает/выключает запечатывание секретов; все проекты перепишутся при сохранении"""
+        if enabled == self.seal_secrets:
+            return
+        self.seal_secrets = enabled
+        for proj in self.projects.values():
+            for cred in proj.credentials.values():
+                if not enabled:
+                    cred.unseal()
+            proj.mark_dirty()
+        self.encryption.sealer.forget()
+
+    def forget_secrets(self):
+        """Сбрасывает кэш недавно показанных секретов"""
+        self.encryption.sealer.forget()
+
+    @staticmethod
+    def _entry(proj: Project, enc: str, rev: int) -> dict:
+        entry = {"name": proj.name, "description": proj.description, "enc": enc, "rev": rev}
+        if proj.tags:
+            entry["tags"] = list(proj.tags)
+        return entry
+
+    def _write_project(self, writer: storage.ChunkWriter, proj: Project, rev: int) -> tuple:
+        """Сериализует и шифрует проект потоком прямо в файл"""
+        if self.seal_secrets:
+            enc, blocks = storage.ENC_SPLIT, split_chunk(proj, self.encryption)
+        else:
+            enc = storage.ENC_STREAM
+            blocks = self.encryption.encrypt_stream(profiling.timed("serialize", project_lines(proj)))
+        offset, size = writer.write_stream(self._entry(proj, enc, rev), blocks)
+        return offset, size, enc, rev
+
+    def _append_changes(self, path: str):
+        """Дописывает в конец файла только изменённые чанки и новый индекс"""
+        segments = {}
+        revision = self._revision + 1
+        with open(path, "r+b") as f:
+            # Отрезаем хвост оборванной прошлой записи, если он был
+            f.seek(self._end)
+            f.truncate()
+            writer = storage.ChunkWriter(f)
+            for name, proj in self.projects.items():
+                if self._needs_write(name, proj):
+                    segments[name] = self._write_project(writer, proj, revision)
+                else:
+                    offset, size, enc, rev = segments[name] = self._segments[name]
+                    writer.add_entry(self._entry(proj, enc, rev), offset, size)
+            self._end = writer.finish(self.encryption, self._index_extra(revision))
+        self._segments = segments
+        self._revision = revision
+
+    def _rewrite(self, path: str, transcoder=None):
+        """Полностью переписывает файл (миграция, новый файл, компактизация) через temp + rename"""
+        # Неизменённые проекты копируются из исходного файла как есть, без расшифровки.
+        # При смене ключа их перешифровывает transcoder (см. ChunkTranscoder).
+        can_copy = self._source is not None and os.path.exists(self._source)
+        copied = [name for name, proj in self.projects.items() if can_copy and not self._needs_write(name, proj)]
+        if transcoder is None:
+            chunks = ((self._segments[name][2], storage.copy_segment(self._source, *self._segments[name][:2]))
+                      for name in copied)
+        else:
+            chunks = transcoder.map([(name, self._source, self._segments[name], self._snapshot_sealed)
+                                     for name in copied])
+        tmp_path = f"{path}.tmp"
+        segments = {}
+        revision = self._revision + 1
+
+        with open(tmp_path, "wb") as f:
+            writer = storage.ChunkWriter(f, {"salt": self.encryption.get_salt(),
+                                             "kdf": self.encryption.kdf.to_dict(),
+                                             "check": self.encryption.key_check()})
+            copying = set(copied)
+            for name, proj in self.projects.items():
+                if name not in copying:
+                    segments[name] = self._write_project(writer, proj, revision)
+                    continue
+                enc, data = next(chunks)
+                rev = self._segments[name][3]
+                new_offset, new_size = writer.write_stream(self._entry(proj, enc, rev), data)
+                segments[name] = (new_offset, new_size, enc, rev)
+            end = writer.finish(self.encryption, self._index_extra(revision))
+
+        os.replace(tmp_path, path)
+        self._source = path
+        self._segments = segments
+        self._end = end
+        self._format_version = storage.FORMAT_VERSION
+        self._revision = revision
+
+    @classmethod
+    def read_key_params(cls, filepath: str) -> Tuple[bytes, KDF]:
+        """Читает соль и параметры KDF, не расшифровывая файл (нужны, чтобы найти ключ у агента)"""
+        if storage.is_chunked_file(filepath):
+            with open(filepath, "rb") as f:
+                header, _ = storage.read_header(f)
+            return header["salt"], kdf_from_dict(header.get("kdf"))
+        with open(filepath, "rb") as f:
+            f.seek(-cls.SALT_LENGTH, os.SEEK_END)
+            return f.read(cls.SALT_LENGTH), default_kdf()
+
+    @staticmethod
+    def _decryptor(salt: bytes, kdf: KDF, master_password: Optional[str],
+                   encryption: Optional[PasswordEncryption], check: Optional[str] = None) -> PasswordEncryption:
+        if encryption is not None:
+            if encryption.get_salt() != salt or encryption.kdf != kdf:
+                raise WrongPasswordError("Ключ не соответствует параметрам файла")
+        else:
+            encryption = PasswordEncryption.from_salt_and_password(master_password, salt, kdf)
+        # Проверочное значение есть в файлах, записанных с ним (см. PasswordEncryption.key_check)
+        if check is not None and not encryption.matches_check(check):
+            raise WrongPasswordError("❌ Неверный мастер-пароль")
+        return encryption
+
+    @profiling.traced("rekey")
+    def rekey(self, filepath: str, encryption: PasswordEncryption, workers: Optional[int] = None):
+        """Перешифровывает vault новым ключом (новые соль/KDF), не выгружая данные в открытом виде.
+
+        Чанки расшифровываются старым ключом и сразу шифруются новым, а чанки с запечатанными
+        секретами запечатываются заново; большие хранилища — в пуле из workers процессов
+        (по умолчанию по числу ядер, см. ChunkTranscoder). Снимок заменяется атомарно.
+        Журнал изменений перешифровывается во временный файл и ставится на место после снимка:
+        если замену прервать между ними, Journal.open подберёт готовый временный журнал.
+        """
+        from .transcode import ChunkTranscoder  # transcode сам импортирует models
+
+        path = os.path.abspath(filepath)
+        self.conflicts = []
+        self.wait_for_fold()
+        with FileLock(path):
+            same_file = path == self._source and os.path.exists(path)
+            if same_file and self._disk_changed():
+                self.sync_with_disk()
+            if same_file and self._journal is not None:
+                self._commit()
+            self._load_stale()
+            previous, previous_journal, previous_seq = self.encryption, self._journal, self._journal_seq
+            self.encryption = encryption
+            try:
+                with ChunkTranscoder(previous, encryption, workers) as transcoder:
+                    if same_file and previous_journal is not None:
+                        self._journal = self._rekey_journal(previous_journal, transcoder)
+                    else:
+                        self._journal = Journal.create(path, encryption.get_salt(), temporary=True)
+                        self._journal_seq = 0
+                    self._rewrite(path, transcoder)
+            except Exception:
+                self.encryption, self._journal, self._journal_seq = previous, previous_journal, previous_seq
+                raise
+            self._journal.install()
+            self._touched = {}
+            self._added = {}
+            self._retagged = set()
+            # Отпечатки аудита выведены из старого ключа: индекс построится заново новым
+            self._audit_index = None
+            self._snapshot_written()
+            if self._checkpoint_due():
+                self._checkpoint()
+            self._stamp = self._stat_stamp(path)
+            self._pin()
+
+        for proj in self.projects.values():
+            proj._dirty = False
+
+    def _rekey_journal(self, journal: Journal, transcoder) -> Journal:
+        """Копия журнала под текущим ключом во временном файле: те же записи, номера и время"""
+        previous = transcoder.previous
+        rekeyed = Journal.create(self._source, self.encryption.get_salt(), journal_id=journal.id, temporary=True)
+        sealer = self.encryption.sealer
+        for record in journal.records_after(0):
+            if record.kind == KIND_OPS:
+                ops = journal.read_ops(record, previous, previous.sealer.json_hook)
+                rekeyed.append_ops(self.encryption, [_resealed(op, sealer) for op in ops], like=record)
+                continue
+            index = journal.read_checkpoint(record, previous)
+            entries = index["projects"]
+            transcoded = transcoder.map([
+                (entry["name"], journal.path, self._segment(entry), index.get("seal_secrets", False))
+                for entry in entries])
+            chunks = ((self._entry(project_from_entry(entry), enc, entry.get("rev", 0)),
+                       blocks) for entry, (enc, blocks) in zip(entries, transcoded))
+            extra = {key: value for key, value in index.items() if key not in ("projects", "seq", "t")}
+            rekeyed.append_checkpoint(self.encryption, chunks, extra, like=record)
+        return rekeyed
+
+    # --- История изменений ---
+
+    def history(self, project: Optional[str] = None, name: Optional[str] = None) -> Iterator[HistoryEntry]:
+        """События журнала от последнего к первому; секреты при этом не расшифровываются"""
+        if self._journal is None:
+            return
+        self._journal.refresh()
+        for record in self._journal.iter_back():
+            if record.kind != KIND_OPS:
+                continue
+            entries = []
+            for op in self._journal.read_ops(record, self.encryption):
+                if project is not None and op[1] != project:
+                    continue
+                if op[0] == OP_PROJECT:
+                    if name is None:
+                        entries.append(HistoryEntry(record.seq, record.time, OP_PROJECT, op[1], None))
+                    continue
+                names = op[2] if op[0] == OP_DELETE else [_row_name(row) for row in op[2]]
+                entries.extend(HistoryEntry(record.seq, record.time, op[0], op[1], cred_name)
+                               for cred_name in names if name is None or cred_name == name)
+            yield from reversed(entries)
+
+    def state_at(self, until: Optional[float] = None, seq: Optional[int] = None,
+                 project: Optional[str] = None) -> Dict[str, Project]:
+        """Проекты в состоянии на момент until (unix-время) или после записи журнала seq.
+
+        Берётся ближайшая контрольная точка не позже границы, поверх неё проигрываются
+        более поздние записи операций. project — восстановить только один проект.
+        """
+        if self._journal is None:
+            raise ValueError("❌ У хранилища ещё нет журнала изменений")
+        self._journal.refresh()
+        records = []
+        for record in self._journal.iter_back():
+            if (seq is not None and record.seq > seq) or (until is not None and record.time > until):
+                continue
+            if record.kind == KIND_CHECKPOINT:
+                checkpoint = record
+                break
+            records.append(record)
+        else:
+            raise ValueError("❌ История журнала начинается позже этого момента")
+
+        projects: Dict[str, Project] = {}
+        for entry in self._journal.read_checkpoint(checkpoint, self.encryption)["projects"]:
+            if project is None or entry["name"] == project:
+                proj = projects[entry["name"]] = project_from_entry(entry)
+                self._read_chunk(proj, self._segment(entry), self._journal.path)
+        hook = self.encryption.sealer.json_hook
+        for record in reversed(records):
+            for op in self._journal.read_ops(record, self.encryption, hook):
+                if project is not None and op[1] != project:
+                    continue
+                proj = projects.get(op[1])
+                if proj is None:
+                    proj = projects[op[1]] = Project(op[1])
+                replay_op(proj, op)
+        return projects
+
+    def restore(self, state: Dict[str, Project], project: Optional[str] = None,
+                name: Optional[str] = None) -> RestoreStats:
+        """Возвращает доступы к состоянию из state_at (как обычные изменения — их нужно сохранить).
+
+        Проекты, которых тогда ещё не было, не трогаются; project/name сужают восстановление.
+        """
+        stats = RestoreStats()
+        for proj_name, past in state.items():
+            if project is not None and proj_name != project:
+                continue
+            current = self.projects.get(proj_name)
+            if current is None:
+                current = Project(proj_name, past.description, past.tags)
+                self.add_project(current)
+            names = list(past.credentials) + [n for n in current.credentials if n not in past.credentials]
+            for cred_name in names:
+                if name is not None and cred_name != name:
+                    continue
+                before = current.credentials.get(cred_name)
+                after = past.credentials.get(cred_name)
+                if after is None:
+                    current.remove_credential(cred_name)
+                    stats.removed += 1
+                elif before is None or before.to_dict() != after.to_dict():
+                    # Через открытые значения: при сохранении секреты запечатаются заново, если нужно
+                    current.add_credential(credential_from_dict(after.to_dict()))
+                    if before is None:
+                        stats.added += 1
+                    else:
+                        stats.updated += 1
+        return stats
+
+    @classmethod
+    @profiling.traced("unlock")
+    def load_from_file(cls, filepath: str, master_password: str = None,
+                       encryption: PasswordEncryption = None):
+        if not os.path.exists(filepath):
+            raise FileNotFoundError("Файл Vault не найден.")
+
+        # Причина различается подклассом VaultError; исходная ошибка — в __cause__
+        try:
+            if storage.is_chunked_file(filepath):
+                return cls._load_chunked(filepath, master_password, encryption)
+            return cls._load_legacy(filepath, master_password, encryption)
+        except VaultError as e:
+            if str(e).startswith("❌"):
+                raise
+            raise type(e)(f"❌ {e}") from e  # ошибки storage и journal — без пометки для пользователя
+        except (json.JSONDecodeError, KeyError, TypeError, AttributeError) as e:
+            raise SchemaError("❌ Файл расшифрован, но не в формате хранилища") from e
+        except OSError as e:
+            raise VaultError(f"❌ Не удалось прочитать файл: {e.strerror}") from e
+        except Exception as e:
+            raise VaultError("❌ Неверный мастер-пароль или повреждённый файл") from e
+
+    @classmethod
+    def _load_chunked(cls, filepath: str, master_password: Optional[str],
+                      encryption: Optional[PasswordEncryption]):
+        # Расшифровывается только индекс, проекты — при первом обращении
+        with open(filepath, "rb") as f:
+            header, _ = storage.read_header(f)
+            check = header.get("check")
+            decryptor = cls._decryptor(header["salt"], kdf_from_dict(header.get("kdf")),
+                                       master_password, encryption, check)
+            try:
+                index, end = storage.read_index(f, decryptor)
+            except VaultError:
+                raise
+            except Exception as e:
+                if check is None:
+                    # Файл без проверочного значения: по ошибке расшифровки пароль от порчи не отличить
+                    raise WrongPasswordError("❌ Неверный мастер-пароль или повреждённый файл") from e
+                raise CorruptedFileError("❌ Индекс хранилища повреждён") from e
+            stamp = cls._stat_stamp(filepath)
+
+        vault = cls(encryption=decryptor)
+        vault._source = os.path.abspath(filepath)
+        vault._end = end
+        vault._format_version = header["version"]
+        vault._revision = index.get("revision", 0)
+        vault.seal_secrets = index.get("seal_secrets", False)
+        vault._stamp = stamp
+        vault._pin()
+        for entry in index.get("projects", []):
+            proj = project_from_entry(entry)
+            proj._loader = vault._load_project
+            proj._dirty = False
+            vault._segments[proj.name] = cls._segment(entry)
+            vault._register(proj)
+        vault._attach_journal(index)
+        return vault
+
+    @classmethod
+    def _load_legacy(cls, filepath: str, master_password: Optional[str],
+                     encryption: Optional[PasswordEncryption]):
+        # Старый формат: один токен Fernet + соль в конце.
+        # При следующем сохранении файл будет переписан в чанковом формате.
+        with open(filepath, "rb") as f:
+            full_data = f.read()
+
+        if len(full_data) < cls.SALT_LENGTH:
+            raise CorruptedFileError("❌ Файл поврежден")
+
+        # 1. Извлекаем соль (последние 16 байт)
+        salt = full_data[-cls.SALT_LENGTH:]
+        encrypted_data = full_data[:-cls.SALT_LENGTH]
+
+        # 2. Дешифруем
+        decryptor = cls._decryptor(salt, default_kdf(), master_password, encryption)
+        try:
+            json_str = decryptor.decrypt(encrypted_data)
+        except Exception as e:
+            raise WrongPasswordError("❌ Неверный мастер-пароль или повреждённый файл") from e
+        with profiling.span("parse", bytes=len(json_str)):
+            data = json.loads(json_str)
+
+        # 3. Восстанавливаем объекты
+        vault = cls(encryption=decryptor)
+        vault._format_version = 0
+
+        # .get("projects", {}) защищает от ошибки, если проектов нет
+        with profiling.span("rebuild"):
+            for proj_data in data.get("projects", {}).values():
+                proj = Project(proj_data["name"], proj_data["description"])
+                fill_project(proj, proj_data)
+                vault.add_project(proj)
+        return vault
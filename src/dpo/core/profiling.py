@@ -0,0 +1,196 @@
+"""Замеры длительности и объёма данных по этапам работы с хранилищем (по запросу).
+
+Включается переменной окружения DPO_PROFILE=<файл> или флагом CLI --profile <файл>
+("-" — в stderr). При выходе из процесса замеры пишутся в JSON формата Trace Event
+(открывается в chrome://tracing и Perfetto), а в otherData.summary — сводка по этапам:
+число вызовов, общее и собственное время (без вложенных этапов), байты.
+
+Этапы: kdf, read, decrypt, parse, rebuild, serialize, encrypt, write, fsync и
+охватывающие их unlock, load_project, save, commit, fold, rekey. В аргументы замеров
+попадают только размеры, счётчики и названия алгоритмов — ни секретов, ни имён
+проектов и доступов. Ошибка внутри этапа записывается как имя класса исключения.
+
+Выключенные замеры почти ничего не стоят: span() возвращает общий пустой контекст,
+timed() — итератор без обёртки, traced() — одна проверка на вызов.
+"""
+import atexit
+import functools
+import json
+import os
+import sys
+import threading
+import time
+from typing import Dict, Iterable, List, Optional
+
+ENV_VAR = "DPO_PROFILE"
+
+# (название, начало, конец в нс, поток, аргументы); None — замеры выключены
+_events: Optional[List[tuple]] = None
+_output: Optional[str] = None
+
+
+class _Span:
+    __slots__ = ("name", "args", "start")
+
+    def __init__(self, name: str, args: dict):
+        self.name = name
+        self.args = args
+
+    def __enter__(self) -> dict:
+        self.start = time.perf_counter_ns()
+        return self.args
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is not None:
+            self.args["error"] = exc_type.__name__
+        if _events is not None:  # замеры могли выключить внутри этапа
+            _events.append((self.name, self.start, time.perf_counter_ns(), threading.get_ident(), self.args))
+
+
+class _NullSpan:
+    __slots__ = ()
+
+    def __enter__(self) -> dict:
+        return {}
+
+    def __exit__(self, exc_type, exc, tb):
+        return None
+
+
+_NULL_SPAN = _NullSpan()
+
+
+def enabled() -> bool:
+    return _events is not None
+
+
+def enable(output: Optional[str] = None):
+    """Включает замеры; output — куда записать их при выходе (None — не записывать)"""
+    global _events, _output
+    if _events is None:
+        _events = []
+        atexit.register(_dump_at_exit)
+    if output is not None:
+        _output = output
+
+
+def disable() -> List[tuple]:
+    """Выключает замеры и возвращает накопленные"""
+    global _events, _output
+    events, _events, _output = _events or [], None, None
+    return events
+
+
+def span(name: str, **args):
+    """Контекст замера этапа: `with span("read", bytes=n) as args:` — args можно дополнять"""
+    if _events is None:
+        return _NULL_SPAN
+    return _Span(name, args)
+
+
+def traced(name: str):
+    """Декоратор: каждый вызов функции — замер этапа name"""
+    def decorate(fn):
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            if _events is None:
+                return fn(*args, **kwargs)
+            with _Span(name, {}):
+                return fn(*args, **kwargs)
+        return wrapper
+    return decorate
+
+
+def timed(name: str, iterable: Iterable, **args) -> Iterable:
+    """Итератор, каждый шаг которого — отдельный замер (потоковое шифрование, сериализация)"""
+    if _events is None:
+        return iterable
+    return _timed(name, iter(iterable), args)
+
+
+def _timed(name: str, iterator, args: dict):
+    ident = threading.get_ident()
+    try:
+        while True:
+            start = time.perf_counter_ns()
+            try:
+                item = next(iterator)
+            except StopIteration:
+                return
+            except Exception as e:
+                if _events is not None:
+                    _events.append((name, start, time.perf_counter_ns(), ident, {**args, "error": type(e).__name__}))
+                raise
+            end = time.perf_counter_ns()
+            if _events is not None:
+                _events.append((name, start, end, ident, {**args, "bytes": len(item)}))
+            yield item
+    finally:
+        # close() обёртки закрывает и исходный генератор (он может держать отображение файла)
+        close = getattr(iterator, "close", None)
+        if close is not None:
+            close()
+
+
+def summary(events: Optional[List[tuple]] = None) -> Dict[str, dict]:
+    """Сводка по этапам: вызовы, общее и собственное время (мс), байты"""
+    events = _events if events is None else events
+    stats: Dict[str, dict] = {}
+    # Собственное время — без вложенных этапов того же потока
+    by_thread: Dict[int, List[tuple]] = {}
+    for event in events or ():
+        by_thread.setdefault(event[3], []).append(event)
+    for thread_events in by_thread.values():
+        thread_events.sort(key=lambda e: (e[1], -e[2]))
+        stack: List[list] = []
+        for name, start, end, _, args in thread_events:
+            while stack and stack[-1][1] <= start:
+                _close(stats, stack.pop())
+            if stack:
+                stack[-1][2] += end - start
+            stack.append([name, end, 0, end - start, args.get("bytes", 0)])
+        while stack:
+            _close(stats, stack.pop())
+    return stats
+
+
+def _close(stats: Dict[str, dict], frame: list):
+    name, _, children, duration, size = frame
+    item = stats.setdefault(name, {"count": 0, "total_ms": 0.0, "self_ms": 0.0, "bytes": 0})
+    item["count"] += 1
+    item["total_ms"] += duration / 1e6
+    item["self_ms"] += (duration - children) / 1e6
+    item["bytes"] += size
+
+
+def trace(events: Optional[List[tuple]] = None) -> dict:
+    """Замеры в формате Trace Event (время в микросекундах от первого замера)"""
+    events = list((_events or []) if events is None else events)
+    origin = min((e[1] for e in events), default=0)
+    pid = os.getpid()
+    trace_events = [
+        {"name": name, "cat": "dpo", "ph": "X", "ts": (start - origin) / 1000, "dur": (end - start) / 1000,
+         "pid": pid, "tid": tid, "args": args}
+        for name, start, end, tid, args in events
+    ]
+    stats = {name: {**item, "total_ms": round(item["total_ms"], 3), "self_ms": round(item["self_ms"], 3)}
+             for name, item in sorted(summary(events).items())}
+    return {"traceEvents": trace_events, "displayTimeUnit": "ms", "otherData": {"summary": stats}}
+
+
+def dump(output: str, events: Optional[List[tuple]] = None):
+    data = json.dumps(trace(events), ensure_ascii=False)
+    if output == "-":
+        print(data, file=sys.stderr)
+        return
+    with open(output, "w", encoding="utf-8") as f:
+        f.write(data)
+
+
+def _dump_at_exit():
+    if _events is not None and _output is not None:
+        dump(_output)
+
+
+if os.environ.get(ENV_VAR):
+    enable(os.environ[ENV_VAR])
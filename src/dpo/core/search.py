@@ -0,0 +1,269 @@
+"""Инвертированный индекс для поиска доступов по всем проектам.
+
+Индексируются название доступа, хост, пользователь, порт и имя проекта.
+Поддерживаются префиксные и подстрочные запросы (через триграммы термов),
+а если точных совпадений нет — нечёткий поиск по близким термам.
+Отбор кандидатов идёт операциями над множествами, поэтому запрос
+не перебирает весь vault.
+"""
+import bisect
+import difflib
+import heapq
+import re
+from typing import Dict, List, Optional, Set, Tuple
+
+# Вес поля в ранжировании
+FIELD_WEIGHTS = {"name": 3.0, "project": 2.0, "host": 1.5, "user": 1.0, "port": 1.0}
+
+# Бонус за тип совпадения терма с частью запроса
+EXACT, PREFIX, SUBSTRING, FUZZY = 4.0, 2.0, 1.0, 0.5
+
+_SPLIT = re.compile(r"[^\w]+", re.UNICODE)
+
+
+def tokenize(value) -> List[str]:
+    """Части значения между разделителями: 'db-1.prod' -> db, 1, prod.
+
+    Запрос режется по тем же разделителям, поэтому значение целиком как терм не нужно.
+    """
+    return [p for p in _SPLIT.split(str(value).lower()) if p]
+
+
+def _trigrams(term: str) -> Set[str]:
+    return {term[i:i + 3] for i in range(len(term) - 2)}
+
+
+class SearchHit:
+    __slots__ = ("project", "name", "score")
+
+    def __init__(self, project: str, name: str, score: float):
+        self.project = project
+        self.name = name
+        self.score = score
+
+    def __repr__(self):
+        return f"SearchHit({self.project!r}, {self.name!r}, {self.score:.1f})"
+
+
+class SearchIndex:
+    # Больше кандидатов — ранжируются только лучшие уровни совпадения
+    RANK_ALL_LIMIT = 2000
+    # Меньше кандидатов — следующие слова запроса проверяются по термам кандидата
+    FILTER_LIMIT = 5000
+    # Столько новых термов вставляются в отсортированный список по одному
+    INSORT_LIMIT = 1000
+
+    def __init__(self):
+        self._next_id = 0
+        self._doc_ids: Dict[Tuple[str, str], int] = {}
+        self._docs: Dict[int, Tuple[str, str]] = {}
+        # doc -> {терм: вес} (для ранжирования и удаления без повторной токенизации)
+        self._doc_terms: Dict[int, Dict[str, float]] = {}
+        # терм -> {вес лучшего поля: документы}; разбивка по весу позволяет
+        # набирать лучшие результаты широкого запроса, не трогая остальные
+        self._postings: Dict[str, Dict[float, Set[int]]] = {}
+        # отсортированные термы для префиксных запросов и триграммы для подстрочных;
+        # новые термы копятся в _pending и вливаются в _terms перед запросом
+        self._terms: List[str] = []
+        self._pending: List[str] = []
+        self._trigram_terms: Dict[str, Set[str]] = {}
+
+    def __len__(self):
+        return len(self._docs)
+
+    # --- Обновление ---
+
+    def add(self, project_name: str, credential):
+        key = (project_name, credential.name)
+        if key in self._doc_ids:
+            self.remove(*key)
+
+        doc = self._next_id
+        self._next_id += 1
+        self._doc_ids[key] = doc
+        self._docs[doc] = key
+
+        fields = {
+            "name": credential.name,
+            "project": project_name,
+            "host": credential.host,
+            "user": credential.user,
+            "port": credential.port,
+        }
+        weights: Dict[str, float] = {}
+        for field, value in fields.items():
+            for term in tokenize(value):
+                weights[term] = max(weights.get(term, 0.0), FIELD_WEIGHTS[field])
+
+        for term, weight in weights.items():
+            postings = self._postings.get(term)
+            if postings is None:
+                postings = self._postings[term] = {}
+                self._add_term(term)
+            postings.setdefault(weight, set()).add(doc)
+        self._doc_terms[doc] = weights
+
+    def remove(self, project_name: str, credential_name: str):
+        doc = self._doc_ids.pop((project_name, credential_name), None)
+        if doc is None:
+            return
+        del self._docs[doc]
+        for term, weight in self._doc_terms.pop(doc).items():
+            postings = self._postings[term]
+            docs = postings[weight]
+            docs.discard(doc)
+            if not docs:
+                del postings[weight]
+            if not postings:
+                del self._postings[term]
+                self._remove_term(term)
+
+    def add_project(self, project):
+        for credential in project.credentials.values():
+            self.add(project.name, credential)
+
+    def remove_project(self, project_name: str):
+        for key in [k for k in self._doc_ids if k[0] == project_name]:
+            self.remove(*key)
+
+    def _add_term(self, term: str):
+        self._pending.append(term)
+        for gram in _trigrams(term):
+            self._trigram_terms.setdefault(gram, set()).add(term)
+
+    def _remove_term(self, term: str):
+        self._flush_terms()
+        i = bisect.bisect_left(self._terms, term)
+        if i < len(self._terms) and self._terms[i] == term:
+            del self._terms[i]
+        for gram in _trigrams(term):
+            terms = self._trigram_terms.get(gram)
+            if terms is not None:
+                terms.discard(term)
+                if not terms:
+                    del self._trigram_terms[gram]
+
+    def _flush_terms(self):
+        if not self._pending:
+            return
+        if len(self._pending) < self.INSORT_LIMIT:
+            for term in self._pending:
+                bisect.insort(self._terms, term)
+        else:
+            # Массовая загрузка (построение индекса): одна сортировка вместо тысяч вставок
+            self._terms.extend(self._pending)
+            self._terms.sort()
+        self._pending = []
+
+    # --- Поиск ---
+
+    def _prefix_terms(self, prefix: str) -> List[str]:
+        i = bisect.bisect_left(self._terms, prefix)
+        j = bisect.bisect_left(self._terms, prefix + "\uffff", i)
+        return self._terms[i:j]
+
+    def _substring_terms(self, part: str) -> List[str]:
+        # Для частей короче триграммы подстрочный поиск не делаем — только префиксы
+        if len(part) < 3:
+            return []
+        grams = sorted(_trigrams(part), key=lambda g: len(self._trigram_terms.get(g, ())))
+        candidates = self._trigram_terms.get(grams[0], set())
+        for gram in grams[1:]:
+            if not candidates:
+                break
+            candidates = candidates & self._trigram_terms.get(gram, set())
+        return [t for t in candidates if part in t and not t.startswith(part)]
+
+    def _match_tiers(self, part: str, fuzzy: bool) -> List[Tuple[float, List[str]]]:
+        """Термы, подходящие под слово запроса, по уровням: точные, префиксные, подстрочные"""
+        tiers = []
+        prefix = [t for t in self._prefix_terms(part) if t != part]
+        if part in self._postings:
+            tiers.append((EXACT, [part]))
+        if prefix:
+            tiers.append((PREFIX, prefix))
+        substring = self._substring_terms(part)
+        if substring:
+            tiers.append((SUBSTRING, substring))
+        if not tiers and fuzzy:
+            close = difflib.get_close_matches(part, self._terms, n=5, cutoff=0.75)
+            if close:
+                tiers.append((FUZZY, close))
+        return tiers
+
+    def _docs_of(self, tiers: List[Tuple[float, List[str]]]) -> Set[int]:
+        return set().union(*(docs for _, terms in tiers for t in terms for docs in self._postings[t].values()))
+
+    def _estimate(self, tiers: List[Tuple[float, List[str]]]) -> int:
+        return sum(len(docs) for _, terms in tiers for t in terms for docs in self._postings[t].values())
+
+    def _matches(self, doc: int, bonuses: Dict[str, float]) -> bool:
+        return any(term in bonuses for term in self._doc_terms[doc])
+
+    def _score(self, doc: int, part_bonuses: List[Dict[str, float]]) -> float:
+        # Перебираем термы самого документа (их единицы), а не все подошедшие термы
+        total = 0.0
+        for bonuses in part_bonuses:
+            best = 0.0
+            for term, weight in self._doc_terms[doc].items():
+                bonus = bonuses.get(term)
+                if bonus is not None and weight * bonus > best:
+                    best = weight * bonus
+            total += best
+        return total
+
+    def _best_levels(self, tiers: List[Tuple[float, List[str]]], candidates: Optional[Set[int]],
+                     need: int) -> Set[int]:
+        """Документы из лучших уровней (тип совпадения × вес поля), пока их не наберётся need"""
+        levels = sorted(
+            {(bonus * weight, bonus, weight) for bonus, terms in tiers for t in terms for weight in self._postings[t]},
+            reverse=True,
+        )
+        pool: Set[int] = set()
+        for _, bonus, weight in levels:
+            for bonus_, terms in tiers:
+                if bonus_ != bonus:
+                    continue
+                for term in terms:
+                    for doc in self._postings[term].get(weight, ()):
+                        if candidates is None or doc in candidates:
+                            pool.add(doc)
+                            if len(pool) >= need:
+                                return pool
+        return pool
+
+    def search(self, query: str, limit: int = 20, fuzzy: bool = True) -> List[SearchHit]:
+        parts = list(dict.fromkeys(p for p in _SPLIT.split(query.lower()) if p))
+        if not parts:
+            return []
+        self._flush_terms()
+
+        part_tiers = [self._match_tiers(part, fuzzy) for part in parts]
+        if not all(part_tiers):
+            return []
+        part_bonuses = [{t: bonus for bonus, terms in reversed(tiers) for t in terms} for tiers in part_tiers]
+
+        # Кандидаты для запроса из нескольких слов: все слова должны совпасть (AND).
+        # Начинаем с самого узкого слова; дальше пересекаем множества или, если
+        # кандидатов уже мало, проверяем термы каждого кандидата.
+        candidates = None
+        if len(parts) > 1:
+            order = sorted(range(len(parts)), key=lambda i: self._estimate(part_tiers[i]))
+            candidates = self._docs_of(part_tiers[order[0]])
+            for i in order[1:]:
+                if len(candidates) <= self.FILTER_LIMIT:
+                    candidates = {doc for doc in candidates if self._matches(doc, part_bonuses[i])}
+                else:
+                    candidates &= self._docs_of(part_tiers[i])
+                if not candidates:
+                    return []
+
+        # Широкий запрос: точно ранжируем только документы из лучших уровней
+        # совпадения последнего слова (его обычно и дописывает пользователь)
+        if candidates is None or len(candidates) > self.RANK_ALL_LIMIT:
+            candidates = self._best_levels(part_tiers[-1], candidates, limit * 4)
+
+        scored = ((doc, self._score(doc, part_bonuses)) for doc in candidates)
+        # При равных очках выше короткие названия
+        best = heapq.nlargest(limit, scored, key=lambda item: (item[1], -len(self._docs[item[0]][1])))
+        return [SearchHit(*self._docs[doc], score) for doc, score in best]
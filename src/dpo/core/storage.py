@@ -0,0 +1,252 @@
+import json
+import os
+import struct
+import base64
+import mmap
+from contextlib import contextmanager
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple, Union
+
+from . import profiling
+from .errors import CorruptedFileError, SchemaError
+
+# Формат файла v6 (чанковый; v5 — без раздельных чанков запечатанных проектов,
+# v4 — без журнала изменений, v3 — только чанки Fernet, v2 — без параметров KDF в заголовке):
+#   MAGIC | версия (1 байт) | длина заголовка (4 байта) | заголовок JSON (открытый: соль, KDF,
+#   проверочное значение ключа — с ним неверный пароль отличается от порчи файла)
+#   чанк проекта 1 | чанк проекта 2 | ...
+#   индекс (токен Fernet: имена проектов, смещения, размеры, кодировка чанков)
+#   FOOTER_MAGIC | смещение индекса (8 байт) | длина индекса (4 байта)
+#
+# Кодировка чанка указана в его записи индекса (enc): ENC_STREAM — потоковый AES-GCM
+# поверх JSON Lines, без enc — один токен Fernet с JSON проекта (файлы до v4).
+# ENC_SPLIT (режим запечатанных секретов) — два потока ENC_STREAM подряд:
+#   метаданные (строки доступов со ссылками на секреты) | токены секретов | длина первого (8 байт)
+# Список проектов, поиск и каталог расшифровывают только первый поток.
+#
+# Инкрементальное сохранение дописывает изменённые чанки, новый индекс и новый футер
+# в конец файла. Футер пишется последним после fsync данных, поэтому при сбое во
+# время записи в файле остаётся предыдущий валидный футер, который находит read_index.
+# С v6 в индексе есть id журнала изменений и номер его записи, до которой дошёл снимок
+# (см. journal): обычное сохранение пишет только в журнал.
+MAGIC = b"DPOV"
+FORMAT_VERSION = 6
+FOOTER_MAGIC = b"DPOI"
+
+ENC_FERNET = "fernet"
+ENC_STREAM = "aesgcm-stream"
+ENC_SPLIT = "aesgcm-split"
+
+_PREAMBLE = struct.Struct(">4sBI")
+_FOOTER = struct.Struct(">4sQI")
+# Хвост чанка ENC_SPLIT: длина потока метаданных
+SPLIT_TRAILER = struct.Struct(">Q")
+
+
+def is_chunked_file(filepath: str) -> bool:
+    """Проверяет, записан ли файл в чанковом формате (а не одним блобом)"""
+    with open(filepath, "rb") as f:
+        return f.read(len(MAGIC)) == MAGIC
+
+
+def read_header(f) -> Tuple[dict, int]:
+    """Читает открытый заголовок. Возвращает (заголовок, смещение начала данных)"""
+    f.seek(0)
+    preamble = f.read(_PREAMBLE.size)
+    if len(preamble) < _PREAMBLE.size:
+        raise CorruptedFileError("Файл поврежден")
+    magic, version, header_len = _PREAMBLE.unpack(preamble)
+    if magic != MAGIC:
+        raise CorruptedFileError("Неизвестный формат файла")
+    if version > FORMAT_VERSION:
+        raise SchemaError(f"Версия формата {version} не поддерживается")
+
+    try:
+        header = json.loads(f.read(header_len).decode("utf-8"))
+        header["salt"] = base64.b64decode(header["salt"])
+    except (ValueError, KeyError, TypeError) as e:
+        raise CorruptedFileError("Заголовок файла повреждён") from e
+    header["version"] = version
+    return header, _PREAMBLE.size + header_len
+
+
+def _footer_at(f, pos: int) -> Optional[Tuple[int, int]]:
+    """Возвращает (смещение, длина) индекса, если в позиции pos лежит согласованный футер"""
+    f.seek(pos)
+    raw = f.read(_FOOTER.size)
+    if len(raw) < _FOOTER.size:
+        return None
+    magic, offset, length = _FOOTER.unpack(raw)
+    if magic != FOOTER_MAGIC or offset + length != pos:
+        return None
+    return offset, length
+
+
+def _find_last_footer(f, size: int) -> int:
+    """Ищет последний целый футер (после оборванной дозаписи хвост файла — мусор)"""
+    with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+        pos = mm.rfind(FOOTER_MAGIC, 0, size - _FOOTER.size + 1)
+        while pos >= 0:
+            if _footer_at(f, pos) is not None:
+                return pos
+            pos = mm.rfind(FOOTER_MAGIC, 0, pos)
+    raise CorruptedFileError("Файл поврежден")
+
+
+def read_index(f, encryption) -> Tuple[dict, int]:
+    """Читает и расшифровывает индекс проектов. Возвращает (индекс, конец валидных данных)"""
+    size = f.seek(0, os.SEEK_END)
+    pos = size - _FOOTER.size
+    if pos < 0:
+        raise CorruptedFileError("Файл поврежден")
+    if _footer_at(f, pos) is None:
+        pos = _find_last_footer(f, size)
+
+    end = pos + _FOOTER.size
+    return read_index_before(f, end, encryption), end
+
+
+def read_index_before(f, end: int, encryption) -> dict:
+    """Читает индекс по футеру, который заканчивается в позиции end (так читаются и контрольные точки журнала)"""
+    footer = _footer_at(f, end - _FOOTER.size)
+    if footer is None:
+        raise CorruptedFileError("Файл поврежден")
+    offset, length = footer
+    f.seek(offset)
+    with profiling.span("read", bytes=length):
+        token = f.read(length)
+    data = encryption.decrypt(token)
+    try:
+        with profiling.span("parse", bytes=len(data)):
+            return json.loads(data)
+    except ValueError as e:
+        raise SchemaError("Индекс не в формате JSON") from e
+
+
+class PinnedFile:
+    """Дескриптор файла, открытого только для чтения; закрывается, когда на него не осталось ссылок"""
+    __slots__ = ("fd",)
+
+    def __init__(self, fd: int):
+        self.fd = fd
+
+    def __del__(self):
+        os.close(self.fd)
+
+
+def _open(source: Union[str, int]):
+    # Путь или дескриптор уже открытого файла (старой версии, которую заменил другой процесс)
+    return open(source, "rb", closefd=not isinstance(source, int))
+
+
+def read_segment(filepath: Union[str, int], offset: int, size: int) -> bytes:
+    with _open(filepath) as f, profiling.span("read", bytes=size):
+        f.seek(offset)
+        data = f.read(size)
+    if len(data) != size:
+        raise CorruptedFileError("Файл поврежден")
+    return data
+
+
+@contextmanager
+def map_segment(filepath: Union[str, int], offset: int, size: int) -> Iterator[memoryview]:
+    """Отображает участок файла в память без копирования (страницы читает ОС по мере обращения)"""
+    with _open(filepath) as f:
+        if offset + size > os.fstat(f.fileno()).st_size:
+            raise CorruptedFileError("Файл поврежден")
+        if size == 0:
+            yield memoryview(b"")
+            return
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            view = memoryview(mm)[offset:offset + size]
+            try:
+                yield view
+            finally:
+                view.release()
+
+
+def copy_segment(filepath: Union[str, int], offset: int, size: int) -> Iterator[memoryview]:
+    """Участок файла как поток блоков для ChunkWriter.write_stream (копия без расшифровки)"""
+    with map_segment(filepath, offset, size) as view:
+        yield view
+
+
+def iter_lines(pieces: Iterable[bytes]) -> Iterator[bytes]:
+    """Строки JSON Lines из кусков любого размера: поток целиком не собирается"""
+    parts = []
+    for piece in pieces:
+        start = 0
+        newline = piece.find(b"\n")
+        while newline >= 0:
+            parts.append(piece[start:newline])
+            yield b"".join(parts)
+            parts = []
+            start = newline + 1
+            newline = piece.find(b"\n", start)
+        if start < len(piece):
+            parts.append(piece[start:])
+    if parts:
+        raise CorruptedFileError("Поток оборван посреди строки")
+
+
+class ChunkWriter:
+    """Последовательно пишет чанки и индекс в файл.
+
+    С заголовком — создаёт новый файл, без заголовка — дописывает в конец существующего.
+    """
+
+    def __init__(self, f, header: Optional[dict] = None):
+        self.f = f
+        self.entries: List[Dict] = []
+        if header is None:
+            return
+
+        header_bytes = json.dumps(
+            {**header, "salt": base64.b64encode(header["salt"]).decode("ascii")}
+        ).encode("utf-8")
+        f.write(_PREAMBLE.pack(MAGIC, FORMAT_VERSION, len(header_bytes)))
+        f.write(header_bytes)
+
+    def write_chunk(self, entry: dict, data: bytes) -> Tuple[int, int]:
+        offset = self.f.tell()
+        with profiling.span("write", bytes=len(data)):
+            self.f.write(data)
+        return self.add_entry(entry, offset, len(data))
+
+    def write_stream(self, entry: dict, blocks: Iterable[bytes]) -> Tuple[int, int]:
+        """Пишет чанк по частям — целиком он в памяти не собирается"""
+        offset = self.f.tell()
+        size = 0
+        # Замер охватывает и шифрование/сериализацию блоков: они вложены в него как отдельные этапы
+        with profiling.span("write") as args:
+            for block in blocks:
+                self.f.write(block)
+                size += len(block)
+            args["bytes"] = size
+        return self.add_entry(entry, offset, size)
+
+    def add_entry(self, entry: dict, offset: int, size: int) -> Tuple[int, int]:
+        """Добавляет в индекс чанк, который уже лежит в файле"""
+        self.entries.append({**entry, "offset": offset, "size": size})
+        return offset, size
+
+    def finish(self, encryption, extra: Optional[dict] = None) -> int:
+        """Пишет индекс и футер. Возвращает конец валидных данных"""
+        index = {"projects": self.entries, **(extra or {})}
+        with profiling.span("serialize") as args:
+            data = json.dumps(index, ensure_ascii=False)
+            args["bytes"] = len(data)
+        token = encryption.encrypt(data)
+        offset = self.f.tell()
+        with profiling.span("write", bytes=len(token)):
+            self.f.write(token)
+        sync_file(self.f)
+        # Футер — последним: до него файл указывает на предыдущий индекс
+        self.f.write(_FOOTER.pack(FOOTER_MAGIC, offset, len(token)))
+        sync_file(self.f)
+        return self.f.tell()
+
+
+def sync_file(f):
+    with profiling.span("fsync"):
+        f.flush()
+        os.fsync(f.fileno())
@@ -0,0 +1,123 @@
+"""Перешифровка чанков при смене ключа хранилища.
+
+Обычный чанк перешифровывается без разбора JSON: расшифровка старым ключом и сразу
+шифрование новым. Чанк с запечатанными секретами приходится разбирать: подключ
+запечатывания выводится из ключа хранилища, и каждое поле запечатывается заново.
+Это работа на Python под GIL, поэтому большие хранилища перешифровываются в пуле
+процессов. Рабочий процесс получает оба ключа один раз при запуске, сам читает свои
+чанки из файла и возвращает готовые зашифрованные байты. Чанки выдаются в исходном
+порядке, а в работе их не больше IN_FLIGHT_PER_WORKER на процесс, так что память
+не растёт с размером хранилища.
+
+Маленькие хранилища перешифровываются потоково в этом же процессе: запуск пула дороже
+самой работы.
+"""
+import itertools
+import os
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from typing import Iterable, Iterator, NamedTuple, Optional, Tuple
+
+from . import profiling, storage
+from .encryption import PasswordEncryption
+from .kdf import kdf_from_dict
+from .models import Project, read_chunk, split_chunk
+
+# Пул запускается, только если перешифровать нужно хотя бы столько байт
+PARALLEL_MIN_BYTES = 4 * 1024 * 1024
+# Чанков в работе на процесс: пока один пишется в файл, следующие уже готовятся
+IN_FLIGHT_PER_WORKER = 2
+
+
+class ChunkJob(NamedTuple):
+    """Чанк для перешифровки: source — путь файла (рабочие процессы открывают его сами)"""
+    name: str
+    source: str
+    segment: tuple
+    reseal: bool
+
+    @property
+    def enc(self) -> str:
+        # Разобранный чанк запечатанного проекта пишется заново — раздельным чанком
+        return storage.ENC_SPLIT if self.reseal else self.segment[2]
+
+
+def transcode_chunk(job: ChunkJob, previous: PasswordEncryption,
+                    encryption: PasswordEncryption) -> Iterator[bytes]:
+    """Блоки чанка, перешифрованного ключом encryption"""
+    if job.reseal:
+        proj = Project(job.name)
+        read_chunk(proj, job.source, job.segment, previous)
+        yield from split_chunk(proj, encryption)
+        return
+    offset, size, enc, _ = job.segment
+    with storage.map_segment(job.source, offset, size) as view:
+        if enc == storage.ENC_STREAM:
+            yield from encryption.encrypt_stream(previous.decrypt_stream(view))
+        else:
+            yield encryption.encrypt(previous.decrypt(bytes(view)))
+
+
+# --- Рабочий процесс пула ---
+
+_worker_keys: Optional[Tuple[PasswordEncryption, PasswordEncryption]] = None
+
+
+def _key_material(encryption: PasswordEncryption) -> tuple:
+    return encryption.key, encryption.get_salt(), encryption.kdf.to_dict()
+
+
+def _init_worker(previous: tuple, encryption: tuple):
+    global _worker_keys
+    profiling.disable()  # замеры пишет только основной процесс (DPO_PROFILE наследуется)
+    _worker_keys = tuple(PasswordEncryption.from_key(key, salt, kdf_from_dict(kdf))
+                         for key, salt, kdf in (previous, encryption))
+
+
+def _transcode_in_worker(job: ChunkJob) -> bytes:
+    return b"".join(transcode_chunk(job, *_worker_keys))
+
+
+class ChunkTranscoder:
+    """Перешифровывает чанки из ключа previous в ключ encryption; workers — размер пула процессов"""
+
+    def __init__(self, previous: PasswordEncryption, encryption: PasswordEncryption,
+                 workers: Optional[int] = None):
+        self.previous = previous
+        self.encryption = encryption
+        self.workers = workers if workers is not None else (os.cpu_count() or 1)
+        self._pool: Optional[ProcessPoolExecutor] = None
+
+    def __enter__(self) -> "ChunkTranscoder":
+        return self
+
+    def __exit__(self, *exc):
+        if self._pool is not None:
+            self._pool.shutdown(cancel_futures=True)
+            self._pool = None
+
+    def _executor(self) -> ProcessPoolExecutor:
+        if self._pool is None:
+            self._pool = ProcessPoolExecutor(
+                self.workers, initializer=_init_worker,
+                initargs=(_key_material(self.previous), _key_material(self.encryption)))
+        return self._pool
+
+    def map(self, jobs: Iterable[tuple]) -> Iterator[Tuple[str, Iterable[bytes]]]:
+        """(шифрование, блоки) перешифрованных чанков в порядке jobs — кортежей полей ChunkJob"""
+        jobs = [ChunkJob._make(job) for job in jobs]
+        if self.workers < 2 or sum(job.segment[1] for job in jobs) < PARALLEL_MIN_BYTES:
+            for job in jobs:
+                yield job.enc, transcode_chunk(job, self.previous, self.encryption)
+            return
+        pool = self._executor()
+        queued = iter(jobs)
+        pending = deque((job, pool.submit(_transcode_in_worker, job))
+                        for job in itertools.islice(queued, self.workers * IN_FLIGHT_PER_WORKER))
+        while pending:
+            job, future = pending.popleft()
+            data = future.result()
+            following = next(queued, None)
+            if following is not None:
+                pending.append((following, pool.submit(_transcode_in_worker, following)))
+            yield job.enc, [data]
@@ -0,0 +1,201 @@
+"""Потоковый импорт и экспорт доступов.
+
+Строки читаются генераторами и по одной вливаются в vault; запись на диск —
+одна, после обработки всего файла (её делает вызывающий код).
+Кроме собственных CSV/JSON Lines понимает CSV-экспорт популярных менеджеров паролей.
+"""
+import csv
+import json
+import os
+from typing import Dict, Iterable, Iterator, Optional, TextIO
+from urllib.parse import urlsplit
+
+from .catalog import normalize_path
+from .models import CREDENTIAL_TYPES, Credential, DatabaseCredential, Project, Vault
+
+DEFAULT_PROJECT = "Импорт"
+
+# Дополнительные поля типов (ключ SSH, заметки) сохраняются только в jsonl
+NATIVE_FIELDS = ["project", "type", "name", "host", "user", "password", "port"]
+
+# Колонки CSV сторонних менеджеров -> наши поля. url разбирается на host и port.
+FOREIGN_FORMATS: Dict[str, Dict[str, str]] = {
+    "bitwarden": {"folder": "project", "name": "name", "login_uri": "url",
+                  "login_username": "user", "login_password": "password"},
+    "lastpass": {"grouping": "project", "name": "name", "url": "url",
+                 "username": "user", "password": "password"},
+    "keepass": {"Group": "project", "Title": "name", "URL": "url",
+                "Username": "user", "Password": "password"},
+    "1password": {"Title": "name", "Url": "url", "Username": "user", "Password": "password"},
+}
+
+FORMATS = ["csv", "jsonl"] + list(FOREIGN_FORMATS)
+
+CONFLICT_RULES = ["skip", "overwrite", "rename"]
+
+
+class ImportStats:
+    def __init__(self):
+        self.added = 0
+        self.updated = 0
+        self.renamed = 0
+        self.skipped = 0
+        self.invalid = 0
+
+    def __str__(self):
+        return (f"добавлено: {self.added}, обновлено: {self.updated}, "
+                f"переименовано: {self.renamed}, пропущено: {self.skipped}, с ошибками: {self.invalid}")
+
+
+def detect_format(path: str) -> str:
+    """Формат по расширению, а для CSV — по заголовку (сторонние менеджеры)"""
+    if path.endswith((".jsonl", ".ndjson")):
+        return "jsonl"
+    with open(path, newline="", encoding="utf-8-sig") as f:
+        header = set(next(csv.reader(f), []))
+    for fmt, columns in FOREIGN_FORMATS.items():
+        if set(columns) <= header:
+            return fmt
+    return "csv"
+
+
+def _split_url(url: str):
+    """'mysql://db.example.com:3307/app' -> ('db.example.com', 3307)"""
+    url = (url or "").strip()
+    if not url:
+        return "", None
+    parts = urlsplit(url if "//" in url else f"//{url}")
+    try:
+        port = parts.port
+    except ValueError:
+        port = None
+    return parts.hostname or "", port
+
+
+def _parse_port(value) -> Optional[int]:
+    if value in (None, ""):
+        return None
+    return int(value)
+
+
+def read_rows(f: TextIO, fmt: str) -> Iterator[dict]:
+    """Генератор нормализованных строк: project, name, host, user, password, port"""
+    if fmt == "jsonl":
+        for line in f:
+            if line.strip():
+                yield json.loads(line)
+        return
+
+    mapping = FOREIGN_FORMATS.get(fmt)
+    for raw in csv.DictReader(f):
+        if mapping is None:
+            yield raw
+            continue
+        row = {field: raw.get(column, "") for column, field in mapping.items()}
+        host, port = _split_url(row.pop("url", ""))
+        row["host"] = host
+        row["port"] = port
+        yield row
+
+
+def to_credential(row: dict) -> Credential:
+    name = (row.get("name") or "").strip()
+    if not name:
+        raise ValueError("пустое название")
+    cls = CREDENTIAL_TYPES.get(row.get("type") or DatabaseCredential.type_name)
+    if cls is None:
+        raise ValueError(f"неизвестный тип: {row.get('type')}")
+
+    data = {field: row.get(field) or "" for field in cls.FIELDS}
+    data["name"] = name
+    # Без порта подставляется порт по умолчанию для типа
+    data["port"] = _parse_port(row.get("port")) or None
+    # Теги есть только в нашем jsonl-экспорте
+    if isinstance(row.get("tags"), list):
+        data["tags"] = row["tags"]
+    return cls.from_dict(data)
+
+
+def _same(a: Credential, b: Credential) -> bool:
+    # to_dict, а не to_row: запечатанные секреты сравниваются по открытому значению
+    return a.to_dict() == b.to_dict()
+
+
+def _free_name(project: Project, name: str) -> str:
+    n = 2
+    while f"{name} ({n})" in project.credentials:
+        n += 1
+    return f"{name} ({n})"
+
+
+def import_rows(vault: Vault, rows: Iterable[dict], project: Optional[str] = None,
+                on_conflict: str = "skip") -> ImportStats:
+    """Вливает строки в vault. Одинаковые записи пропускаются всегда,
+    совпадение только по названию разрешается правилом on_conflict."""
+    stats = ImportStats()
+    for row in rows:
+        try:
+            cred = to_credential(row)
+        except (ValueError, TypeError):
+            stats.invalid += 1
+            continue
+
+        # Путь проекта приводится к виду, в котором его сохраняет add-project
+        target_name = normalize_path(project or row.get("project") or "") or DEFAULT_PROJECT
+        target = vault.projects.get(target_name)
+        if target is None:
+            target = Project(target_name)
+            vault.add_project(target)
+
+        existing = target.credentials.get(cred.name)
+        if existing is None:
+            target.add_credential(cred)
+            stats.added += 1
+        elif _same(existing, cred) or on_conflict == "skip":
+            stats.skipped += 1
+        elif on_conflict == "overwrite":
+            target.add_credential(cred)
+            stats.updated += 1
+        else:
+            cred.name = _free_name(target, cred.name)
+            target.add_credential(cred)
+            stats.renamed += 1
+    return stats
+
+
+def import_file(vault: Vault, path: str, fmt: str = None, project: Optional[str] = None,
+                on_conflict: str = "skip") -> ImportStats:
+    fmt = fmt or detect_format(path)
+    with open(path, newline="", encoding="utf-8-sig") as f:
+        return import_rows(vault, read_rows(f, fmt), project, on_conflict)
+
+
+def iter_rows(vault: Vault, project: Optional[str] = None) -> Iterator[dict]:
+    """Строки для экспорта; проекты расшифровываются по одному по мере обхода"""
+    projects = [vault.projects[project]] if project else vault.list_projects()
+    for proj in projects:
+        for cred in proj.credentials.values():
+            yield {"project": proj.name, **cred.to_dict()}
+
+
+def write_rows(f: TextIO, rows: Iterable[dict], fmt: str) -> int:
+    count = 0
+    if fmt == "jsonl":
+        for row in rows:
+            f.write(json.dumps(row, ensure_ascii=False) + "\n")
+            count += 1
+        return count
+
+    writer = csv.DictWriter(f, fieldnames=NATIVE_FIELDS, extrasaction="ignore")
+    writer.writeheader()
+    for row in rows:
+        writer.writerow(row)
+        count += 1
+    return count
+
+
+def export_file(vault: Vault, path: str, fmt: str = "csv", project: Optional[str] = None) -> int:
+    # Файл содержит пароли в открытом виде — создаём его доступным только владельцу
+    fd = os.open(path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+    with open(fd, "w", newline="", encoding="utf-8") as f:
+        return write_rows(f, iter_rows(vault, project), fmt)
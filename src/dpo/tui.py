@@ -0,0 +1,498 @@
+import npyscreen
+import bisect
+import curses
+import os
+import string
+import weakref
+from .core.catalog import normalize_path, parse_tags
+from .core.generator import PasswordPolicy, generate_password
+from .core.models import Vault, Project, DatabaseCredential
+
+VAULT_FILE = "vault.encrypted"
+EMPTY_LIST_LABEL = "Доступов пока нет"
+NO_PROJECTS_LABEL = "Нет проектов. Добавьте новый."
+NOTHING_FOUND_LABEL = "Под фильтр ничего не подходит."
+
+
+def format_tags(tags) -> str:
+    return " ".join(f"#{tag}" for tag in tags)
+
+
+class CredentialRows:
+    """Отсортированный список доступов проекта для TUI.
+
+    Хранит прямое соответствие «номер строки -> ключ доступа» и форматирует
+    строки лениво, только когда их показывают. Кэш действителен, пока не
+    изменилась версия проекта.
+    """
+
+    def __init__(self, project: Project):
+        # Прокси, чтобы кэш по проекту (WeakKeyDictionary) не удерживал сам проект
+        self.project = weakref.proxy(project)
+        self.project_name = project.name
+        self.version = project.version
+        self.keys = sorted(project.credentials, key=str.casefold)
+        self._folded = [key.casefold() for key in self.keys]
+        self._formatted = {}
+
+    def __len__(self):
+        return len(self.keys)
+
+    @property
+    def is_stale(self) -> bool:
+        return self.project.version != self.version
+
+    def credential(self, index: int):
+        return self.project.credentials[self.keys[index]]
+
+    def format(self, index: int) -> str:
+        key = self.keys[index]
+        row = self._formatted.get(key)
+        if row is None:
+            c = self.project.credentials[key]
+            # В списке пароль скрыт звездочками для безопасности
+            row = self._formatted[key] = f"[{c.user}@{c.host}] {c.name} (******)"
+        return row
+
+    def window(self, start: int, size: int) -> list:
+        return [self.format(i) for i in range(start, min(start + size, len(self.keys)))]
+
+    def find_prefix(self, prefix: str) -> int:
+        """Номер первой строки, начинающейся с prefix (или следующей за ним по алфавиту)"""
+        return min(bisect.bisect_left(self._folded, prefix.casefold()), max(len(self.keys) - 1, 0))
+
+    def remove(self, index: int):
+        key = self.keys.pop(index)
+        del self._folded[index]
+        self._formatted.pop(key, None)
+        self.project.remove_credential(key)
+        # Своё изменение уже учтено — кэш остаётся действительным
+        self.version = self.project.version
+
+
+# Кэш строк по проекту: повторное открытие проекта без изменений ничего не пересчитывает
+_rows_cache = weakref.WeakKeyDictionary()
+
+
+def credential_rows(project: Project) -> CredentialRows:
+    rows = _rows_cache.get(project)
+    if rows is None or rows.is_stale:
+        rows = _rows_cache[project] = CredentialRows(project)
+    return rows
+
+
+class VirtualCredentialList(npyscreen.MultiLine):
+    """Список доступов, который держит в виджете только видимое окно строк.
+
+    npyscreen на каждой перерисовке копирует и сравнивает весь values, поэтому
+    values здесь — лишь текущая страница, а положение в полном списке задаёт offset.
+    PgUp/PgDn листают страницы, буква или цифра переходит к первому доступу на неё.
+    """
+    # Кэш отрисовки npyscreen не замечает смену окна при той же позиции курсора;
+    # в окне всего несколько строк, так что перерисовываем его всегда
+    _safe_to_display_cache = False
+
+    def __init__(self, *args, window_changed_callback=None, **keywords):
+        self.rows = None
+        self.offset = 0
+        self.window_changed_callback = window_changed_callback
+        super().__init__(*args, **keywords)
+
+    @property
+    def page_size(self) -> int:
+        return max(1, len(self._my_widgets))
+
+    @property
+    def selected_index(self):
+        if not self.rows:
+            return None
+        index = self.offset + self.cursor_line
+        return index if 0 <= index < len(self.rows) else None
+
+    def set_rows(self, rows: CredentialRows):
+        # Для того же проекта позиция сохраняется, для другого — список с начала
+        position = self.offset + self.cursor_line
+        if self.rows is None or self.rows.project_name != rows.project_name:
+            self.offset = position = 0
+        self.rows = rows
+        self.show(position)
+
+    def show(self, index: int, to_top: bool = False):
+        """Показывает страницу со строкой index и ставит на неё курсор.
+
+        Без to_top страница сдвигается минимально (как при движении курсора).
+        """
+        total = len(self.rows) if self.rows else 0
+        index = max(0, min(index, total - 1))
+        if to_top or not self.offset <= index < self.offset + self.page_size:
+            self.offset = index if to_top or index < self.offset else index - self.page_size + 1
+        self.offset = max(0, min(self.offset, total - self.page_size))
+        self.cursor_line = index - self.offset
+        self.start_display_at = 0
+        self.values = self.rows.window(self.offset, self.page_size) if total else [EMPTY_LIST_LABEL]
+        if self.window_changed_callback:
+            self.window_changed_callback(self)
+
+    def status(self) -> str:
+        total = len(self.rows) if self.rows else 0
+        if not total:
+            return ""
+        return f"{self.offset + 1}-{self.offset + len(self.values)} из {total}"
+
+    def set_up_handlers(self):
+        super().set_up_handlers()
+        # Буквы и цифры — переход по алфавиту, поэтому vim-клавиши j/k/g/G/x здесь не нужны
+        for ch in string.ascii_letters + string.digits:
+            self.handlers.pop(ord(ch), None)
+        self.complex_handlers.append((self.t_input_is_jump_key, self.h_jump_to_letter))
+        self.handlers.update({
+            curses.KEY_UP: self.h_cursor_line_up,
+            curses.KEY_DOWN: self.h_cursor_line_down,
+            curses.KEY_NPAGE: self.h_cursor_page_down,
+            curses.KEY_PPAGE: self.h_cursor_page_up,
+            curses.KEY_HOME: self.h_cursor_beginning,
+            curses.KEY_END: self.h_cursor_end,
+        })
+
+    def _move(self, delta: int):
+        if self.rows:
+            self.show(self.offset + self.cursor_line + delta)
+
+    def h_cursor_line_up(self, ch):
+        if self.scroll_exit and self.offset + self.cursor_line <= 0:
+            self.h_exit_up(ch)
+            return
+        self._move(-1)
+
+    def h_cursor_line_down(self, ch):
+        if self.scroll_exit and (not self.rows or self.offset + self.cursor_line >= len(self.rows) - 1):
+            self.h_exit_down(ch)
+            return
+        self._move(1)
+
+    def _page(self, delta: int):
+        # Страница сдвигается целиком, курсор остаётся на той же строке экрана
+        if self.rows:
+            self.offset = max(0, min(self.offset + delta, len(self.rows) - self.page_size))
+            self.show(self.offset + self.cursor_line)
+
+    def h_cursor_page_down(self, ch):
+        self._page(self.page_size)
+
+    def h_cursor_page_up(self, ch):
+        self._page(-self.page_size)
+
+    def h_cursor_beginning(self, ch):
+        if self.rows:
+            self.show(0)
+
+    def h_cursor_end(self, ch):
+        if self.rows:
+            self.show(len(self.rows) - 1)
+
+    @staticmethod
+    def _jump_char(ch):
+        # Коды клавиш curses (KEY_*) — тоже int, поэтому из int берём только ASCII
+        if isinstance(ch, int):
+            ch = chr(ch) if 0 <= ch < 128 else ""
+        return ch if isinstance(ch, str) and len(ch) == 1 and ch.isalnum() else None
+
+    def t_input_is_jump_key(self, ch):
+        return self._jump_char(ch) is not None
+
+    def h_jump_to_letter(self, ch):
+        if self.rows:
+            self.show(self.rows.find_prefix(self._jump_char(ch)), to_top=True)
+
+
+class LoginForm(npyscreen.ActionForm):
+    def create(self):
+        self.password_widget = self.add(
+            npyscreen.TitlePassword,
+            name="🔒 Мастер-пароль:",
+            when_editing=True
+        )
+
+    def on_ok(self):
+        master_password = self.password_widget.value
+        try:
+            if not os.path.exists(VAULT_FILE):
+                self.parentApp.vault = Vault(master_password)
+                self.parentApp.vault.save_to_file(VAULT_FILE)
+                npyscreen.notify_wait("✅ Новый Vault создан и сохранен!", title="Успех")
+            else:
+                self.parentApp.vault = Vault.load_from_file(VAULT_FILE, master_password)
+                npyscreen.notify_wait("✅ Данные успешно загружены!", title="Успех")
+
+            self.parentApp.setNextForm("MAIN")
+            self.editing = False
+        except Exception as e:
+            npyscreen.notify_critical(f"Ошибка загрузки: {str(e)}", title="Ошибка")
+
+    def on_cancel(self):
+        self.parentApp.setNextForm(None)
+
+
+class AddCredentialForm(npyscreen.ActionForm):
+    def create(self):
+        self.name_w = self.add(npyscreen.TitleText, name="Название (напр. Prod DB):")
+        self.host_w = self.add(npyscreen.TitleText, name="Хост/IP:")
+        self.user_w = self.add(npyscreen.TitleText, name="Пользователь:")
+        self.pass_w = self.add(npyscreen.TitlePassword, name="Пароль:")
+        self.add(npyscreen.ButtonPress, name="🎲 Сгенерировать пароль", when_pressed_function=self.generate_password)
+        self.port_w = self.add(npyscreen.TitleText, name="Порт:", value="3306")
+        self.tags_w = self.add(npyscreen.TitleText, name="Теги (через запятую):")
+
+    def generate_password(self):
+        # Без похожих символов: пароль показывают на экране и могут набирать вручную
+        policy = PasswordPolicy(exclude_lookalikes=True)
+        new_pass = generate_password(policy)
+        self.pass_w.value = new_pass
+        self.pass_w.display()
+        npyscreen.notify_confirm(f"Сгенерирован пароль: {new_pass}\nЭнтропия: {policy.entropy_bits:.0f} бит",
+                                 title="Генератор", editw=1)
+
+    def on_ok(self):
+        port_val = 3306
+        if self.port_w.value and self.port_w.value.isdigit():
+            port_val = int(self.port_w.value)
+
+        new_cred = DatabaseCredential(
+            name=self.name_w.value,
+            host=self.host_w.value,
+            user=self.user_w.value,
+            password=self.pass_w.value,
+            port=port_val
+        )
+        new_cred.tags = parse_tags(self.tags_w.value or "")
+        if self.parentApp.current_project:
+            self.parentApp.current_project.add_credential(new_cred)
+            npyscreen.notify_confirm(f"✅ Доступ '{self.name_w.value}' добавлен!", title="Успех")
+
+        self.parentApp.switchForm("PROJECT_MNG")
+
+    def on_cancel(self):
+        self.parentApp.switchForm("PROJECT_MNG")
+
+
+class AddProjectForm(npyscreen.ActionForm):
+    def create(self):
+        self.path_w = self.add(npyscreen.TitleText, name="Путь (напр. acme/billing/prod):", begin_entry_at=34)
+        self.description_w = self.add(npyscreen.TitleText, name="Описание:", begin_entry_at=34)
+        self.tags_w = self.add(npyscreen.TitleText, name="Теги (через запятую):", begin_entry_at=34)
+
+    def on_ok(self):
+        vault = self.parentApp.vault
+        path = normalize_path(self.path_w.value or "")
+        # Без переключения формы она открывается снова с тем же вводом
+        if not path:
+            npyscreen.notify_confirm("Укажите путь проекта!", title="Ошибка")
+            return
+        if path in vault.projects:
+            npyscreen.notify_confirm(f"Проект '{path}' уже есть!", title="Ошибка")
+            return
+        vault.add_project(Project(path, self.description_w.value or "", parse_tags(self.tags_w.value or "")))
+        self.close()
+
+    def on_cancel(self):
+        self.close()
+
+    def close(self):
+        for widget in (self.path_w, self.description_w, self.tags_w):
+            widget.value = ""
+        self.parentApp.switchForm("MAIN")
+
+
+class ProjectManagementForm(npyscreen.FormBaseNew):
+    def create(self):
+        self.project_label = self.add(npyscreen.TitleFixedText, name="Проект:", value="", editable=False)
+        self.page_label = self.add(npyscreen.FixedText, value="--- Доступы ---", editable=False)
+
+        self.access_list = self.add(
+            VirtualCredentialList,
+            name="access_list",
+            max_height=10,
+            values=[],
+            scroll_exit=True,
+            window_changed_callback=self.update_page_label
+        )
+
+        self.add(npyscreen.FixedText, value="--- Действия ---", editable=False)
+        self.add(npyscreen.ButtonPress, name="1. Добавить доступ", when_pressed_function=self.add_access)
+        self.add(npyscreen.ButtonPress, name="2. Удалить выбранный", when_pressed_function=self.delete_access)
+        self.add(npyscreen.ButtonPress, name="3. Показать детали (ПАРОЛЬ)", when_pressed_function=self.show_details)
+        self.add(npyscreen.ButtonPress, name="<- Назад в меню", when_pressed_function=self.on_back)
+
+    def beforeEditing(self):
+        current_proj = getattr(self.parentApp, 'current_project', None)
+        if current_proj:
+            self.project_label.value = f"{current_proj.name} {format_tags(current_proj.tags)}".rstrip()
+            # Строки форматируются только для видимой страницы и кэшируются до изменения проекта
+            self.access_list.set_rows(credential_rows(current_proj))
+        self.display()
+
+    def update_page_label(self, widget):
+        status = widget.status()
+        self.page_label.value = f"--- Доступы ({status}) ---" if status else "--- Доступы ---"
+        self.page_label.display()
+
+    def add_access(self):
+        self.parentApp.switchForm("ADD_CREDENTIAL")
+
+    def show_details(self):
+        index = self.access_list.selected_index
+        if index is None:
+            npyscreen.notify_confirm("Сначала выберите доступ в списке!", title="Ошибка")
+            return
+
+        cred = self.access_list.rows.credential(index)
+        npyscreen.notify_confirm(
+            f"Название:  {cred.name}\n"
+            f"Хост/IP:   {cred.host}\n"
+            f"Порт:      {cred.port}\n"
+            f"Логин:     {cred.user}\n\n"
+            f"ПАРОЛЬ:    {cred.reveal('password')}",
+            title="Детали доступа (Расшифровано)",
+            wide=True,
+            editw=1
+        )
+
+    def delete_access(self):
+        index = self.access_list.selected_index
+        if index is None:
+            npyscreen.notify_confirm("Сначала выберите доступ в списке!", title="Ошибка")
+            return
+
+        rows = self.access_list.rows
+        if npyscreen.notify_yes_no(f"Удалить '{rows.keys[index]}'?", title="Подтверждение"):
+            rows.remove(index)
+            npyscreen.notify_confirm("Удалено!", title="Успех")
+            self.access_list.set_rows(rows)
+            self.display()
+
+    def on_back(self):
+        # Показанные пароли не задерживаются в памяти после выхода из проекта
+        self.parentApp.vault.forget_secrets()
+        self.parentApp.switchForm("MAIN")
+
+
+class SearchResultList(npyscreen.MultiLineAction):
+    def actionHighlighted(self, act_on_this, key_press):
+        self.parent.open_result(self.cursor_line)
+
+
+class SearchForm(npyscreen.FormBaseNew):
+    def create(self):
+        self.query_w = self.add(
+            npyscreen.TitleText,
+            name="🔎 Поиск:",
+            value_changed_callback=self.update_results
+        )
+        self.add(npyscreen.FixedText, value="--- Результаты (Enter — открыть проект) ---", editable=False)
+        self.results_w = self.add(SearchResultList, max_height=12, values=[], scroll_exit=True)
+        self.add(npyscreen.ButtonPress, name="<- Назад в меню", when_pressed_function=self.on_back)
+        self.results = []
+
+    def beforeEditing(self):
+        self.query_w.value = ""
+        self.results = []
+        self.results_w.values = []
+
+    def update_results(self, widget=None):
+        # Индекс обновляется инкрементально, поэтому поиск идёт на каждое нажатие клавиши
+        query = self.query_w.value or ""
+        self.results = self.parentApp.vault.search(query) if query.strip() else []
+        self.results_w.values = [f"{p.name} / [{c.user}@{c.host}] {c.name}" for p, c in self.results]
+        self.results_w.display()
+
+    def open_result(self, index: int):
+        if index >= len(self.results):
+            return
+        self.parentApp.current_project = self.results[index][0]
+        self.parentApp.switchForm("PROJECT_MNG")
+
+    def on_back(self):
+        self.parentApp.switchForm("MAIN")
+
+
+class MainAppForm(npyscreen.FormBaseNew):
+    def create(self):
+        self.add(npyscreen.TitleFixedText, name="🚀 Dev Password Organizer", editable=False)
+        self.filter_w = self.add(
+            npyscreen.TitleText,
+            name="Фильтр (путь #тег):",
+            value_changed_callback=self.update_list
+        )
+        self.projects = []
+        self.project_list = self.add(
+            npyscreen.TitleSelectOne,
+            name="Проекты (Enter для выбора):",
+            values=[],
+            max_height=10,
+            scroll_exit=True,
+            value_changed_callback=self.handle_project_selection
+        )
+        self.add(npyscreen.ButtonPress, name="1. Добавить новый проект", when_pressed_function=self.add_project)
+        self.add(npyscreen.ButtonPress, name="2. Поиск доступов", when_pressed_function=self.open_search)
+        self.add(npyscreen.ButtonPress, name="3. Выйти и сохранить", when_pressed_function=self.exit_app)
+
+    def handle_project_selection(self, widget):
+        if widget.value and widget.value[0] < len(self.projects):
+            self.parentApp.current_project = self.projects[widget.value[0]]
+            self.parentApp.switchForm("PROJECT_MNG")
+
+    def beforeEditing(self):
+        self.update_list()
+
+    def update_list(self, widget=None):
+        vault = self.parentApp.vault
+        if vault:
+            # "acme/billing #prod": путь — префикс по сегментам, #теги — все сразу. Отбор идёт по
+            # каталогу проектов (без расшифровки чанков), поэтому обновляется на каждое нажатие
+            words = (self.filter_w.value or "").split()
+            tags = [word[1:] for word in words if word.startswith("#")]
+            # Остальные слова — один путь (как --under в CLI): в сегментах бывают пробелы
+            path = " ".join(word for word in words if not word.startswith("#"))
+            if words:
+                self.projects = vault.find_projects(normalize_path(path), tags, credential_tags=False)
+            else:
+                self.projects = vault.list_projects()
+            if self.projects:
+                self.project_list.values = [f"{p.name} {format_tags(p.tags)}".rstrip() for p in self.projects]
+            else:
+                self.project_list.values = [NOTHING_FOUND_LABEL if words else NO_PROJECTS_LABEL]
+            self.project_list.value = []
+        self.project_list.display()
+
+    def add_project(self):
+        self.parentApp.switchForm("ADD_PROJECT")
+
+    def open_search(self):
+        self.parentApp.switchForm("SEARCH")
+
+    def exit_app(self):
+        try:
+            if self.parentApp.vault:
+                self.parentApp.vault.save_to_file(VAULT_FILE)
+                if self.parentApp.vault.conflicts:
+                    names = ", ".join(f"{p} / {c}" for p, c in self.parentApp.vault.conflicts)
+                    npyscreen.notify_confirm(f"Версии другого процесса сохранены как копии:\n{names}",
+                                             title="⚠️ Конфликты")
+            npyscreen.notify_wait("💾 Данные сохранены. Выход...", title="Сохранение")
+            self.parentApp.setNextForm(None)
+            self.editing = False
+        except Exception as e:
+            npyscreen.notify_critical(f"❌ Ошибка: {e}", title="Ошибка")
+
+
+class TUIApp(npyscreen.NPSAppManaged):
+    def onStart(self):
+        self.vault = None
+        self.current_project = None
+        self.addForm("LOGIN", LoginForm, name="Вход")
+        self.addForm("MAIN", MainAppForm, name="Главное меню")
+        self.addForm("PROJECT_MNG", ProjectManagementForm, name="Управление проектом")
+        self.addForm("ADD_CREDENTIAL", AddCredentialForm, name="Новый доступ")
+        self.addForm("ADD_PROJECT", AddProjectForm, name="Новый проект")
+        self.addForm("SEARCH", SearchForm, name="Поиск")
+        self.NEXT_ACTIVE_FORM = "LOGIN"
\ No newline at end of file
@@ -0,0 +1,22 @@
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src"))
+
+from dpo.core.encryption import PasswordEncryption  # noqa: E402
+from dpo.core.kdf import Pbkdf2KDF  # noqa: E402
+
+FIXTURES = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fixtures")
+
+
+@pytest.fixture
+def encryption():
+    # Дешёвый KDF: тестам важен формат файла, а не стоимость подбора пароля
+    return PasswordEncryption("test-master", kdf=Pbkdf2KDF(1000))
+
+
+@pytest.fixture
+def vault_path(tmp_path):
+    return str(tmp_path / "vault.encrypted")
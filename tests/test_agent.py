@@ -0,0 +1,87 @@
+import threading
+import types
+
+import pytest
+
+from dpo.core import agent
+from dpo.core.agent import AgentClient, AgentServer, KeyStore
+from dpo.core.encryption import PasswordEncryption
+from dpo.core.models import DatabaseCredential, Project, Vault
+
+pytestmark = pytest.mark.skipif(not agent.is_supported(), reason="нужны Unix-сокеты")
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(agent, "time", types.SimpleNamespace(monotonic=lambda: now[0]))
+    return now
+
+
+@pytest.fixture
+def client(tmp_path):
+    path = str(tmp_path / "agent.sock")
+    server = AgentServer(path, ttl=60)
+    thread = threading.Thread(target=server.serve_forever, kwargs={"poll_interval": 0.05}, daemon=True)
+    thread.start()
+    yield AgentClient(path)
+    server.shutdown()
+    server.server_close()
+    thread.join()
+
+
+def test_key_expires_after_ttl(clock):
+    store = KeyStore(ttl=10)
+    store.put("a", b"key")
+    clock[0] += 9
+    assert store.get("a") == b"key"
+    clock[0] += 1
+    assert store.get("a") is None
+    assert len(store) == 0
+
+
+def test_expire_drops_only_stale_keys(clock):
+    store = KeyStore(ttl=10)
+    store.put("old", b"1")
+    clock[0] += 5
+    store.put("new", b"2")
+    clock[0] += 5
+    store.expire()
+    assert len(store) == 1
+    assert store.get("new") == b"2"
+
+
+def test_put_get_and_lock(client):
+    salt = b"s" * 16
+    assert client.get_key(salt) is None
+    assert client.put_key(salt, b"k" * 32)
+    assert client.get_key(salt) == b"k" * 32
+    assert client.get_key(b"t" * 16) is None
+    assert client.status()["keys"] == 1
+
+    assert client.lock()
+    assert client.get_key(salt) is None
+    assert client.status()["keys"] == 0
+
+
+def test_key_from_agent_opens_vault(client, vault_path, encryption):
+    vault = Vault(encryption=encryption)
+    proj = Project("Backend")
+    proj.add_credential(DatabaseCredential("db", "h", "u", "secret"))
+    vault.add_project(proj)
+    vault.save_to_file(vault_path)
+    client.put_key(encryption.get_salt(), encryption.key, encryption.kdf.to_dict())
+
+    salt, kdf = Vault.read_key_params(vault_path)
+    # Ключ ищется по соли и параметрам KDF: с другими параметрами это другой ключ
+    assert client.get_key(salt) is None
+    key = client.get_key(salt, kdf.to_dict())
+    loaded = Vault.load_from_file(vault_path, encryption=PasswordEncryption.from_key(key, salt, kdf))
+    assert loaded.projects["Backend"].credentials["db"].password == "secret"
+
+
+def test_client_without_agent_returns_none(tmp_path):
+    client = AgentClient(str(tmp_path / "missing.sock"))
+    assert not client.is_running()
+    assert client.get_key(b"s" * 16) is None
+    assert not client.put_key(b"s" * 16, b"k" * 32)
@@ -0,0 +1,100 @@
+import pytest
+
+from dpo.core.audit import AuditIndex, entropy_bits, weakness
+from dpo.core.encryption import PasswordEncryption
+from dpo.core.kdf import Pbkdf2KDF
+from dpo.core.models import APITokenCredential, DatabaseCredential, Project, SSHKeyCredential, Vault
+
+STRONG = "vT7#qL2!xR9@mK4$"
+OTHER = "pW3%zN8^cJ5&hB1*"
+
+
+@pytest.fixture
+def vault(encryption):
+    vault = Vault(encryption=encryption)
+    backend = Project("Backend")
+    backend.add_credential(DatabaseCredential("prod", "db.local", "app", STRONG, 5432))
+    backend.add_credential(DatabaseCredential("replica", "replica.local", "app", STRONG, 5432))
+    backend.add_credential(SSHKeyCredential("deploy", "bastion", "ops", "", private_key="key"))
+    billing = Project("Billing")
+    billing.add_credential(DatabaseCredential("main", "DB.local", "app", OTHER, 5432))
+    billing.add_credential(APITokenCredential("stripe", "https://api.stripe.com", "acct", "short"))
+    vault.add_project(backend)
+    vault.add_project(billing)
+    return vault
+
+
+def test_entropy_and_weakness():
+    assert entropy_bits("") == 0.0
+    assert entropy_bits("aaaa") == pytest.approx(4 * 4.7, abs=0.01)
+    assert weakness("short") == "короче 12 символов"
+    assert weakness("aaaaaaaaaaaa").startswith("~56 бит")
+    assert weakness(STRONG) is None
+    # Символы вне известных алфавитов тоже добавляют энтропии
+    assert entropy_bits("пароль") > entropy_bits("parole")
+
+
+def test_report(vault):
+    report = vault.audit()
+    assert report.reused == [[("Backend", "prod"), ("Backend", "replica")]]
+    # Хост сравнивается без учёта регистра
+    assert report.duplicates == [(("db.local", 5432, "app"), [("Backend", "prod"), ("Billing", "main")])]
+    assert [(w.project, w.name) for w in report.weak] == [("Billing", "stripe")]
+    # Пустой пароль SSH-ключа не повтор и не слабый
+    assert ("Backend", "deploy") not in {key for group in report.reused for key in group}
+    assert not report.clean
+
+
+def test_index_follows_edits(vault):
+    index = vault.audit_index
+    assert len(index) == 5
+    backend, billing = vault.projects["Backend"], vault.projects["Billing"]
+
+    backend.credentials["replica"].password = OTHER
+    assert vault.audit().reused == [[("Backend", "replica"), ("Billing", "main")]]
+    billing.credentials["stripe"].password = "dQ6&wE2*rT8(yU4)"
+    assert vault.audit().weak == []
+    billing.remove_credential("main")
+    assert vault.audit().reused == [] and vault.audit().duplicates == []
+    backend.add_credential(DatabaseCredential("copy", "db.local", "app", OTHER, 5432))
+    report = vault.audit()
+    assert report.reused == [[("Backend", "copy"), ("Backend", "replica")]]
+    assert report.duplicates == [(("db.local", 5432, "app"), [("Backend", "copy"), ("Backend", "prod")])]
+
+    # Заменённый проект уходит из индекса вместе с доступами
+    vault.add_project(Project("Backend"))
+    assert vault.audit().clean
+    assert vault.audit_index is index and len(index) == 1
+
+
+def test_fingerprints_do_not_keep_passwords(vault):
+    index = vault.audit_index
+    secrets = set(index._by_secret)
+    assert vault.encryption.fingerprint(STRONG) in secrets
+    assert all(STRONG.encode() not in secret for secret in secrets)
+    # Отпечаток зависит от ключа vault
+    other = PasswordEncryption("other-master", kdf=Pbkdf2KDF(1000))
+    assert other.fingerprint(STRONG) != vault.encryption.fingerprint(STRONG)
+
+
+def test_standalone_index_removes_projects():
+    index = AuditIndex(lambda value: value.encode())
+    proj = Project("A")
+    proj.add_credential(DatabaseCredential("a", "h", "u", STRONG))
+    proj.add_credential(DatabaseCredential("b", "h", "u", STRONG))
+    index.add_project(proj)
+    assert index.report().reused == [[("A", "a"), ("A", "b")]]
+    # Повторное добавление заменяет запись, а не дублирует её
+    index.add("A", proj.credentials["a"])
+    assert len(index) == 2
+    index.remove_project("A")
+    assert len(index) == 0 and index.report().clean
+
+
+def test_rekey_rebuilds_fingerprints(vault_path, vault):
+    vault.save_to_file(vault_path)
+    before = vault.audit()
+    new = PasswordEncryption("new-master", kdf=Pbkdf2KDF(1000))
+    vault.rekey(vault_path, new)
+    assert vault.audit() == before
+    assert new.fingerprint(STRONG) in vault.audit_index._by_secret
@@ -0,0 +1,121 @@
+import pytest
+
+from dpo import cli
+from dpo.core.catalog import ProjectIndex, _bits, _mask, normalize_path, normalize_tags, parse_tags
+from dpo.core.models import DatabaseCredential, Project, Vault
+
+PATHS = {
+    "acme/billing/prod": ("prod",),
+    "acme/billing/staging": ("staging",),
+    "acme/billing-old": ("prod", "legacy"),
+    "acme": (),
+    "beta/api": ("prod", "team-a"),
+}
+
+
+def make_index(**kwargs) -> ProjectIndex:
+    index = ProjectIndex(**kwargs)
+    index.add_projects(Project(path, tags=tags) for path, tags in PATHS.items())
+    return index
+
+
+def test_normalization():
+    assert normalize_path(" acme//billing/ prod /") == "acme/billing/prod"
+    assert normalize_path("//") == ""
+    assert normalize_tags(["Prod", " prod ", "", "Team-A"]) == ("prod", "team-a")
+    assert parse_tags("prod, Staging,,prod") == ("prod", "staging")
+
+
+@pytest.mark.parametrize("ids", [[0], [5], [0, 7, 8, 64, 129], list(range(0, 300, 3))])
+def test_mask_bits_round_trip(ids):
+    mask = _mask(ids)
+    assert mask == sum(1 << pid for pid in ids)
+    assert list(_bits(mask)) == ids
+
+
+def test_find_by_path_and_tags():
+    index = make_index()
+    # Путь сравнивается по целым сегментам: acme/billing-old не под acme/billing
+    assert index.find("acme/billing") == ["acme/billing/prod", "acme/billing/staging"]
+    assert index.find("/acme//billing/") == ["acme/billing/prod", "acme/billing/staging"]
+    assert index.find("acme") == ["acme", "acme/billing-old", "acme/billing/prod", "acme/billing/staging"]
+    assert index.find("acme/none") == []
+    assert index.find(tags=["PROD"]) == ["acme/billing-old", "acme/billing/prod", "beta/api"]
+    assert index.find("acme", ["prod", "legacy"]) == ["acme/billing-old"]
+    assert index.find("beta", ["staging"]) == []
+    assert index.find() == sorted(PATHS)
+
+
+def test_ids_are_reused_and_masks_invalidated():
+    index = make_index()
+    assert index.under("acme/billing") == _mask([0, 1])
+    index.remove_project("acme/billing/prod")
+    assert index.under("acme/billing") == _mask([1])
+    assert index.tagged("prod") == _mask([2, 4])
+
+    # Освобождённый номер достаётся следующему проекту, кэш маски узла сбрасывается
+    index.add_project(Project("acme/billing/dev", tags=("prod",)))
+    assert index._ids["acme/billing/dev"] == 0
+    assert index.find("acme/billing", ["prod"]) == ["acme/billing/dev"]
+    assert len(index) == len(PATHS)
+
+    # Узлы без проектов удаляются вместе с последним проектом поддерева
+    index.remove_project("beta/api")
+    assert "beta" not in index._root.children
+
+
+def test_project_tag_updates():
+    index = make_index()
+    proj = Project("acme/billing/staging", tags=("staging",))
+    proj.set_tags(["Prod"])
+    index.update_project(proj)
+    assert index.find(tags=["staging"]) == []
+    assert "acme/billing/staging" in index.find(tags=["prod"])
+
+
+def test_credential_tags_are_counted():
+    index = make_index(with_credentials=True)
+    first, second = DatabaseCredential("a"), DatabaseCredential("b")
+    first.tags = second.tags = ("rotate",)
+    index.add("beta/api", first)
+    index.add("beta/api", second)
+    assert index.find(tags=["rotate"]) == ["beta/api"]
+    index.remove("beta/api", "a")
+    assert index.find(tags=["rotate"]) == ["beta/api"]
+    index.remove("beta/api", "b")
+    assert index.find(tags=["rotate"]) == []
+
+
+def test_vault_filters_without_decrypting(vault_path, encryption):
+    vault = Vault(encryption=encryption)
+    for path, tags in PATHS.items():
+        proj = Project(path, tags=tags)
+        cred = DatabaseCredential("db", "h", "u", "pw")
+        cred.tags = ("db",) if path == "acme" else ()
+        proj.add_credential(cred)
+        vault.add_project(proj)
+    vault.save_to_file(vault_path)
+
+    loaded = Vault.load_from_file(vault_path, encryption=encryption)
+    found = loaded.find_projects("acme", ["prod"], credential_tags=False)
+    assert [proj.name for proj in found] == ["acme/billing-old", "acme/billing/prod"]
+    assert found[0].tags == ("prod", "legacy")
+    # Пути и теги проектов — из индекса файла: чанки не расшифрованы
+    assert not any(proj.is_loaded for proj in loaded.list_projects())
+
+    assert loaded.find_projects(tags=["db"], credential_tags=False) == []
+    assert [proj.name for proj in loaded.find_projects(tags=["db"])] == ["acme"]
+    loaded.projects["beta/api"].credentials["db"].tags = ("db",)
+    assert [proj.name for proj in loaded.find_projects(tags=["db"])] == ["acme", "beta/api"]
+
+
+def test_cli_normalizes_project_path(vault_path, monkeypatch, capsys, tmp_path):
+    monkeypatch.setenv("DPO_AGENT_SOCK", str(tmp_path / "no-agent.sock"))
+    monkeypatch.setattr(cli, "GLOBAL_MASTER_PASSWORD", "test-master")
+    cli.main(["add-project", "--name", " acme//billing/ prod ", "--tag", "Prod,team-a", "--file", vault_path])
+    assert "'acme/billing/prod' создан" in capsys.readouterr().out
+
+    cli.main(["list-projects", "--under", "acme/billing", "--tag", "prod", "--file", vault_path])
+    assert " - acme/billing/prod" in capsys.readouterr().out
+    vault = Vault.load_from_file(vault_path, "test-master")
+    assert vault.projects["acme/billing/prod"].tags == ("prod", "team-a")
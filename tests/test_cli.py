@@ -0,0 +1,47 @@
+import os
+import subprocess
+import sys
+
+from dpo import cli
+from dpo.core.daemon_tokens import clients_path, read_clients
+
+SRC = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src")
+HEAVY = ("cryptography", "npyscreen", "curses", "dpo.core.models", "dpo.core.encryption", "dpo.tui")
+
+
+def loaded_modules(code: str) -> set:
+    """Модули, загруженные в чистом интерпретаторе после выполнения code"""
+    script = f"import sys\n{code}\nprint('\\n'.join(sys.modules))"
+    out = subprocess.run([sys.executable, "-c", script], env={**os.environ, "PYTHONPATH": SRC},
+                         capture_output=True, text=True, check=True).stdout
+    return set(out.split())
+
+
+def heavy(modules: set) -> list:
+    return sorted(m for m in modules if m.split(".")[0] in HEAVY or m in HEAVY)
+
+
+def test_help_does_not_import_heavy_modules():
+    modules = loaded_modules("import dpo.cli\n"
+                             "try:\n    dpo.cli.main(['--help'])\nexcept SystemExit:\n    pass")
+    assert "dpo.cli" in modules
+    assert heavy(modules) == []
+
+
+def test_daemon_token_does_not_import_crypto(tmp_path):
+    vault_path = str(tmp_path / "vault.encrypted")
+    modules = loaded_modules(f"import dpo.cli\ndpo.cli.main(['daemon-token', '--name', 'ci', '--scope', 'Backend', '--file', {vault_path!r}])")
+    assert heavy(modules) == []
+    assert [c["name"] for c in read_clients(clients_path(vault_path)).values()] == ["ci"]
+
+
+def test_every_command_has_a_handler():
+    actions = next(a for a in cli.build_parser()._actions if a.dest == "action")
+    assert list(actions.choices) == list(cli.COMMANDS)
+
+
+def test_main_script_runs_without_install(tmp_path):
+    out = subprocess.run([sys.executable, os.path.join(SRC, "main.py"), "--help"],
+                         capture_output=True, text=True, cwd=str(tmp_path))
+    assert out.returncode == 0 and "calibrate" in out.stdout
+
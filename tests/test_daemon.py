@@ -0,0 +1,138 @@
+import asyncio
+import os
+import socket
+
+import pytest
+
+from dpo.core import daemon, storage
+from dpo.core.daemon import SecretDaemon
+from dpo.core.daemon_client import AsyncSecretClient
+from dpo.core.daemon_tokens import clients_path, issue_token, read_clients, revoke_token
+from dpo.core.encryption import Sealed
+from dpo.core.models import DatabaseCredential, Project, Vault
+
+
+@pytest.fixture
+def vault_file(vault_path, encryption):
+    vault = Vault(encryption=encryption)
+    for name in ("Backend", "Billing"):
+        proj = Project(name)
+        proj.add_credential(DatabaseCredential("db", f"{name.lower()}.local", "app", f"secret-{name}"))
+        vault.add_project(proj)
+    vault.save_to_file(vault_path)
+    return vault_path
+
+
+@pytest.fixture
+def secret_daemon(vault_file, encryption, tmp_path):
+    return SecretDaemon(vault_file, encryption, str(tmp_path / "d.sock"))
+
+
+def hello(instance: SecretDaemon, token: str) -> dict:
+    session = {}
+    assert instance.dispatch({"op": "hello", "token": token}, session)["ok"]
+    return session
+
+
+def test_tokens_file_stores_only_hashes(vault_file):
+    token = issue_token(vault_file, "ci", ["Backend", "Backend"])
+    path = clients_path(vault_file)
+    assert os.stat(path).st_mode & 0o777 == 0o600
+    with open(path, encoding="utf-8") as f:
+        assert token not in f.read()
+    (client,) = read_clients(path).values()
+    assert (client["name"], client["projects"]) == ("ci", ["Backend"])
+
+    # Перевыпуск заменяет старый токен клиента
+    issue_token(vault_file, "ci", ["Billing"])
+    assert [c["projects"] for c in read_clients(path).values()] == [["Billing"]]
+
+
+def test_token_is_scoped_to_its_projects(secret_daemon, vault_file):
+    token = issue_token(vault_file, "ci", ["Backend"])
+    secret_daemon.load()
+
+    assert not secret_daemon.dispatch({"op": "get", "project": "Backend", "credential": "db"}, {})["ok"]
+    assert secret_daemon.dispatch({"op": "hello", "token": "wrong"}, {})["error"] == "Неизвестный токен"
+
+    session = hello(secret_daemon, token)
+    reply = secret_daemon.dispatch({"op": "get", "project": "Backend", "credential": "db"}, session)
+    assert reply["credential"]["password"] == "secret-Backend"
+    # Чужой проект неотличим от отсутствующего доступа
+    for project, credential in (("Billing", "db"), ("Backend", "missing"), ("Nope", "db")):
+        reply = secret_daemon.dispatch({"op": "get", "project": project, "credential": credential}, session)
+        assert reply == {"ok": False, "error": SecretDaemon.NOT_FOUND}
+    assert secret_daemon.dispatch({"op": "list"}, session)["projects"] == {"Backend": ["db"]}
+
+
+def test_revoked_token_is_rejected_after_reload(secret_daemon, vault_file):
+    token = issue_token(vault_file, "ci", ["Backend"])
+    secret_daemon.load()
+    session = hello(secret_daemon, token)
+
+    assert revoke_token(vault_file, "ci")
+    assert not revoke_token(vault_file, "ci")
+    secret_daemon.load()
+    reply = secret_daemon.dispatch({"op": "get", "project": "Backend", "credential": "db"}, session)
+    assert reply == {"ok": False, "error": "Токен отозван"}
+
+
+def test_sealed_secrets_are_read_at_load(secret_daemon, vault_file, encryption, monkeypatch):
+    vault = Vault.load_from_file(vault_file, encryption=encryption)
+    vault.set_seal_secrets(True)
+    vault.save_to_file(vault_file)
+    vault.wait_for_fold()
+    token = issue_token(vault_file, "ci", ["Backend", "Billing"])
+    secret_daemon.load()
+
+    # Ответы на запросы уже готовы: ни чтения файла, ни расшифровки в цикле событий
+    def no_io(*args, **kwargs):
+        raise AssertionError("работа с диском в обработчике запроса")
+    monkeypatch.setattr(storage, "map_segment", no_io)
+    monkeypatch.setattr(Sealed, "reveal", no_io)
+    session = hello(secret_daemon, token)
+    for name in ("Backend", "Billing"):
+        reply = secret_daemon.dispatch({"op": "get", "project": name, "credential": "db"}, session)
+        assert reply["credential"]["password"] == f"secret-{name}"
+
+
+@pytest.mark.skipif(not hasattr(socket, "AF_UNIX"), reason="нужны Unix-сокеты")
+def test_daemon_serves_and_reloads(secret_daemon, vault_file, encryption, monkeypatch):
+    monkeypatch.setattr(daemon, "RELOAD_INTERVAL", 0.01)
+    token = issue_token(vault_file, "ci", ["Backend"])
+    secret_daemon.load()
+
+    async def wait_for(predicate):
+        for _ in range(500):
+            if predicate():
+                return
+            await asyncio.sleep(0.01)
+        raise AssertionError("не дождались")
+
+    async def scenario():
+        server = asyncio.ensure_future(secret_daemon.serve_forever())
+        try:
+            await wait_for(lambda: os.path.exists(secret_daemon.path))
+            async with AsyncSecretClient(token, secret_daemon.path) as client:
+                # Запросы конвейеризуются по одному соединению
+                results = await asyncio.gather(*(client.password("Backend", "db") for _ in range(5)))
+                assert results == ["secret-Backend"] * 5
+
+                vault = Vault.load_from_file(vault_file, encryption=encryption)
+                vault.projects["Backend"].credentials["db"].password = "rotated"
+                vault.save_to_file(vault_file)
+                old = secret_daemon.projects
+                await wait_for(lambda: secret_daemon.projects is not old)
+                assert await client.password("Backend", "db") == "rotated"
+
+                revoke_token(vault_file, "ci")
+                await wait_for(lambda: not secret_daemon.clients)
+                with pytest.raises(ValueError, match="Токен отозван"):
+                    await client.get("Backend", "db")
+        finally:
+            server.cancel()
+            with pytest.raises(asyncio.CancelledError):
+                await server
+        assert not os.path.exists(secret_daemon.path)
+
+    asyncio.run(scenario())
@@ -0,0 +1,105 @@
+import os
+import shutil
+
+import pytest
+
+from dpo.core import storage
+from dpo.core.errors import CorruptedFileError, SchemaError, VaultError, WrongPasswordError
+from dpo.core.models import DatabaseCredential, Project, Vault
+
+FIXTURES = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fixtures")
+
+
+def make_vault(path: str, encryption) -> Vault:
+    vault = Vault(encryption=encryption)
+    for name in ("A", "B"):
+        proj = Project(name)
+        proj.add_credential(DatabaseCredential("db", "h", "u", f"secret-{name}"))
+        vault.add_project(proj)
+    vault.save_to_file(path)
+    vault.wait_for_fold()
+    return vault
+
+
+def patch_byte(path: str, offset: int):
+    with open(path, "r+b") as f:
+        f.seek(offset)
+        byte = f.read(1)
+        f.seek(offset)
+        f.write(bytes([byte[0] ^ 0xFF]))
+
+
+def test_errors_stay_value_errors():
+    for cls in (WrongPasswordError, CorruptedFileError, SchemaError):
+        assert issubclass(cls, VaultError) and issubclass(cls, ValueError)
+
+
+def test_wrong_password(vault_path, encryption):
+    make_vault(vault_path, encryption)
+    with pytest.raises(WrongPasswordError, match="Неверный мастер-пароль"):
+        Vault.load_from_file(vault_path, "wrong")
+
+
+def test_wrong_password_for_legacy_file(tmp_path):
+    path = str(tmp_path / "legacy.encrypted")
+    shutil.copy(os.path.join(FIXTURES, "legacy_v0.encrypted"), path)
+    with pytest.raises(WrongPasswordError):
+        Vault.load_from_file(path, "wrong")
+
+
+def test_damaged_index_is_not_a_wrong_password(vault_path, encryption):
+    vault = make_vault(vault_path, encryption)
+    patch_byte(vault_path, vault._end - storage._FOOTER.size - 10)
+    with pytest.raises(CorruptedFileError, match="Индекс"):
+        Vault.load_from_file(vault_path, "test-master")
+
+
+def test_file_without_key_check(vault_path, encryption, monkeypatch):
+    # Файлы прошлых версий: неверный пароль от порчи индекса не отличить
+    monkeypatch.setattr(type(encryption), "key_check", lambda self: None)
+    make_vault(vault_path, encryption)
+    with open(vault_path, "rb") as f:
+        assert storage.read_header(f)[0]["check"] is None
+    with pytest.raises(WrongPasswordError, match="или повреждённый файл"):
+        Vault.load_from_file(vault_path, "wrong")
+
+
+def test_damaged_chunk(vault_path, encryption):
+    vault = make_vault(vault_path, encryption)
+    offset, size = vault._segments["B"][:2]
+    patch_byte(vault_path, offset + size // 2)
+    loaded = Vault.load_from_file(vault_path, "test-master")
+    assert loaded.projects["A"].credentials["db"].password == "secret-A"
+    with pytest.raises(CorruptedFileError, match="'B'"):
+        loaded.projects["B"].credentials
+
+
+def test_truncated_file(vault_path, encryption):
+    make_vault(vault_path, encryption)
+    with open(vault_path, "r+b") as f:
+        f.truncate(20)
+    with pytest.raises(CorruptedFileError):
+        Vault.load_from_file(vault_path, "test-master")
+
+
+def test_newer_format_version(vault_path, encryption):
+    make_vault(vault_path, encryption)
+    with open(vault_path, "r+b") as f:
+        f.seek(len(storage.MAGIC))
+        f.write(bytes([storage.FORMAT_VERSION + 1]))
+    with pytest.raises(SchemaError, match="не поддерживается"):
+        Vault.load_from_file(vault_path, "test-master")
+
+
+def test_chunk_in_unknown_format(vault_path, encryption):
+    # Чанк расшифровывается (ключ верный, целостность цела), но внутри не проект
+    with open(vault_path, "wb") as f:
+        writer = storage.ChunkWriter(f, {"salt": encryption.get_salt(), "kdf": encryption.kdf.to_dict(),
+                                         "check": encryption.key_check()})
+        entry = {"name": "A", "description": "", "enc": storage.ENC_FERNET, "rev": 0}
+        writer.write_stream(entry, [encryption.encrypt("{не json")])
+        writer.finish(encryption, {"revision": 1})
+
+    loaded = Vault.load_from_file(vault_path, "test-master")
+    with pytest.raises(SchemaError, match="'A'"):
+        loaded.projects["A"].credentials
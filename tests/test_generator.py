@@ -0,0 +1,121 @@
+from collections import Counter
+
+import pytest
+
+from dpo import cli
+from dpo.core import generator
+from dpo.core.generator import (CHARACTER_CLASSES, LOOKALIKES, MIN_ACCEPTANCE, PassphrasePolicy,
+                                PasswordPolicy, RandomPool)
+
+
+def class_counts(password: str, policy: PasswordPolicy) -> Counter:
+    counts = Counter()
+    for char in password:
+        for name, alphabet in policy.alphabets.items():
+            if char.encode("ascii") in alphabet:
+                counts[name] += 1
+    return counts
+
+
+def assert_meets(passwords, policy: PasswordPolicy):
+    for password in passwords:
+        assert len(password) == policy.length
+        assert set(password.encode("ascii")) <= set(policy.alphabet)
+        counts = class_counts(password, policy)
+        for name, minimum in policy.min_counts.items():
+            assert counts[name] >= minimum, (password, name)
+
+
+@pytest.mark.parametrize("kwargs", [
+    {},
+    {"length": 4},
+    {"length": 12, "classes": ["lower", "digits"], "min_counts": {"digits": 3}},
+    {"length": 16, "exclude_lookalikes": True},
+    {"length": 10, "classes": ["upper"], "min_counts": {"symbols": 2}},
+])
+def test_rejecting_path_meets_min_counts(kwargs):
+    policy = PasswordPolicy(**kwargs)
+    assert policy.acceptance >= MIN_ACCEPTANCE
+    assert_meets(policy.generate(500), policy)
+
+
+@pytest.mark.parametrize("kwargs", [
+    {"length": 8, "min_counts": {"lower": 2, "upper": 2, "digits": 2, "symbols": 2}},
+    {"length": 12, "classes": ["lower"], "min_counts": {"digits": 6, "symbols": 5}},
+    {"length": 8, "classes": ["lower", "upper", "digits"], "min_counts": {"lower": 0, "upper": 0, "digits": 6}},
+])
+def test_exact_path_meets_min_counts(kwargs, monkeypatch):
+    policy = PasswordPolicy(**kwargs)
+    assert policy.acceptance < MIN_ACCEPTANCE
+    # Отбрасывание для таких политик не вызывается
+    monkeypatch.setattr(PasswordPolicy, "_generate_rejecting", None)
+    assert_meets(policy.generate(300), policy)
+
+
+def test_exact_path_covers_every_layout():
+    # Все раскладки по классам, проходящие минимумы, выпадают (а не одна фиксированная)
+    policy = PasswordPolicy(length=3, classes=["lower", "digits"], min_counts={"lower": 1, "digits": 1})
+    pool = RandomPool()
+    seen = {tuple(sorted(class_counts(policy._generate_exact(pool), policy).items())) for _ in range(400)}
+    assert seen == {(("digits", 1), ("lower", 2)), (("digits", 2), ("lower", 1))}
+
+
+def test_exclusions():
+    policy = PasswordPolicy(length=64, exclude_lookalikes=True, exclude="abc")
+    for password in policy.generate(100):
+        assert not set(password) & set(LOOKALIKES + "abc")
+
+
+@pytest.mark.parametrize("kwargs", [
+    {"classes": []},
+    {"classes": ["emoji"]},
+    {"min_counts": {"emoji": 1}},
+    {"length": 0},
+    {"length": generator.MAX_LENGTH + 1},
+    {"length": 3, "min_counts": {"lower": 2, "upper": 2}},
+    {"classes": ["digits"], "exclude": CHARACTER_CLASSES["digits"]},
+])
+def test_rejected_policies(kwargs):
+    with pytest.raises(ValueError):
+        PasswordPolicy(**kwargs)
+
+
+@pytest.mark.parametrize("kwargs", [
+    {"words": 0},
+    {"wordlist": ["one"]},
+    {"wordlist": ["one", "one", "two"]},
+])
+def test_rejected_passphrase_policies(kwargs):
+    with pytest.raises(ValueError):
+        PassphrasePolicy(**kwargs)
+
+
+def test_passphrase_batch():
+    policy = PassphrasePolicy(words=4, separator=" ", capitalize=True)
+    phrases = policy.generate(50)
+    assert len(phrases) == 50
+    wordlist = {word.capitalize() for word in policy.wordlist}
+    for phrase in phrases:
+        words = phrase.split(" ")
+        assert len(words) == 4 and set(words) <= wordlist
+    assert policy.entropy_bits == 44
+
+
+@pytest.mark.parametrize("policy", [PasswordPolicy(), PassphrasePolicy()], ids=["password", "passphrase"])
+@pytest.mark.parametrize("count", [0, -2])
+def test_count_must_be_positive(policy, count):
+    with pytest.raises(ValueError):
+        policy.generate(count)
+
+
+@pytest.mark.parametrize("count", ["0", "-2", "many"])
+def test_cli_rejects_bad_count(count, capsys):
+    with pytest.raises(SystemExit) as exc:
+        cli.main(["generate", "--count", count])
+    assert exc.value.code == 2
+    assert "--count" in capsys.readouterr().err
+
+
+def test_cli_generates_count(capsys):
+    cli.main(["generate", "--count", "3", "--length", "12"])
+    assert [len(line) for line in capsys.readouterr().out.splitlines()] == [12, 12, 12]
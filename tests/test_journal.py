@@ -0,0 +1,170 @@
+import os
+import time
+
+import pytest
+
+from dpo.core.encryption import PasswordEncryption
+from dpo.core.journal import KIND_CHECKPOINT, KIND_OPS, RECORD_MAGIC, Journal, journal_path
+from dpo.core.kdf import Pbkdf2KDF
+from dpo.core.models import DatabaseCredential, Project, Vault
+
+
+def make_history(path: str, encryption, saves: int = 4) -> Vault:
+    """Хранилище, где пароль c1 после записи журнала №N равен pN"""
+    vault = Vault(encryption=encryption)
+    proj = Project("A")
+    vault.add_project(proj)
+    proj.add_credential(DatabaseCredential("c1", "h", "u", "p1"))
+    vault.save_to_file(path)
+    for seq in range(2, saves + 1):
+        proj.credentials["c1"].password = f"p{seq}"
+        vault.save_to_file(path)
+        vault.wait_for_fold()
+    return vault
+
+
+def passwords(vault: Vault):
+    return [(entry.seq, entry.action, entry.name) for entry in vault.history()]
+
+
+def kinds(vault: Vault):
+    vault._journal.refresh()  # контрольные точки дописывает и фоновая свёртка
+    return [(record.seq, record.kind) for record in vault._journal.iter_back()][::-1]
+
+
+# --- Оборванная дозапись ---
+
+@pytest.mark.parametrize("tail", [
+    b"\x00" * 100,                           # данные записи без трейлера
+    RECORD_MAGIC + b"\x01" + b"\x00" * 10,   # трейлер оборван на середине
+    b"junk" + RECORD_MAGIC + b"\x01" * 24,   # похожие на трейлер байты посреди данных
+])
+def test_torn_append_is_ignored_and_cut(vault_path, encryption, tail):
+    make_history(vault_path, encryption)
+    with open(journal_path(vault_path), "ab") as f:
+        f.write(tail)
+
+    vault = Vault.load_from_file(vault_path, encryption=encryption)
+    assert [seq for seq, _, _ in passwords(vault)] == [4, 3, 2]
+    assert vault.projects["A"].credentials["c1"].password == "p4"
+
+    # Следующая запись отрезает хвост и продолжает нумерацию
+    vault.projects["A"].credentials["c1"].password = "p5"
+    vault.save_to_file(vault_path)
+    reloaded = Vault.load_from_file(vault_path, encryption=encryption)
+    assert [seq for seq, _, _ in passwords(reloaded)] == [5, 4, 3, 2]
+    assert reloaded.projects["A"].credentials["c1"].password == "p5"
+    assert tail not in open(journal_path(vault_path), "rb").read()
+
+
+def test_torn_first_record_leaves_empty_journal(tmp_path, encryption):
+    path = str(tmp_path / "vault")
+    journal = Journal.create(path, encryption.get_salt())
+    start = journal.end
+    with open(journal.path, "ab") as f:
+        f.write(b"\x00" * 64 + RECORD_MAGIC)
+    reopened = Journal.open(path, journal.id, encryption.get_salt())
+    assert (reopened.end, reopened.last_seq) == (start, 0)
+    assert list(reopened.iter_back()) == []
+
+
+# --- Временный журнал после прерванной смены ключа ---
+
+def test_open_installs_matching_tmp_journal(vault_path, encryption, monkeypatch):
+    vault = make_history(vault_path, encryption)
+    expected = passwords(vault)
+    new = PasswordEncryption("new-master", kdf=Pbkdf2KDF(1000))
+
+    # Снимок уже заменён, а временный журнал на место не поставлен
+    def crash(self):
+        raise OSError("прервано")
+    monkeypatch.setattr(Journal, "install", crash)
+    with pytest.raises(OSError):
+        vault.rekey(vault_path, new)
+    monkeypatch.undo()
+    assert os.path.exists(journal_path(vault_path) + ".tmp")
+
+    reloaded = Vault.load_from_file(vault_path, encryption=new)
+    assert not os.path.exists(journal_path(vault_path) + ".tmp")
+    assert passwords(reloaded) == expected
+    assert reloaded.state_at(seq=2)["A"].credentials["c1"].password == "p2"
+
+
+def test_open_ignores_foreign_tmp_journal(tmp_path, encryption):
+    path = str(tmp_path / "vault")
+    journal = Journal.create(path, encryption.get_salt())
+    Journal.create(path, os.urandom(16), temporary=True)
+    assert Journal.open(path, journal.id, encryption.get_salt()).path == journal.path
+    assert Journal.open(path, "other-id", encryption.get_salt()) is None
+    assert os.path.exists(journal_path(path) + ".tmp")
+
+
+# --- Состояние на момент ---
+
+def test_state_at_replays_ops_after_checkpoint(vault_path, encryption, monkeypatch):
+    # Свёртка и контрольная точка после каждого сохранения: записи чередуются
+    monkeypatch.setattr(Vault, "FOLD_RATIO", 0)
+    monkeypatch.setattr(Vault, "FOLD_MIN_BYTES", 0)
+    monkeypatch.setattr(Vault, "CHECKPOINT_RATIO", 0)
+    vault = make_history(vault_path, encryption, saves=6)
+    records = kinds(vault)
+    assert sum(kind == KIND_CHECKPOINT for _, kind in records) > 1
+    assert sum(kind == KIND_OPS for _, kind in records) == 5
+
+    version = 1
+    for seq, kind in records:
+        if kind == KIND_OPS:
+            version += 1
+        # Для записи операций берётся предыдущая контрольная точка и операция поверх неё
+        assert vault.state_at(seq=seq)["A"].credentials["c1"].password == f"p{version}"
+
+
+def test_state_at_replays_several_ops(vault_path, encryption):
+    vault = make_history(vault_path, encryption)
+    assert kinds(vault) == [(1, KIND_CHECKPOINT), (2, KIND_OPS), (3, KIND_OPS), (4, KIND_OPS)]
+    for seq in (1, 2, 3, 4):
+        assert vault.state_at(seq=seq)["A"].credentials["c1"].password == f"p{seq}"
+    assert vault.state_at(until=time.time())["A"].credentials["c1"].password == "p4"
+
+
+def test_state_at_before_first_checkpoint(vault_path, encryption):
+    vault = make_history(vault_path, encryption)
+    first = list(vault._journal.iter_back())[-1]
+    assert first.kind == KIND_CHECKPOINT
+    with pytest.raises(ValueError):
+        vault.state_at(until=first.time - 1)
+    with pytest.raises(ValueError):
+        vault.state_at(seq=0)
+
+
+def test_restore_brings_back_removed_credential(vault_path, encryption):
+    vault = make_history(vault_path, encryption)
+    vault.projects["A"].remove_credential("c1")
+    vault.save_to_file(vault_path)
+
+    stats = vault.restore(vault.state_at(seq=3))
+    assert (stats.added, stats.updated, stats.removed) == (1, 0, 0)
+    vault.save_to_file(vault_path)
+    assert Vault.load_from_file(vault_path, encryption=encryption).projects["A"].credentials["c1"].password == "p3"
+
+
+# --- Смена ключа ---
+
+@pytest.mark.parametrize("sealed", [False, True])
+def test_history_survives_rekey(vault_path, encryption, sealed):
+    vault = make_history(vault_path, encryption)
+    if sealed:
+        vault.set_seal_secrets(True)
+        vault.save_to_file(vault_path)
+        vault.wait_for_fold()
+    expected = passwords(vault)
+    new = PasswordEncryption("new-master", kdf=Pbkdf2KDF(1000))
+    vault.rekey(vault_path, new)
+
+    with pytest.raises(Exception):
+        Vault.load_from_file(vault_path, encryption=encryption)
+    reloaded = Vault.load_from_file(vault_path, encryption=new)
+    assert passwords(reloaded) == expected
+    for seq in (2, 3, 4):
+        assert reloaded.state_at(seq=seq)["A"].credentials["c1"].reveal() == f"p{seq}"
+    assert reloaded.projects["A"].credentials["c1"].reveal() == "p4"
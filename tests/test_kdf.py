@@ -0,0 +1,89 @@
+import pytest
+
+from dpo import cli
+from dpo.core import storage
+from dpo.core.encryption import PasswordEncryption
+from dpo.core.kdf import Argon2id, Argon2idKDF, Pbkdf2KDF, ScryptKDF, default_kdf, kdf_from_dict
+from dpo.core.models import DatabaseCredential, Project, Vault
+
+KDFS = [Pbkdf2KDF(1234), ScryptKDF(n=2 ** 10, r=8, p=1)]
+if Argon2id is not None:
+    KDFS.append(Argon2idKDF(iterations=1, memory_cost=8 * 1024, lanes=1))
+
+
+def make_vault(path: str, encryption: PasswordEncryption):
+    vault = Vault(encryption=encryption)
+    for name in ("A", "B"):
+        proj = Project(name)
+        proj.add_credential(DatabaseCredential("db", "h", "u", f"secret-{name}"))
+        vault.add_project(proj)
+    vault.save_to_file(path)
+
+
+@pytest.mark.parametrize("kdf", KDFS, ids=str)
+def test_kdf_params_round_trip_through_header(vault_path, kdf):
+    make_vault(vault_path, PasswordEncryption("pw", kdf=kdf))
+    with open(vault_path, "rb") as f:
+        assert storage.read_header(f)[0]["kdf"] == kdf.to_dict()
+
+    salt, read = Vault.read_key_params(vault_path)
+    assert read == kdf and type(read) is type(kdf)
+    vault = Vault.load_from_file(vault_path, "pw")
+    assert vault.encryption.kdf == kdf
+    assert vault.encryption.key == PasswordEncryption.derive_key("pw", salt, kdf)
+    assert vault.projects["A"].credentials["db"].password == "secret-A"
+
+
+def test_kdf_from_dict():
+    assert kdf_from_dict(None) == default_kdf()
+    assert kdf_from_dict({"name": "scrypt", "n": 1024, "r": 4, "p": 2}) == ScryptKDF(1024, 4, 2)
+    with pytest.raises(ValueError):
+        kdf_from_dict({"name": "md5"})
+
+
+def test_key_for_other_kdf_params_is_rejected(vault_path, encryption):
+    make_vault(vault_path, encryption)
+    other = PasswordEncryption.from_key(encryption.key, encryption.get_salt(), Pbkdf2KDF(2000))
+    with pytest.raises(ValueError):
+        Vault.load_from_file(vault_path, encryption=other)
+
+
+def test_rekey_reencrypts_unopened_chunks(vault_path, encryption):
+    make_vault(vault_path, encryption)
+    vault = Vault.load_from_file(vault_path, encryption=encryption)
+    vault.projects["A"].credentials["db"].password = "changed"
+    new = PasswordEncryption("test-master", kdf=ScryptKDF(n=2 ** 10))
+    vault.rekey(vault_path, new)
+    # Незагруженный проект перешифрован без разбора
+    assert not vault.projects["B"].is_loaded
+
+    salt, kdf = Vault.read_key_params(vault_path)
+    assert (salt, kdf) == (new.get_salt(), new.kdf)
+    reloaded = Vault.load_from_file(vault_path, "test-master")
+    assert reloaded.projects["A"].credentials["db"].password == "changed"
+    assert reloaded.projects["B"].credentials["db"].password == "secret-B"
+
+
+def test_calibrate_apply(vault_path, encryption, monkeypatch, tmp_path):
+    make_vault(vault_path, encryption)
+    monkeypatch.setenv("DPO_AGENT_SOCK", str(tmp_path / "no-agent.sock"))
+    monkeypatch.setattr(cli, "GLOBAL_MASTER_PASSWORD", None)
+    monkeypatch.setattr(cli.getpass, "getpass", lambda prompt="": "test-master")
+    cli.main(["calibrate", "--kdf", "scrypt", "--target-ms", "1", "--apply", "--file", vault_path])
+
+    _, kdf = Vault.read_key_params(vault_path)
+    assert kdf.name == ScryptKDF.name
+    vault = Vault.load_from_file(vault_path, "test-master")
+    assert vault.projects["B"].credentials["db"].password == "secret-B"
+
+
+def test_calibrate_apply_rejects_wrong_password(vault_path, encryption, monkeypatch, capsys):
+    make_vault(vault_path, encryption)
+    # Хранилище открыто ключом из агента: мастер-пароль спрашивается для подтверждения
+    monkeypatch.setattr(cli, "get_vault", lambda path: Vault.load_from_file(path, encryption=encryption))
+    monkeypatch.setattr(cli, "GLOBAL_MASTER_PASSWORD", None)
+    monkeypatch.setattr(cli.getpass, "getpass", lambda prompt="": "wrong")
+    cli.main(["calibrate", "--kdf", "scrypt", "--target-ms", "1", "--apply", "--file", vault_path])
+
+    assert "Неверный мастер-пароль" in capsys.readouterr().out
+    assert Vault.read_key_params(vault_path)[1] == encryption.kdf
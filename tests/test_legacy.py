@@ -0,0 +1,39 @@
+import os
+import shutil
+
+from conftest import FIXTURES
+from dpo.core import storage
+from dpo.core.models import Vault
+
+# Записан кодом исходной версии: один токен Fernet с JSON всех проектов и соль в конце
+LEGACY_FILE = os.path.join(FIXTURES, "legacy_v0.encrypted")
+LEGACY_PASSWORD = "legacy-master"
+
+
+def test_legacy_file_loads(tmp_path):
+    path = str(tmp_path / "vault.encrypted")
+    shutil.copy(LEGACY_FILE, path)
+    assert not storage.is_chunked_file(path)
+
+    vault = Vault.load_from_file(path, LEGACY_PASSWORD)
+    assert sorted(vault.projects) == ["Backend", "Пустой"]
+    backend = vault.projects["Backend"]
+    assert backend.description == "Основной API"
+    prod = backend.credentials["Prod DB"]
+    assert (prod.host, prod.user, prod.password, prod.port) == ("db.prod.local", "app", "s3cret", 5432)
+    assert backend.credentials["Кэш"].password == "пароль"
+    assert backend.credentials["Кэш"].port == 3306
+
+
+def test_legacy_file_migrates_on_save(tmp_path):
+    path = str(tmp_path / "vault.encrypted")
+    shutil.copy(LEGACY_FILE, path)
+    Vault.load_from_file(path, LEGACY_PASSWORD).save_to_file(path)
+
+    assert storage.is_chunked_file(path)
+    with open(path, "rb") as f:
+        assert f.read(len(storage.MAGIC) + 1)[-1] == storage.FORMAT_VERSION
+    vault = Vault.load_from_file(path, LEGACY_PASSWORD)
+    assert sorted(vault.projects) == ["Backend", "Пустой"]
+    assert vault.projects["Backend"].credentials["Prod DB"].password == "s3cret"
+    assert vault.projects["Пустой"].credentials == {}
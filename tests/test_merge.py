@@ -0,0 +1,170 @@
+import os
+
+import pytest
+
+from dpo.core.merge import merge_rows
+from dpo.core.models import DatabaseCredential, Project, Vault
+
+
+def row(name: str, password: str) -> list:
+    return ["database", name, "h", "u", password, 3306]
+
+
+def make_vault(path: str, encryption, sealed: bool = False) -> None:
+    vault = Vault(encryption=encryption)
+    vault.seal_secrets = sealed
+    proj = Project("A")
+    vault.add_project(proj)
+    for i in range(3):
+        proj.add_credential(DatabaseCredential(f"c{i}", "h", "u", "base"))
+    vault.save_to_file(path)
+    vault.wait_for_fold()
+
+
+def open_two(path: str, encryption):
+    """Два процесса, загрузившие одну версию хранилища"""
+    ours = Vault.load_from_file(path, encryption=encryption)
+    theirs = Vault.load_from_file(path, encryption=encryption)
+    ours.projects["A"].credentials
+    theirs.projects["A"].credentials
+    return ours, theirs
+
+
+def passwords(path: str, encryption) -> dict:
+    vault = Vault.load_from_file(path, encryption=encryption)
+    return {name: cred.reveal() for name, cred in vault.projects["A"].credentials.items()}
+
+
+def test_merge_rows_keeps_both_versions_on_conflict():
+    base = {"c": row("c", "base")}
+    merged, copies = merge_rows(base, {"c": row("c", "ours")}, {"c": row("c", "theirs")},
+                                taken={"c (конфликт)"})
+    assert copies == ["c (конфликт 2)"]
+    assert merged == {"c": row("c", "ours"), "c (конфликт 2)": row("c (конфликт 2)", "theirs")}
+
+
+def test_both_writers_edit_same_credential(vault_path, encryption):
+    make_vault(vault_path, encryption)
+    ours, theirs = open_two(vault_path, encryption)
+    theirs.projects["A"].credentials["c0"].password = "theirs"
+    theirs.save_to_file(vault_path)
+    ours.projects["A"].credentials["c0"].password = "ours"
+    ours.save_to_file(vault_path)
+
+    assert ours.conflicts == [("A", "c0 (конфликт)")]
+    assert passwords(vault_path, encryption) == {
+        "c0": "ours", "c1": "base", "c2": "base", "c0 (конфликт)": "theirs"}
+
+
+def test_same_edit_on_both_sides_is_not_a_conflict(vault_path, encryption):
+    make_vault(vault_path, encryption)
+    ours, theirs = open_two(vault_path, encryption)
+    for vault in (theirs, ours):
+        vault.projects["A"].credentials["c0"].password = "same"
+        vault.save_to_file(vault_path)
+    assert ours.conflicts == []
+    assert passwords(vault_path, encryption)["c0"] == "same"
+
+
+def test_remote_delete_and_local_edit(vault_path, encryption):
+    make_vault(vault_path, encryption)
+    ours, theirs = open_two(vault_path, encryption)
+    theirs.projects["A"].remove_credential("c0")
+    theirs.projects["A"].remove_credential("c1")
+    theirs.save_to_file(vault_path)
+    # Изменение важнее удаления: c0 остаётся, а c1, который мы не трогали, удаляется
+    ours.projects["A"].credentials["c0"].password = "ours"
+    ours.save_to_file(vault_path)
+
+    assert ours.conflicts == []
+    assert passwords(vault_path, encryption) == {"c0": "ours", "c2": "base"}
+
+
+def test_local_delete_and_remote_edit(vault_path, encryption):
+    make_vault(vault_path, encryption)
+    ours, theirs = open_two(vault_path, encryption)
+    theirs.projects["A"].credentials["c0"].password = "theirs"
+    theirs.save_to_file(vault_path)
+    ours.projects["A"].remove_credential("c0")
+    ours.save_to_file(vault_path)
+
+    assert passwords(vault_path, encryption) == {"c0": "theirs", "c1": "base", "c2": "base"}
+
+
+def test_new_remote_project_is_picked_up(vault_path, encryption):
+    make_vault(vault_path, encryption)
+    ours, theirs = open_two(vault_path, encryption)
+    theirs.add_project(Project("B"))
+    theirs.save_to_file(vault_path)
+    ours.projects["A"].credentials["c1"].password = "ours"
+    ours.save_to_file(vault_path)
+
+    reloaded = Vault.load_from_file(vault_path, encryption=encryption)
+    assert sorted(reloaded.projects) == ["A", "B"]
+    assert reloaded.projects["A"].credentials["c1"].password == "ours"
+
+
+@pytest.fixture
+def fold_every_save(monkeypatch):
+    # Каждое сохранение сворачивает журнал, а свёртка переписывает файл целиком
+    monkeypatch.setattr(Vault, "FOLD_RATIO", 0)
+    monkeypatch.setattr(Vault, "FOLD_MIN_BYTES", 0)
+    monkeypatch.setattr(Vault, "COMPACT_RATIO", 0)
+    monkeypatch.setattr(Vault, "COMPACT_MIN_BYTES", 0)
+
+
+@pytest.mark.parametrize("sealed", [False, True])
+def test_sync_after_remote_fold(vault_path, encryption, fold_every_save, sealed):
+    make_vault(vault_path, encryption, sealed)
+    ours, theirs = open_two(vault_path, encryption)
+    inode = os.stat(vault_path).st_ino
+
+    theirs.projects["A"].credentials["c1"].password = "theirs"
+    theirs.projects["A"].add_credential(DatabaseCredential("new", "h", "u", "theirs"))
+    theirs.save_to_file(vault_path)
+    theirs.wait_for_fold()
+    # Снимок, из которого загружены наши проекты, заменён новым файлом
+    assert os.stat(vault_path).st_ino != inode
+
+    ours.projects["A"].credentials["c0"].password = "ours"
+    ours.projects["A"].remove_credential("c2")
+    ours.save_to_file(vault_path)
+    ours.wait_for_fold()
+
+    # Наши изменения ложатся поверх свёрнутого снимка: ни конфликтов, ни воскресших удалений
+    assert ours.conflicts == []
+    assert passwords(vault_path, encryption) == {"c0": "ours", "c1": "theirs", "new": "theirs"}
+
+
+@pytest.mark.skipif(os.name != "posix", reason="старый файл удерживается открытым только в POSIX")
+def test_merge_base_survives_remote_compaction(vault_path, encryption, fold_every_save):
+    make_vault(vault_path, encryption)
+    ours, theirs = open_two(vault_path, encryption)
+    inode = os.stat(vault_path).st_ino
+
+    # Другой процесс записал c0 без изменений: с базой слияния это не конфликт
+    theirs.projects["A"].add_credential(DatabaseCredential("c0", "h", "u", "base"))
+    theirs.projects["A"].remove_credential("c2")
+    theirs.save_to_file(vault_path)
+    theirs.wait_for_fold()
+    assert os.stat(vault_path).st_ino != inode
+
+    ours.projects["A"].credentials["c0"].password = "ours"
+    ours.projects["A"].credentials["c2"].password = "ours"
+    ours.save_to_file(vault_path)
+
+    # База — чанк из старого файла, удержанного дескриптором (а не пустая)
+    assert ours.conflicts == []
+    assert passwords(vault_path, encryption) == {"c0": "ours", "c1": "base", "c2": "ours"}
+
+
+def test_sync_without_local_changes_picks_up_remote_fold(vault_path, encryption, fold_every_save):
+    make_vault(vault_path, encryption)
+    ours, theirs = open_two(vault_path, encryption)
+    theirs.projects["A"].credentials["c1"].password = "theirs"
+    theirs.save_to_file(vault_path)
+    theirs.wait_for_fold()
+
+    ours.sync_with_disk()
+    assert ours.projects["A"].credentials["c1"].password == "theirs"
+    assert not ours.projects["A"].is_dirty
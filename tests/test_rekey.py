@@ -0,0 +1,115 @@
+import pytest
+
+from dpo.core import storage, transcode
+from dpo.core.encryption import PasswordEncryption
+from dpo.core.kdf import Pbkdf2KDF
+from dpo.core.models import DatabaseCredential, Project, Vault, read_chunk
+from dpo.core.transcode import ChunkTranscoder
+
+PROJECTS = [f"P{i}" for i in range(6)]
+
+
+def make_vault(path: str, encryption, sealed: bool = False) -> Vault:
+    vault = Vault(encryption=encryption)
+    vault.seal_secrets = sealed
+    for name in PROJECTS:
+        proj = Project(name)
+        for i in range(3):
+            proj.add_credential(DatabaseCredential(f"db{i}", "h", "u", f"{name}-{i}"))
+        vault.add_project(proj)
+    vault.save_to_file(path)
+    vault.wait_for_fold()
+    return vault
+
+
+def passwords(vault: Vault) -> dict:
+    return {(proj.name, cred.name): cred.reveal() for proj in vault.list_projects()
+            for cred in proj.credentials.values()}
+
+
+@pytest.fixture
+def new_key():
+    return PasswordEncryption("new-master", kdf=Pbkdf2KDF(1000))
+
+
+@pytest.fixture
+def pool_used(monkeypatch):
+    """Пул процессов запускается на любом объёме; список отмечает каждый запуск"""
+    monkeypatch.setattr(transcode, "PARALLEL_MIN_BYTES", 0)
+    started = []
+    executor = ChunkTranscoder._executor
+
+    def spy(self):
+        started.append(self.workers)
+        return executor(self)
+    monkeypatch.setattr(ChunkTranscoder, "_executor", spy)
+    return started
+
+
+@pytest.mark.parametrize("sealed", [False, True])
+def test_parallel_rekey(vault_path, encryption, new_key, pool_used, sealed):
+    expected = passwords(make_vault(vault_path, encryption, sealed))
+    vault = Vault.load_from_file(vault_path, encryption=encryption)
+    vault.projects["P0"].credentials["db0"].password = "changed"
+    expected["P0", "db0"] = "changed"
+    vault.rekey(vault_path, new_key, workers=2)
+    assert pool_used and set(pool_used) == {2}
+    # Перешифрованные в пуле проекты не загружались в этом процессе
+    assert not vault.projects["P5"].is_loaded
+
+    reloaded = Vault.load_from_file(vault_path, encryption=new_key)
+    assert passwords(reloaded) == expected
+    if sealed:
+        assert {segment[2] for segment in reloaded._segments.values()} == {storage.ENC_SPLIT}
+
+
+def test_transcoder_keeps_job_order(tmp_path, vault_path, encryption, new_key, pool_used):
+    vault = make_vault(vault_path, encryption)
+    jobs = [(name, vault_path, vault._segments[name], False) for name in reversed(PROJECTS)]
+    with ChunkTranscoder(encryption, new_key, workers=2) as transcoder:
+        results = list(transcoder.map(jobs))
+    assert pool_used
+
+    for (name, *_), (enc, blocks) in zip(jobs, results):
+        chunk = tmp_path / name
+        chunk.write_bytes(b"".join(blocks))
+        proj = Project(name)
+        read_chunk(proj, str(chunk), (0, chunk.stat().st_size, enc, 0), new_key)
+        assert proj.credentials["db1"].password == f"{name}-1"
+
+
+def test_sequential_path_skips_pool(vault_path, encryption, new_key, monkeypatch):
+    make_vault(vault_path, encryption)
+    monkeypatch.setattr(ChunkTranscoder, "_executor", lambda self: pytest.fail("пул не нужен"))
+    vault = Vault.load_from_file(vault_path, encryption=encryption)
+    vault.rekey(vault_path, new_key, workers=4)
+    assert Vault.load_from_file(vault_path, encryption=new_key).projects["P3"].credentials["db0"].password == "P3-0"
+
+
+def test_failed_rekey_rolls_back(vault_path, encryption, new_key, monkeypatch):
+    make_vault(vault_path, encryption)
+    vault = Vault.load_from_file(vault_path, encryption=encryption)
+    vault.projects["P0"].credentials["db0"].password = "changed"
+    vault.save_to_file(vault_path)
+    history = [(entry.seq, entry.name) for entry in vault.history()]
+
+    transcode_chunk = transcode.transcode_chunk
+
+    def broken(job, previous, encryption):
+        if job.name == "P3":
+            raise OSError("диск отвалился")
+        return transcode_chunk(job, previous, encryption)
+    monkeypatch.setattr(transcode, "transcode_chunk", broken)
+    with pytest.raises(OSError):
+        vault.rekey(vault_path, new_key)
+    monkeypatch.undo()
+
+    # Ни ключ, ни файл, ни журнал не сменились: хранилищем можно пользоваться дальше
+    assert vault.encryption is encryption
+    assert Vault.read_key_params(vault_path)[0] == encryption.get_salt()
+    vault.projects["P1"].credentials["db1"].password = "after"
+    vault.save_to_file(vault_path)
+    reloaded = Vault.load_from_file(vault_path, encryption=encryption)
+    assert [(entry.seq, entry.name) for entry in reloaded.history()][1:] == history
+    assert reloaded.projects["P0"].credentials["db0"].password == "changed"
+    assert reloaded.projects["P1"].credentials["db1"].password == "after"
@@ -0,0 +1,113 @@
+import pytest
+
+from dpo.core.models import DatabaseCredential, Project
+from dpo.tui import EMPTY_LIST_LABEL, CredentialRows, VirtualCredentialList, credential_rows
+
+
+def make_project(names, name: str = "Backend") -> Project:
+    proj = Project(name)
+    for key in names:
+        proj.add_credential(DatabaseCredential(key, "h", "u", "pw"))
+    return proj
+
+
+@pytest.fixture
+def project():
+    return make_project([f"db{i:02d}" for i in range(20)] + ["Alpha", "beta", "Zeta"])
+
+
+def make_list(rows: CredentialRows, page_size: int = 5) -> VirtualCredentialList:
+    # Виджет без экрана: для арифметики страниц нужны только окно и курсор
+    widget = VirtualCredentialList.__new__(VirtualCredentialList)
+    widget.rows = None
+    widget.offset = widget.cursor_line = 0
+    widget.window_changed_callback = None
+    widget.scroll_exit = False
+    widget._my_widgets = [None] * page_size
+    widget.set_rows(rows)
+    return widget
+
+
+def test_rows_are_sorted_case_insensitively(project):
+    rows = CredentialRows(project)
+    assert rows.keys[:3] == ["Alpha", "beta", "db00"]
+    assert rows.keys[-1] == "Zeta"
+    assert rows.format(0) == "[u@h] Alpha (******)"
+    assert rows.credential(1).name == "beta"
+
+
+def test_window_is_clipped_at_the_end(project):
+    rows = CredentialRows(project)
+    assert len(rows.window(0, 5)) == 5
+    assert rows.window(21, 5) == [rows.format(21), rows.format(22)]
+    assert rows.window(30, 5) == []
+    # Строки форматируются только для показанных окон
+    assert len(rows._formatted) == 7
+
+
+def test_find_prefix(project):
+    rows = CredentialRows(project)
+    assert rows.keys[rows.find_prefix("B")] == "beta"
+    assert rows.keys[rows.find_prefix("d")] == "db00"
+    assert rows.keys[rows.find_prefix("e")] == "Zeta"
+    assert rows.find_prefix("z") == len(rows) - 1
+    assert rows.find_prefix("zz") == len(rows) - 1
+    assert CredentialRows(Project("Empty")).find_prefix("a") == 0
+
+
+def test_remove_keeps_cache_valid(project):
+    rows = credential_rows(project)
+    rows.format(1)
+    rows.remove(1)
+    assert "beta" not in project.credentials
+    assert rows.keys[1] == "db00" and rows.format(1) == "[u@h] db00 (******)"
+    assert not rows.is_stale
+    assert credential_rows(project) is rows
+
+
+def test_cache_is_rebuilt_after_external_change(project):
+    rows = credential_rows(project)
+    assert credential_rows(project) is rows
+    project.add_credential(DatabaseCredential("aaa", "h", "u", "pw"))
+    assert rows.is_stale
+    fresh = credential_rows(project)
+    assert fresh is not rows and fresh.keys[0] == "aaa"
+
+
+def test_page_math(project):
+    widget = make_list(CredentialRows(project))
+    assert (widget.offset, widget.cursor_line, widget.status()) == (0, 0, "1-5 из 23")
+
+    widget.h_cursor_page_down(None)
+    assert (widget.offset, widget.cursor_line) == (5, 0)
+    widget.h_cursor_end(None)
+    assert (widget.offset, widget.cursor_line, widget.selected_index) == (18, 4, 22)
+    assert widget.status() == "19-23 из 23"
+    # Последняя страница не уезжает за конец списка
+    widget.h_cursor_page_down(None)
+    assert (widget.offset, widget.selected_index) == (18, 22)
+
+    widget.h_cursor_beginning(None)
+    widget.h_cursor_line_up(None)
+    assert widget.selected_index == 0
+    for _ in range(6):
+        widget.h_cursor_line_down(None)
+    assert (widget.offset, widget.cursor_line) == (2, 4)
+
+    widget.h_jump_to_letter(ord("z"))
+    assert widget.selected_index == 22 and widget.offset == 18
+    widget.h_jump_to_letter("d")
+    assert (widget.offset, widget.cursor_line) == (2, 0)
+
+
+def test_other_project_starts_from_top(project):
+    widget = make_list(CredentialRows(project))
+    widget.show(15)
+    widget.set_rows(CredentialRows(project))
+    assert widget.selected_index == 15
+    other = make_project(["a", "b"], "Billing")
+    widget.set_rows(CredentialRows(other))
+    assert (widget.offset, widget.selected_index, widget.values) == (0, 0, ["[u@h] a (******)", "[u@h] b (******)"])
+    empty = Project("Empty")
+    widget.set_rows(CredentialRows(empty))
+    assert widget.values == [EMPTY_LIST_LABEL] and widget.selected_index is None
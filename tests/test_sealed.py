@@ -0,0 +1,246 @@
+import base64
+import json
+import os
+import types
+
+import pytest
+
+from dpo import cli
+from dpo.core import encryption as encryption_module
+from dpo.core import storage
+from dpo.core.encryption import FieldSealer, Sealed
+from dpo.core.errors import CorruptedFileError
+from dpo.core.models import (DatabaseCredential, GenericSecret, Project, SecretStore, SSHKeyCredential, Vault,
+                             _read_split, split_chunk)
+
+
+def make_vault(path: str, encryption, projects=("A", "B")) -> Vault:
+    vault = Vault(encryption=encryption)
+    vault.seal_secrets = True
+    for name in projects:
+        proj = Project(name)
+        proj.add_credential(DatabaseCredential("db", "h", "u", f"secret-{name}"))
+        proj.add_credential(SSHKeyCredential("ssh", "h", "u", "", private_key=f"key-{name}"))
+        proj.add_credential(GenericSecret("note", notes=f"notes-{name}"))
+        vault.add_project(proj)
+    vault.save_to_file(path)
+    vault.wait_for_fold()
+    return vault
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(encryption_module, "time", types.SimpleNamespace(monotonic=lambda: now[0]))
+    return now
+
+
+@pytest.fixture
+def fold_every_save(monkeypatch):
+    # Каждое сохранение сворачивает журнал, а свёртка переписывает файл целиком
+    monkeypatch.setattr(Vault, "FOLD_RATIO", 0)
+    monkeypatch.setattr(Vault, "FOLD_MIN_BYTES", 0)
+    monkeypatch.setattr(Vault, "COMPACT_RATIO", 0)
+    monkeypatch.setattr(Vault, "COMPACT_MIN_BYTES", 0)
+
+
+@pytest.fixture
+def store_loads(monkeypatch):
+    """Сколько раз дочитывались потоки секретов"""
+    calls = []
+    load = SecretStore.load
+
+    def counting(self, view):
+        calls.append(len(view))
+        load(self, view)
+    monkeypatch.setattr(SecretStore, "load", counting)
+    return calls
+
+
+def test_sealer_round_trip_and_tampering():
+    sealer = FieldSealer(b"k" * 32)
+    sealed = sealer.seal("пароль")
+    assert sealed.reveal() == "пароль"
+    assert sealer.seal("пароль").token != sealed.token  # свой nonce у каждого значения
+    assert "пароль" not in repr(sealed)
+
+    data = bytearray(base64.b64decode(sealed.token))
+    data[-1] ^= 1
+    with pytest.raises(CorruptedFileError):
+        sealer.open(base64.b64encode(bytes(data)).decode("ascii"))
+    with pytest.raises(CorruptedFileError):
+        FieldSealer(b"x" * 32).open(sealed.token)
+
+
+def test_reveal_cache_is_lru(clock):
+    sealer = FieldSealer(b"k" * 32, cache_size=2)
+    a, b, c = (sealer.seal(value) for value in "abc")
+    for value in (a, b, a, c):
+        value.reveal()
+    # b показывали раньше всех: он и вытеснен
+    assert list(sealer._cache) == [a.token, c.token]
+
+    sealer.forget()
+    assert not sealer._cache
+    sealer.cache_size = 0
+    assert a.reveal() == "a" and not sealer._cache
+
+
+def test_reveal_cache_expires(clock):
+    sealer = FieldSealer(b"k" * 32, ttl=10)
+    value = sealer.seal("x")
+    value.reveal()
+    clock[0] += 9
+    assert value.token in sealer._cache and value.reveal() == "x"
+    clock[0] += 10
+    assert value.reveal() == "x"
+    # Просроченное значение расшифровано заново и снова лежит в кэше с новым сроком
+    assert sealer._cache[value.token][1] == clock[0] + 10
+
+
+def test_split_chunk_layout(vault_path, encryption):
+    make_vault(vault_path, encryption)
+    loaded = Vault.load_from_file(vault_path, encryption=encryption)
+    offset, size, enc, _ = loaded._segments["A"]
+    assert enc == storage.ENC_SPLIT
+
+    with open(vault_path, "rb") as f:
+        f.seek(offset)
+        chunk = f.read(size)
+    (meta_size,) = storage.SPLIT_TRAILER.unpack(chunk[-storage.SPLIT_TRAILER.size:])
+    lines = b"".join(encryption.decrypt_stream(chunk[:meta_size])).decode("utf-8").splitlines()
+    header = json.loads(lines[0])
+    # В метаданных вместо секретов их номера, а в заголовке — префикс nonce потока секретов
+    assert base64.b64decode(header["secrets"]) == chunk[meta_size:meta_size + 7]
+    assert "secret-A" not in lines[1] and "sealed" not in lines[1]
+    tokens = b"".join(encryption.decrypt_stream(chunk[meta_size:-storage.SPLIT_TRAILER.size])).split(b"\n")
+    assert len(tokens) == 3
+
+
+def test_secrets_are_read_on_first_reveal(vault_path, encryption, store_loads):
+    make_vault(vault_path, encryption)
+    loaded = Vault.load_from_file(vault_path, encryption=encryption)
+    proj = loaded.projects["A"]
+    cred = proj.credentials["db"]
+    assert type(cred.password) is Sealed
+    assert sorted((p.name, c.name) for p, c in loaded.search("ssh")) == [("A", "ssh"), ("B", "ssh")]
+    assert store_loads == []
+
+    assert cred.reveal() == "secret-A"
+    assert proj.credentials["ssh"].reveal("private_key") == "key-A"
+    assert proj.credentials["note"].reveal("notes") == "notes-A"
+    # Поток секретов проекта прочитан один раз, проект не стал изменённым
+    assert len(store_loads) == 1
+    assert not proj.is_dirty
+    assert loaded.projects["B"].credentials["db"].to_dict()["password"] == "secret-B"
+    assert len(store_loads) == 2
+
+
+@pytest.mark.skipif(os.name != "posix", reason="файл удерживается открытым только в POSIX")
+def test_reveal_after_remote_compaction(vault_path, encryption, fold_every_save):
+    make_vault(vault_path, encryption)
+    ours = Vault.load_from_file(vault_path, encryption=encryption)
+    cred = ours.projects["A"].credentials["db"]
+
+    theirs = Vault.load_from_file(vault_path, encryption=encryption)
+    theirs.projects["B"].credentials["db"].password = "changed"
+    inode = os.stat(vault_path).st_ino
+    theirs.save_to_file(vault_path)
+    theirs.wait_for_fold()
+    assert os.stat(vault_path).st_ino != inode
+
+    # Секреты дочитываются из прежнего файла, который удерживает наш vault
+    assert cred.reveal() == "secret-A"
+
+
+def test_unchanged_sealed_project_survives_own_compaction(vault_path, encryption, fold_every_save):
+    make_vault(vault_path, encryption)
+    loaded = Vault.load_from_file(vault_path, encryption=encryption)
+    cred = loaded.projects["A"].credentials["db"]
+    inode = os.stat(vault_path).st_ino
+    loaded.projects["B"].credentials["db"].password = "changed"
+    loaded.save_to_file(vault_path)
+    loaded.wait_for_fold()
+    assert os.stat(vault_path).st_ino != inode
+
+    assert cred.reveal() == "secret-A"
+    reloaded = Vault.load_from_file(vault_path, encryption=encryption)
+    assert reloaded.projects["A"].credentials["db"].reveal() == "secret-A"
+    assert reloaded.projects["B"].credentials["db"].reveal() == "changed"
+
+
+def test_secrets_of_another_chunk_are_rejected(encryption):
+    chunks = []
+    for name in ("A", "B"):
+        proj = Project(name)
+        proj.add_credential(DatabaseCredential("db", "h", "u", f"secret-{name}"))
+        chunk = b"".join(split_chunk(proj, encryption))
+        (meta_size,) = storage.SPLIT_TRAILER.unpack(chunk[-storage.SPLIT_TRAILER.size:])
+        chunks.append((chunk[:meta_size], chunk[meta_size:-storage.SPLIT_TRAILER.size]))
+
+    (meta_a, _), (_, secrets_b) = chunks
+    swapped = meta_a + secrets_b + storage.SPLIT_TRAILER.pack(len(meta_a))
+    with pytest.raises(CorruptedFileError, match="не от его метаданных"):
+        _read_split(Project("A"), memoryview(swapped), encryption, None, 0)
+
+
+def test_merge_of_sealed_projects(vault_path, encryption):
+    make_vault(vault_path, encryption)
+    ours = Vault.load_from_file(vault_path, encryption=encryption)
+    theirs = Vault.load_from_file(vault_path, encryption=encryption)
+    ours.projects["A"].credentials
+    theirs.projects["A"].credentials["ssh"].password = "theirs"
+    theirs.save_to_file(vault_path)
+    ours.projects["A"].credentials["db"].password = "ours"
+    ours.save_to_file(vault_path)
+
+    assert ours.conflicts == []
+    creds = Vault.load_from_file(vault_path, encryption=encryption).projects["A"].credentials
+    assert (creds["db"].reveal(), creds["ssh"].reveal(), creds["ssh"].reveal("private_key")) == (
+        "ours", "theirs", "key-A")
+
+
+def test_rekey_reseals_secrets(vault_path, encryption):
+    make_vault(vault_path, encryption)
+    loaded = Vault.load_from_file(vault_path, encryption=encryption)
+    new = type(encryption)("other-master", kdf=encryption.kdf)
+    loaded.rekey(vault_path, new)
+
+    reloaded = Vault.load_from_file(vault_path, "other-master")
+    assert reloaded._segments["B"][2] == storage.ENC_SPLIT
+    assert reloaded.projects["B"].credentials["ssh"].reveal("private_key") == "key-B"
+
+
+@pytest.fixture
+def run_cli(vault_path, monkeypatch, capsys, tmp_path):
+    monkeypatch.setenv("DPO_AGENT_SOCK", str(tmp_path / "no-agent.sock"))
+    monkeypatch.setattr(cli, "GLOBAL_MASTER_PASSWORD", "test-master")
+
+    def run(*argv):
+        cli.main([*argv, "--file", vault_path])
+        return capsys.readouterr().out
+    return run
+
+
+def test_cli_seal_get_and_unseal(vault_path, encryption, run_cli):
+    vault = make_vault(vault_path, encryption)
+    vault.set_seal_secrets(False)
+    vault.save_to_file(vault_path)
+    assert Vault.load_from_file(vault_path, encryption=encryption)._segments["A"][2] == storage.ENC_STREAM
+
+    assert "запечатанными" in run_cli("seal")
+    assert "уже включён" in run_cli("seal")
+    loaded = Vault.load_from_file(vault_path, encryption=encryption)
+    assert loaded.seal_secrets and loaded._segments["A"][2] == storage.ENC_SPLIT
+
+    assert run_cli("get", "--project", "A", "--name", "db") == "secret-A\n"
+    assert run_cli("get", "--project", "B", "--name", "ssh", "--field", "private_key") == "key-B\n"
+    with pytest.raises(SystemExit):
+        run_cli("get", "--project", "B", "--name", "ssh", "--field", "notes")
+    with pytest.raises(SystemExit):
+        run_cli("get", "--project", "B", "--name", "missing")
+
+    run_cli("unseal")
+    loaded = Vault.load_from_file(vault_path, encryption=encryption)
+    assert not loaded.seal_secrets and loaded._segments["A"][2] == storage.ENC_STREAM
+    assert loaded.projects["A"].credentials["db"].password == "secret-A"
@@ -0,0 +1,114 @@
+import pytest
+
+from dpo.core.models import DatabaseCredential, Project, Vault
+from dpo.core.search import SearchIndex, tokenize
+
+
+def names(hits):
+    return [(hit.project, hit.name) for hit in hits]
+
+
+@pytest.fixture
+def index():
+    index = SearchIndex()
+    index.add("Backend", DatabaseCredential("prod-db", "db1.prod.local", "app", "x", 5432))
+    index.add("Backend", DatabaseCredential("staging-db", "db1.stage.local", "app", "x", 5432))
+    index.add("Billing", DatabaseCredential("redis", "cache.prod.local", "billing", "x", 6379))
+    return index
+
+
+def test_tokenize():
+    assert tokenize("db-1.Prod_EU") == ["db", "1", "prod_eu"]
+    assert tokenize(5432) == ["5432"]
+
+
+def test_exact_and_prefix(index):
+    assert names(index.search("redis")) == [("Billing", "redis")]
+    assert set(names(index.search("stag"))) == {("Backend", "staging-db")}
+    # Совпадение в названии весит больше, чем в хосте
+    assert names(index.search("prod"))[0] == ("Backend", "prod-db")
+    assert set(names(index.search("prod"))) == {("Backend", "prod-db"), ("Billing", "redis")}
+
+
+def test_substring(index):
+    assert names(index.search("edi")) == [("Billing", "redis")]
+    # Части короче триграммы ищутся только как префиксы
+    assert names(index.search("ed")) == []
+
+
+def test_fuzzy_only_without_direct_matches(index):
+    assert names(index.search("rdeis")) == [("Billing", "redis")]
+    assert names(index.search("rdeis", fuzzy=False)) == []
+
+
+def test_all_words_must_match(index):
+    assert names(index.search("db stage")) == [("Backend", "staging-db")]
+    assert names(index.search("redis 5432")) == []
+    # При равных очках выше короткое название
+    assert names(index.search("backend 5432", limit=1)) == [("Backend", "prod-db")]
+
+
+def test_add_replaces_and_remove(index):
+    index.add("Billing", DatabaseCredential("redis", "queue.local", "billing", "x", 6379))
+    assert len(index) == 3
+    assert names(index.search("cache")) == []
+    assert names(index.search("queue")) == [("Billing", "redis")]
+
+    index.remove("Billing", "redis")
+    index.remove("Billing", "redis")  # повторное удаление ничего не ломает
+    assert names(index.search("queue")) == []
+    assert names(index.search("billing")) == []
+
+    index.remove_project("Backend")
+    assert len(index) == 0
+    assert index.search("db") == []
+
+
+def test_vault_keeps_index_in_sync(encryption):
+    vault = Vault(encryption=encryption)
+    proj = Project("Backend")
+    vault.add_project(proj)
+    proj.add_credential(DatabaseCredential("prod-db", "alpha.local", "app", "x"))
+    assert [cred.name for _, cred in vault.search("prod")] == ["prod-db"]
+
+    # Индекс уже построен: дальше он обновляется по событиям проекта
+    proj.credentials["prod-db"].host = "omega.local"
+    assert vault.search("alpha") == []
+    assert [cred.name for _, cred in vault.search("omega")] == ["prod-db"]
+    proj.add_credential(DatabaseCredential("cache", "redis.local", "app", "x"))
+    assert [cred.name for _, cred in vault.search("redis")] == ["cache"]
+    proj.remove_credential("prod-db")
+    assert vault.search("omega") == []
+
+    # Заменённый проект уходит из индекса вместе с доступами
+    replacement = Project("Backend")
+    replacement.add_credential(DatabaseCredential("queue", "mq.local", "app", "x"))
+    vault.add_project(replacement)
+    assert vault.search("redis") == []
+    assert [(p.name, c.name) for p, c in vault.search("mq")] == [("Backend", "queue")]
+    proj.add_credential(DatabaseCredential("stale", "stale.local", "app", "x"))
+    assert vault.search("stale") == []
+
+
+def test_search_loads_projects_from_file(vault_path, encryption):
+    vault = Vault(encryption=encryption)
+    for name in ("A", "B"):
+        proj = Project(name)
+        proj.add_credential(DatabaseCredential(f"{name.lower()}-db", "h", "u", "x"))
+        vault.add_project(proj)
+    vault.save_to_file(vault_path)
+
+    loaded = Vault.load_from_file(vault_path, encryption=encryption)
+    assert [(p.name, c.name) for p, c in loaded.search("b-db")] == [("B", "b-db")]
+
+
+def test_stale_hits_are_skipped(encryption):
+    vault = Vault(encryption=encryption)
+    proj = Project("Backend")
+    proj.add_credential(DatabaseCredential("prod-db", "db.local", "app", "x"))
+    vault.add_project(proj)
+    # Записи без проекта или доступа в vault: поиск их не возвращает и не падает
+    vault.search_index.add("Gone", DatabaseCredential("old-db", "db.local", "app", "x"))
+    vault.search_index.add("Backend", DatabaseCredential("ghost-db", "db.local", "app", "x"))
+    assert [(p.name, c.name) for p, c in vault.search("db")] == [("Backend", "prod-db")]
+    assert vault.search("ghost") == []
@@ -0,0 +1,124 @@
+import json
+
+import pytest
+
+from dpo.core import storage
+from dpo.core.encryption import RECORD_SIZE, StreamCipher
+from dpo.core.errors import CorruptedFileError
+from dpo.core.models import DatabaseCredential, Project, Vault
+
+KEY = b"k" * 32
+
+
+def encrypt(data: bytes, pieces: int = 1) -> bytes:
+    step = max(1, len(data) // pieces)
+    return b"".join(StreamCipher(KEY).encrypt(data[i:i + step] for i in range(0, len(data), step)))
+
+
+def decrypt(data: bytes) -> bytes:
+    return b"".join(StreamCipher(KEY).decrypt(data))
+
+
+def records(data: bytes):
+    """Префикс nonce и записи потока по отдельности"""
+    prefix, pos, result = data[:7], 7, []
+    while pos < len(data):
+        length = int.from_bytes(data[pos:pos + 4], "big")
+        result.append(data[pos:pos + 4 + length])
+        pos += 4 + length
+    return prefix, result
+
+
+@pytest.mark.parametrize("size", [0, 1, RECORD_SIZE - 1, RECORD_SIZE, RECORD_SIZE + 1,
+                                  2 * RECORD_SIZE, 3 * RECORD_SIZE + 5])
+def test_round_trip_at_record_boundaries(size):
+    data = bytes(i % 251 for i in range(size))
+    assert decrypt(encrypt(data)) == data
+    # Куски произвольного размера, не совпадающие с границами записей
+    assert decrypt(encrypt(data, pieces=7)) == data
+
+
+def test_records_split_at_record_size():
+    _, parts = records(encrypt(b"x" * (2 * RECORD_SIZE)))
+    # Ровно две полные записи: пустой последней записи не появляется
+    assert len(parts) == 2
+
+
+def test_dropped_last_record_is_rejected():
+    prefix, parts = records(encrypt(b"x" * (2 * RECORD_SIZE + 10)))
+    with pytest.raises(CorruptedFileError):
+        decrypt(prefix + b"".join(parts[:-1]))
+
+
+def test_cut_inside_record_is_rejected():
+    data = encrypt(b"x" * (RECORD_SIZE + 10))
+    with pytest.raises(CorruptedFileError):
+        decrypt(data[:-5])
+    with pytest.raises(CorruptedFileError):
+        decrypt(data[:9])
+
+
+def test_reordered_records_are_rejected():
+    prefix, parts = records(encrypt(bytes(range(256)) * 600))
+    assert len(parts) == 3
+    with pytest.raises(CorruptedFileError):
+        decrypt(prefix + parts[1] + parts[0] + parts[2])
+
+
+def test_appended_record_is_rejected():
+    prefix, parts = records(encrypt(b"x" * (RECORD_SIZE + 10)))
+    _, extra = records(encrypt(b"y" * 10))
+    with pytest.raises(CorruptedFileError):
+        decrypt(prefix + b"".join(parts) + extra[0])
+
+
+def test_stream_chunk_read_through_mmap(vault_path, encryption):
+    vault = Vault(encryption=encryption)
+    proj = Project("Backend", "API")
+    for i in range(2000):  # несколько записей потока и несколько строк JSON Lines
+        proj.add_credential(DatabaseCredential(f"db{i}", f"db{i}.local", "app", f"secret-{i}"))
+    vault.add_project(proj)
+    vault.save_to_file(vault_path)
+
+    loaded = Vault.load_from_file(vault_path, encryption=encryption)
+    assert loaded._segments["Backend"][2] == storage.ENC_STREAM
+    assert loaded._segments["Backend"][1] > 2 * RECORD_SIZE
+    assert len(loaded.projects["Backend"].credentials) == 2000
+    assert loaded.projects["Backend"].credentials["db1999"].password == "secret-1999"
+
+
+def write_fernet_file(path: str, encryption, projects: dict, version: int = 3):
+    """Файл v3: чанки — токены Fernet с JSON проекта, в индексе нет enc"""
+    with open(path, "wb") as f:
+        writer = storage.ChunkWriter(f, {"salt": encryption.get_salt(), "kdf": encryption.kdf.to_dict()})
+        for name, credentials in projects.items():
+            data = {"name": name, "description": "", "credentials": credentials}
+            writer.write_chunk({"name": name, "description": ""}, encryption.encrypt(json.dumps(data)))
+        writer.finish(encryption)
+    with open(path, "r+b") as f:
+        f.seek(len(storage.MAGIC))
+        f.write(bytes([version]))
+
+
+def test_legacy_fernet_chunks_load_and_upgrade(vault_path, encryption):
+    credentials = {"Prod": {"type": "database", "name": "Prod", "host": "db", "user": "app",
+                            "password": "pw", "port": 5432}}
+    write_fernet_file(vault_path, encryption, {"Backend": credentials, "Empty": {}})
+
+    vault = Vault.load_from_file(vault_path, encryption=encryption)
+    assert vault._segments["Backend"][2] == storage.ENC_FERNET
+    cred = vault.projects["Backend"].credentials["Prod"]
+    assert (cred.host, cred.password, cred.port) == ("db", "pw", 5432)
+    assert vault.projects["Empty"].credentials == {}
+
+    # Старая версия формата: файл переписывается целиком, нетронутые чанки копируются как есть,
+    # а изменённые пишутся потоковым шифрованием
+    cred.password = "new"
+    vault.save_to_file(vault_path)
+    with open(vault_path, "rb") as f:
+        assert storage.read_header(f)[0]["version"] == storage.FORMAT_VERSION
+    reloaded = Vault.load_from_file(vault_path, encryption=encryption)
+    assert reloaded._segments["Backend"][2] == storage.ENC_STREAM
+    assert reloaded._segments["Empty"][2] == storage.ENC_FERNET
+    assert reloaded.projects["Backend"].credentials["Prod"].password == "new"
+    assert reloaded.projects["Empty"].credentials == {}
@@ -0,0 +1,100 @@
+import io
+import os
+
+import pytest
+
+from dpo.core.models import DatabaseCredential, Project, Vault
+from dpo.core.transfer import DEFAULT_PROJECT, detect_format, export_file, import_file, import_rows, read_rows
+
+
+def row(name: str, password: str = "pw", project: str = "Backend", **extra) -> dict:
+    return {"project": project, "name": name, "host": "h", "user": "u", "password": password, "port": "5432", **extra}
+
+
+@pytest.fixture
+def vault(encryption):
+    vault = Vault(encryption=encryption)
+    proj = Project("Backend")
+    proj.add_credential(DatabaseCredential("db", "h", "u", "old", 5432))
+    vault.add_project(proj)
+    return vault
+
+
+def test_identical_rows_are_always_skipped(vault):
+    stats = import_rows(vault, [row("db", "old")], on_conflict="overwrite")
+    assert (stats.added, stats.updated, stats.skipped) == (0, 0, 1)
+
+
+@pytest.mark.parametrize("rule, passwords, counts", [
+    ("skip", {"db": "old"}, (0, 0, 1)),
+    ("overwrite", {"db": "new"}, (1, 0, 0)),
+    ("rename", {"db": "old", "db (2)": "new"}, (0, 1, 0)),
+])
+def test_conflict_rules(vault, rule, passwords, counts):
+    stats = import_rows(vault, [row("db", "new")], on_conflict=rule)
+    assert (stats.updated, stats.renamed, stats.skipped) == counts
+    assert {name: cred.password for name, cred in vault.projects["Backend"].credentials.items()} == passwords
+
+
+def test_rename_picks_free_name(vault):
+    import_rows(vault, [row("db", "new"), row("db", "newer")], on_conflict="rename")
+    assert sorted(vault.projects["Backend"].credentials) == ["db", "db (2)", "db (3)"]
+
+
+def test_invalid_rows_and_target_project(vault):
+    rows = [row(""), row("x", port="not-a-port"), {"name": "bare"}, row("api", project="")]
+    stats = import_rows(vault, rows)
+    assert (stats.added, stats.invalid) == (2, 2)
+    bare = vault.projects[DEFAULT_PROJECT].credentials["bare"]
+    assert (bare.host, bare.port) == ("", DatabaseCredential.DEFAULT_PORT)
+    assert "api" in vault.projects[DEFAULT_PROJECT].credentials
+
+    # --project перекрывает проект из строк
+    import_rows(vault, [row("cache", project="Other")], project="Forced")
+    assert "cache" in vault.projects["Forced"].credentials
+    assert "Other" not in vault.projects
+
+
+def test_foreign_csv_is_detected_and_mapped(tmp_path, vault):
+    path = str(tmp_path / "bitwarden.csv")
+    with open(path, "w", encoding="utf-8") as f:
+        f.write("folder,favorite,type,name,login_uri,login_username,login_password\n")
+        f.write("Billing,,login,pg,postgres://pg.local:6543/app,billing,s3cret\n")
+        f.write("Billing,,login,site,example.com,me,pw\n")
+    assert detect_format(path) == "bitwarden"
+
+    stats = import_file(vault, path)
+    assert stats.added == 2
+    pg = vault.projects["Billing"].credentials["pg"]
+    assert (pg.host, pg.port, pg.user, pg.password) == ("pg.local", 6543, "billing", "s3cret")
+    assert vault.projects["Billing"].credentials["site"].port == DatabaseCredential.DEFAULT_PORT
+
+
+@pytest.mark.parametrize("fmt, name", [("csv", "out.csv"), ("jsonl", "out.jsonl")])
+def test_export_round_trip(tmp_path, vault, encryption, fmt, name):
+    vault.projects["Backend"].add_credential(DatabaseCredential("кэш", "redis", "app", "пароль,\"с\"\n", 6379))
+    path = str(tmp_path / name)
+    assert export_file(vault, path, fmt) == 2
+    assert os.stat(path).st_mode & 0o777 == 0o600
+    assert detect_format(path) == fmt
+
+    other = Vault(encryption=encryption)
+    stats = import_file(other, path)
+    assert stats.added == 2
+    cache = other.projects["Backend"].credentials["кэш"]
+    assert (cache.host, cache.password, cache.port) == ("redis", "пароль,\"с\"\n", 6379)
+
+
+def test_jsonl_reader_skips_blank_lines():
+    rows = list(read_rows(io.StringIO('{"name": "a"}\n\n{"name": "b"}\n'), "jsonl"))
+    assert [r["name"] for r in rows] == ["a", "b"]
+
+
+def test_import_saves_only_touched_projects(vault_path, vault, encryption):
+    vault.add_project(Project("Untouched"))
+    vault.save_to_file(vault_path)
+    loaded = Vault.load_from_file(vault_path, encryption=encryption)
+    import_rows(loaded, [row(f"db{i}") for i in range(50)])
+    loaded.save_to_file(vault_path)
+    assert not loaded.projects["Untouched"].is_loaded
+    assert len(Vault.load_from_file(vault_path, encryption=encryption).projects["Backend"].credentials) == 51
@@ -0,0 +1,86 @@
+import io
+
+import pytest
+
+from dpo.core.models import (CREDENTIAL_TYPES, APITokenCredential, DatabaseCredential, GenericSecret, Project,
+                         SSHKeyCredential, Vault, credential_from_row, fill_project)
+from dpo.core.transfer import import_rows, read_rows, write_rows
+
+SAMPLES = [
+    DatabaseCredential("db", "db.local", "app", "pw", 5432),
+    SSHKeyCredential("deploy", "bastion", "ops", "phrase", 2222, private_key="-----BEGIN KEY-----\nabc\n"),
+    APITokenCredential("stripe", "https://api.stripe.com", "acct", "sk_live"),
+    GenericSecret("wifi", password="hunter2", notes="офис"),
+]
+
+
+def test_registry():
+    assert {name: cls.__name__ for name, cls in CREDENTIAL_TYPES.items()} == {
+        "database": "DatabaseCredential", "ssh": "SSHKeyCredential",
+        "api": "APITokenCredential", "secret": "GenericSecret"}
+
+
+@pytest.mark.parametrize("cred", SAMPLES, ids=lambda c: c.type_name)
+def test_compact_row_round_trip(cred):
+    row = cred.to_row()
+    assert row == [cred.type_name, *(getattr(cred, field) for field in cred.FIELDS)]
+    restored = credential_from_row(row)
+    assert type(restored) is type(cred)
+    assert restored.to_row() == row
+    assert credential_from_row(cred.to_dict()).to_row() == row
+
+
+def test_default_ports_and_slots():
+    assert [cls(name="x").port for cls in CREDENTIAL_TYPES.values()] == [3306, 22, 443, 0]
+    assert not hasattr(DatabaseCredential("x"), "__dict__")
+
+
+def test_attached_credentials_mark_project_dirty():
+    proj = Project("A")
+    cred = DatabaseCredential("db", "h", "u", "pw")
+    proj.add_credential(cred)
+    proj._dirty = False
+    # Прикреплённый доступ получает подкласс с отслеживанием, но остаётся своего типа
+    assert isinstance(cred, DatabaseCredential) and type(cred) is not DatabaseCredential
+    cred.password = "new"
+    assert proj.is_dirty
+
+    proj.remove_credential("db")
+    assert type(cred) is DatabaseCredential
+    proj._dirty = False
+    cred.password = "other"
+    assert not proj.is_dirty
+
+
+def test_unknown_types_are_kept_on_save(vault_path, encryption):
+    proj = Project("A")
+    future = ["future-type", "x", {"field": 1}]
+    fill_project(proj, {"rows": [future, ["database", "db", "h", "u", "pw", 5432]]})
+    vault = Vault(encryption=encryption)
+    vault.add_project(proj)
+    vault.save_to_file(vault_path)
+
+    loaded = Vault.load_from_file(vault_path, encryption=encryption)
+    loaded.projects["A"].credentials["db"].password = "new"
+    loaded.save_to_file(vault_path)
+    reloaded = Vault.load_from_file(vault_path, encryption=encryption).projects["A"]
+    assert list(reloaded.credentials) == ["db"]
+    assert reloaded._unknown_rows == [future]
+
+
+def test_legacy_dict_chunks_are_read():
+    proj = Project("A")
+    fill_project(proj, {"credentials": {"db": {"type": "database", "name": "db", "host": "h",
+                                               "user": "u", "password": "pw", "port": 5432}}})
+    assert proj.credentials["db"].to_row() == ["database", "db", "h", "u", "pw", 5432]
+
+
+def test_jsonl_keeps_type_specific_fields(encryption):
+    buffer = io.StringIO()
+    rows = [{"project": "Infra", **cred.to_dict()} for cred in SAMPLES]
+    write_rows(buffer, rows, "jsonl")
+
+    other = Vault(encryption=encryption)
+    buffer.seek(0)
+    assert import_rows(other, read_rows(buffer, "jsonl")).added == len(SAMPLES)
+    assert [c.to_row() for c in other.projects["Infra"].credentials.values()] == [c.to_row() for c in SAMPLES]
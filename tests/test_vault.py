@@ -0,0 +1,120 @@
+import os
+
+import pytest
+
+from dpo.core.errors import CorruptedFileError
+from dpo.core.models import DatabaseCredential, Project, Vault
+
+PASSWORD = "test-master"
+
+
+def make_vault(path: str, projects: int = 3) -> Vault:
+    vault = Vault(PASSWORD)
+    for i in range(projects):
+        proj = Project(f"P{i}", f"Проект {i}")
+        proj.add_credential(DatabaseCredential(f"db{i}", f"db{i}.local", "app", f"secret-{i}"))
+        vault.add_project(proj)
+    vault.save_to_file(path)
+    return vault
+
+
+def test_projects_are_decrypted_on_first_access(vault_path):
+    make_vault(vault_path)
+    vault = Vault.load_from_file(vault_path, PASSWORD)
+    assert [proj.description for proj in vault.list_projects()] == ["Проект 0", "Проект 1", "Проект 2"]
+    assert not any(proj.is_loaded for proj in vault.list_projects())
+
+    assert vault.projects["P1"].credentials["db1"].password == "secret-1"
+    assert [proj.is_loaded for proj in vault.list_projects()] == [False, True, False]
+
+
+def test_unloaded_projects_survive_save(vault_path):
+    make_vault(vault_path)
+    vault = Vault.load_from_file(vault_path, PASSWORD)
+    vault.projects["P0"].add_credential(DatabaseCredential("extra", "h", "u", "p"))
+    vault.save_to_file(vault_path)
+
+    reloaded = Vault.load_from_file(vault_path, PASSWORD)
+    assert sorted(reloaded.projects["P0"].credentials) == ["db0", "extra"]
+    assert reloaded.projects["P2"].credentials["db2"].password == "secret-2"
+
+
+def test_damaged_chunk_is_reported_on_access(vault_path):
+    vault = make_vault(vault_path)
+    offset, size = vault._segments["P1"][:2]
+    with open(vault_path, "r+b") as f:
+        f.seek(offset + size // 2)
+        f.write(b"!")
+    reloaded = Vault.load_from_file(vault_path, PASSWORD)
+    assert reloaded.projects["P0"].credentials["db0"].password == "secret-0"
+    with pytest.raises(CorruptedFileError, match="P1"):
+        reloaded.projects["P1"].credentials
+
+
+# --- Инкрементальное сохранение ---
+
+@pytest.fixture
+def fold_every_save(monkeypatch):
+    # Журнал сворачивается в файл после каждого сохранения
+    monkeypatch.setattr(Vault, "FOLD_RATIO", 0)
+    monkeypatch.setattr(Vault, "FOLD_MIN_BYTES", 0)
+
+
+def test_save_appends_only_dirty_projects(vault_path, fold_every_save):
+    make_vault(vault_path)
+    vault = Vault.load_from_file(vault_path, PASSWORD)
+    before = dict(vault._segments)
+    inode, size = os.stat(vault_path).st_ino, os.path.getsize(vault_path)
+
+    vault.projects["P1"].credentials["db1"].password = "changed"
+    assert [proj.is_dirty for proj in vault.list_projects()] == [False, True, False]
+    vault.save_to_file(vault_path)
+    assert not vault.projects["P0"].is_loaded
+    assert not any(proj.is_dirty for proj in vault.list_projects())
+    vault.wait_for_fold()
+
+    # Свёртка дописала только изменённый чанк: файл тот же и только вырос, остальные чанки на месте
+    assert os.stat(vault_path).st_ino == inode
+    assert os.path.getsize(vault_path) > size
+    reloaded = Vault.load_from_file(vault_path, PASSWORD)
+    assert reloaded._segments["P0"] == before["P0"] and reloaded._segments["P2"] == before["P2"]
+    assert reloaded._segments["P1"][0] >= size
+    assert reloaded.projects["P1"].credentials["db1"].password == "changed"
+
+
+def test_save_without_changes_writes_no_chunks(vault_path):
+    make_vault(vault_path)
+    vault = Vault.load_from_file(vault_path, PASSWORD)
+    before = dict(vault._segments)
+    vault.save_to_file(vault_path)
+    assert vault._segments == before
+
+
+def test_torn_append_falls_back_to_previous_footer(vault_path):
+    make_vault(vault_path)
+    with open(vault_path, "ab") as f:
+        f.write(b"\x00" * 200)  # дописанные чанки без нового футера
+    vault = Vault.load_from_file(vault_path, PASSWORD)
+    assert vault.projects["P2"].credentials["db2"].password == "secret-2"
+
+    # Следующее сохранение отрезает хвост
+    vault.projects["P2"].credentials["db2"].password = "changed"
+    vault.save_to_file(vault_path)
+    assert Vault.load_from_file(vault_path, PASSWORD).projects["P2"].credentials["db2"].password == "changed"
+
+
+def test_garbage_triggers_compaction(vault_path, fold_every_save, monkeypatch):
+    monkeypatch.setattr(Vault, "COMPACT_MIN_BYTES", 0)
+    make_vault(vault_path)
+    vault = Vault.load_from_file(vault_path, PASSWORD)
+    inode = os.stat(vault_path).st_ino
+    for i in range(5):
+        vault.projects["P0"].credentials["db0"].password = f"v{i}"
+        vault.save_to_file(vault_path)
+        vault.wait_for_fold()
+    # Мусор от старых версий чанка P0 превысил живые данные: файл переписан заново
+    assert os.stat(vault_path).st_ino != inode
+    assert vault._end == os.path.getsize(vault_path)
+    reloaded = Vault.load_from_file(vault_path, PASSWORD)
+    assert reloaded.projects["P0"].credentials["db0"].password == "v4"
+    assert reloaded.projects["P1"].credentials["db1"].password == "secret-1"